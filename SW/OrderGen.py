@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 import math
 
+# Static symbols for each stock (8 characters, padded)
+DEFAULT_SYMBOLS = ["AMD_    ", "JPM_    ", "CUST    ", "PG__    "]
+
 class OrderGenerator:
     """
     Order generation tracks the internal state of the account and produces OUCH orders 
@@ -13,16 +16,18 @@ class OrderGenerator:
       - Generates OUCH orders (48-byte messages) for buy/sell actions.
       - Outputs a binary blob: 4 bytes of portfolio value (fixed-point) 
         followed by 4 orders (4 x 48 bytes).
+    One order per entry of symbols, so the stock count follows it (four by default,
+    like the HLS block; it should match the TaParser num_stocks feeding it).
     """
 
-    def __init__(self):
+    def __init__(self, symbols=DEFAULT_SYMBOLS):
+        self.symbols = list(symbols)
+        self.num_stocks = len(self.symbols)
         # Internal state: holdings (shares) and cash (dollars)
-        self.holdings = [0.0, 0.0, 0.0, 0.0]
+        self.holdings = [0.0] * self.num_stocks
         self.cash = 10000.0  # initially 10,000 dollars
         self.userRefNum = 1
-        self.latched_weights = [0.0, 0.0, 0.0, 0.0]
-        # Static symbols for each stock (8 characters, padded)
-        self.symbols = ["AMD_    ", "JPM_    ", "CUST    ", "PG__    "]
+        self.latched_weights = [0.0] * self.num_stocks
         # Dummy ClOrdID as in the HLS code (14 characters)
         self.dummyClOrdID = "CLORD_ID001XXX"
 
@@ -118,7 +123,7 @@ class OrderGenerator:
             - 4 bytes of portfolio value (fixed-point, price*10000, big-endian)
             - 4 orders x 48 bytes each (OUCH order messages)
         """
-        NUM_STOCKS = 4
+        NUM_STOCKS = self.num_stocks
         
         # Latch the new weight vector; do a NaN check first.
         for i in range(NUM_STOCKS):
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
+import csv
+import heapq
 import math
+from array import array
 
 # -------------------------------------------------------------------------
 # Constants (adjust these as desired)
@@ -8,12 +11,33 @@ import math
 NUM_STOCKS = 4
 MIN_PRICE_INIT = [1000000, 2480000, 2050000, 1680000]  # Example initialization
 TICK_INIT = [600, 600, 600, 600]  # Example initialization
+DEFAULT_PRICE_BAND = (1000000, 600)  # (min_price, tick) for symbols without a config row
+PRICE_BAND_CSV = 'data/config.csv'  # per-symbol price bands (see load_price_bands)
 MAX_ORDER_NUM = 1024
 MAX_LEVELS = 256
+# agg_tree nodes hold quantity << COUNT_BITS | non-empty levels (at most MAX_LEVELS)
+COUNT_BITS = MAX_LEVELS.bit_length()
+COUNT_MASK = (1 << COUNT_BITS) - 1
+CACHE_SIZE = 5  # best levels kept live per side (mirrors CACHE_SIZE in the HLS header)
+RECENTER_MARGIN = 16  # re-center once a top-5 level gets this close to a band edge
 
 SIDE_BID = 0
 SIDE_ASK = 1
 
+NEG_ONE = 0xFFFFFFFF  # "no valid price" marker in the segment tree
+
+ORDER_ADD = 0x1
+ORDER_CANCEL = 0x2
+ORDER_EXECUTE = 0x4
+ORDER_DELETE = 0x8
+
+# HashOrderList slot states
+SLOT_EMPTY = 0
+SLOT_USED = 1
+SLOT_TOMBSTONE = 2
+HASH_MULT = 0x9E3779B97F4A7C15  # 2^64 / golden ratio (Fibonacci hashing)
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
 
 # For 136-bit 'message' fields (in the original code):
 #   Bits 0..31    -> stock_id
@@ -51,6 +75,31 @@ def choose_preferred(idxA, idxB, side):
         return idxA if idxA < idxB else idxB
 
 
+def as_list(column):
+    """
+    Plain Python ints from a list or NumPy column (NumPy scalars would wrap in price math).
+    """
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+
+def load_price_bands(csv_file_path):
+    """
+    Read per-symbol price bands from a CSV with stock_id, min_price and tick columns
+    (data/config.csv works as-is; other columns are ignored).
+    Returns {stock_id: (min_price, tick)}. With one row per side, the lower min_price wins.
+    """
+    bands = {}
+    with open(csv_file_path, mode='r', newline='') as csv_file:
+        for row in csv.DictReader(csv_file):
+            stock_id = int(row['stock_id'])
+            min_price = int(row['min_price'])
+            tick = int(row['tick'])
+            if stock_id in bands and bands[stock_id][0] <= min_price:
+                continue
+            bands[stock_id] = (min_price, tick)
+    return bands
+
+
 # -------------------------------------------------------------------------
 # Classes
 # -------------------------------------------------------------------------
@@ -59,26 +108,50 @@ class TreeOrderBook:
     Segment Tree–based structure for a single side (BID or ASK) of a single stock.
     - segment_tree: holds the "best index" (either min or max index, depending on side).
     - price_quantity: quantity at each price index.
+    - top_cache: the best CACHE_SIZE non-empty price indices, best first, kept up to date
+      on every bubble_up so get_top_5 never has to walk the tree.
+    - agg_tree: same layout as segment_tree, holding the total quantity and the number of
+      non-empty levels under each node packed into one int (quantity << COUNT_BITS | count;
+      the count never carries into the quantity, so a parent is just left + right).
+      Depth, band volume and quantity-threshold queries are O(log levels) (see
+      range_quantity / depth / price_for_quantity).
+    With recenter=True the 256-level window follows the market instead of clamping
+    (see recenter_shift / shift_window); recenter_count and levels_shifted count the moves.
+    Books are built per symbol, thousands at a time, so they keep to __slots__ and two
+    trees: less memory per book is less for the caches to miss.
     """
 
-    def __init__(self, min_price=1000000, tick_size=10000, side=SIDE_BID):
+    __slots__ = ('min_price', 'tick_size', 'side', 'num_levels', 'recenter', 'recenter_count',
+                 'levels_shifted', 'max_price', 'segment_tree', 'price_quantity', 'agg_tree', 'top_cache')
+
+    def __init__(self, min_price=1000000, tick_size=10000, side=SIDE_BID, recenter=False):
         self.min_price = min_price
         self.tick_size = tick_size
         self.side = side
         self.num_levels = MAX_LEVELS
+        self.recenter = recenter
+        self.recenter_count = 0
+        self.levels_shifted = 0
 
         self.max_price = self.min_price + self.tick_size * (self.num_levels - 1)
 
         # For a segment tree of size num_levels, we store it in an array of size 2*num_levels
         self.segment_tree = [0xFFFFFFFF] * (2 * self.num_levels)
         self.price_quantity = [0] * self.num_levels
+        self.agg_tree = [0] * (2 * self.num_levels)
+        self.top_cache = []
 
     def price_to_index(self, price):
         diff = price - self.min_price
         idx = diff // self.tick_size
-        if idx >= self.num_levels:
-            # If out of range, clamp to last level
-            idx = self.num_levels - 1
+        if idx < 0 or idx >= self.num_levels:
+            if self.recenter and idx < 0:
+                # Deep order below the window: park it on the edge level
+                idx = 0
+            else:
+                # If out of range, clamp to last level
+                # (below min_price the unsigned HLS subtraction wraps and lands here too)
+                idx = self.num_levels - 1
         return idx
 
     def index_to_price(self, idx):
@@ -90,20 +163,265 @@ class TreeOrderBook:
         """
         # Convert leaf_idx (0..num_levels-1) to actual tree index (num_levels..2*num_levels-1)
         node = leaf_idx + self.num_levels
+        qty = self.price_quantity[leaf_idx]
+        tree = self.segment_tree
+        agg_tree = self.agg_tree
+        side = self.side
         # If we have a positive quantity at leaf_idx, set that index; otherwise, set to invalid.
-        if self.price_quantity[leaf_idx] > 0:
-            self.segment_tree[node] = leaf_idx
+        if qty > 0:
+            tree[node] = leaf_idx
+            agg_tree[node] = (qty << COUNT_BITS) | 1
         else:
-            self.segment_tree[node] = 0xFFFFFFFF
+            tree[node] = 0xFFFFFFFF
+            agg_tree[node] = 0
 
         # Move upward in the tree
         node >>= 1  # node //= 2
         while node > 0:
-            left = self.segment_tree[node << 1]
-            right = self.segment_tree[(node << 1) + 1]
-            self.segment_tree[node] = choose_preferred(left, right, self.side)
+            left = node << 1
+            right = left + 1
+            tree[node] = choose_preferred(tree[left], tree[right], side)
+            agg_tree[node] = agg_tree[left] + agg_tree[right]
             node >>= 1
 
+        self.update_cache(leaf_idx)
+
+    def is_better(self, idxA, idxB):
+        """
+        True if price index idxA ranks ahead of idxB on this side.
+        """
+        if self.side == SIDE_BID:
+            return idxA > idxB
+        return idxA < idxB
+
+    def query_best(self, lo, hi):
+        """
+        Best non-empty price index in [lo, hi), or NEG_ONE if there is none.
+        """
+        best = NEG_ONE
+        lo += self.num_levels
+        hi += self.num_levels
+        while lo < hi:
+            if lo & 1:
+                best = choose_preferred(best, self.segment_tree[lo], self.side)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = choose_preferred(best, self.segment_tree[hi], self.side)
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def range_quantity(self, lo, hi):
+        """
+        Total quantity resting at price indices [lo, hi).
+        """
+        total = 0
+        lo = max(lo, 0) + self.num_levels
+        hi = min(hi, self.num_levels) + self.num_levels
+        while lo < hi:
+            if lo & 1:
+                total += self.agg_tree[lo]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                total += self.agg_tree[hi]
+            lo >>= 1
+            hi >>= 1
+        return int(total) >> COUNT_BITS
+
+    def find_from_best(self, target, count=False):
+        """
+        Walk down from the root, best side first, to the level where the running total
+        of quantity (or of non-empty levels with count=True) counted from the best price
+        reaches target. The caller makes sure the root holds at least target > 0.
+        """
+        agg_tree = self.agg_tree
+        node = 1
+        while node < self.num_levels:
+            if self.side == SIDE_BID:
+                first, second = (node << 1) + 1, node << 1
+            else:
+                first, second = node << 1, (node << 1) + 1
+            value = agg_tree[first] & COUNT_MASK if count else agg_tree[first] >> COUNT_BITS
+            if value >= target:
+                node = first
+            else:
+                target -= value
+                node = second
+        return node - self.num_levels
+
+    def quantity_through(self, idx):
+        """
+        Quantity at idx plus every level ahead of it.
+        """
+        if self.side == SIDE_BID:
+            return self.range_quantity(idx, self.num_levels)
+        return self.range_quantity(0, idx + 1)
+
+    def depth(self, levels):
+        """
+        Cumulative quantity over the best `levels` non-empty price levels.
+        Returns (price of the last level counted, cumulative quantity), or
+        (None, 0) if the side is empty. Fewer levels than asked counts them all.
+        """
+        levels = min(levels, int(self.agg_tree[1] & COUNT_MASK))
+        if levels <= 0:
+            return None, 0
+        idx = self.find_from_best(levels, count=True)
+        return self.index_to_price(idx), self.quantity_through(idx)
+
+    def volume_between(self, low_price, high_price):
+        """
+        Total quantity resting at prices in [low_price, high_price].
+        Orders parked on an edge level (outside the window) count at the edge price.
+        """
+        lo = -(-(low_price - self.min_price) // self.tick_size)  # first level >= low_price
+        hi = (high_price - self.min_price) // self.tick_size + 1
+        return self.range_quantity(lo, hi)
+
+    def price_for_quantity(self, quantity):
+        """
+        Price at which the cumulative quantity counted from the best level first reaches
+        quantity, i.e. the worst price a marketable order of that size would reach.
+        Returns None if the side holds less than quantity in total.
+        """
+        if quantity <= 0:
+            quantity = 1
+        if self.agg_tree[1] >> COUNT_BITS < quantity:
+            return None
+        return self.index_to_price(self.find_from_best(quantity))
+
+    def update_cache(self, idx):
+        """
+        Keep top_cache in sync after the quantity at idx changed.
+        - A level entering the top-5 is inserted in order and pushes out the 5th.
+        - A cached level that empties is dropped and the next best level behind the
+          cache is promoted with one range query on the tree.
+        """
+        cache = self.top_cache
+        if idx in cache:
+            if self.price_quantity[idx] > 0:
+                return
+            was_full = len(cache) == CACHE_SIZE
+            cache.remove(idx)
+            if was_full:
+                # Levels behind the cache start just past its worst entry
+                if self.side == SIDE_BID:
+                    nxt = self.query_best(0, cache[-1])
+                else:
+                    nxt = self.query_best(cache[-1] + 1, self.num_levels)
+                if nxt != NEG_ONE:
+                    cache.append(nxt)
+        elif self.price_quantity[idx] > 0:
+            if len(cache) == CACHE_SIZE and not self.is_better(idx, cache[-1]):
+                return
+            pos = 0
+            while pos < len(cache) and self.is_better(cache[pos], idx):
+                pos += 1
+            cache.insert(pos, idx)
+            if len(cache) > CACHE_SIZE:
+                cache.pop()
+
+    def rebuild(self):
+        """
+        Rebuild the whole tree, the aggregate trees and the top-5 cache from price_quantity.
+        """
+        n = self.num_levels
+        for idx in range(n):
+            self.segment_tree[idx + n] = idx if self.price_quantity[idx] > 0 else NEG_ONE
+        for node in range(n - 1, 0, -1):
+            self.segment_tree[node] = choose_preferred(
+                self.segment_tree[node << 1], self.segment_tree[(node << 1) + 1], self.side)
+        self.rebuild_aggregates()
+
+        levels = [idx for idx in range(n) if self.price_quantity[idx] > 0]
+        if self.side == SIDE_BID:
+            levels.reverse()
+        self.top_cache = levels[:CACHE_SIZE]
+
+    def rebuild_aggregates(self):
+        """
+        Recompute agg_tree from price_quantity.
+        """
+        n = self.num_levels
+        agg_tree = self.agg_tree
+        for idx in range(n):
+            qty = self.price_quantity[idx]
+            agg_tree[idx + n] = (qty << COUNT_BITS) | 1 if qty > 0 else 0
+        for node in range(n - 1, 0, -1):
+            agg_tree[node] = agg_tree[node << 1] + agg_tree[(node << 1) + 1]
+
+    def raw_index(self, price):
+        """
+        Price index of price without parking or clamping (may fall outside the window).
+        """
+        return (price - self.min_price) // self.tick_size
+
+    def best_levels(self):
+        """
+        The best CACHE_SIZE non-empty price indices, best first.
+        """
+        return self.top_cache
+
+    def recenter_shift(self, levels):
+        """
+        How many levels to move the window (0 = leave it), given the raw indices of the
+        best CACHE_SIZE levels, best first (see StockOrderBook.recenter_levels).
+        The window moves once any of them, down to the CACHE_SIZE-th, sits within
+        RECENTER_MARGIN of an edge; the move centres them all. If they span more than
+        the window can hold, the best level goes RECENTER_MARGIN from its edge and the
+        deepest ones stay parked.
+        """
+        if not levels:
+            return 0
+        n = self.num_levels
+        lo = min(levels)
+        hi = max(levels)
+        if RECENTER_MARGIN <= lo and hi < n - RECENTER_MARGIN:
+            return 0
+        if hi - lo < n - 2 * RECENTER_MARGIN - 1:
+            return (lo + hi) // 2 - n // 2
+        if self.side == SIDE_BID:
+            return hi - (n - RECENTER_MARGIN - 1)
+        return lo - RECENTER_MARGIN
+
+    def shift_window(self, shift):
+        """
+        Move the price window up by shift levels (down if negative) with one move of
+        price_quantity. Levels that fall off the window are folded into the edge level,
+        the same way out-of-band prices are parked. The caller fixes up order_price_index
+        for resting orders and then calls rebuild().
+        """
+        n = self.num_levels
+        qty = self.price_quantity
+        k = min(abs(shift), n)
+        if shift > 0:
+            folded = int(sum(qty[:k]))
+            qty[:n - k] = qty[k:]
+            qty[n - k:] = [0] * k
+            qty[0] += folded
+        else:
+            folded = int(sum(qty[n - k:]))
+            qty[k:] = qty[:n - k]
+            qty[:k] = [0] * k
+            qty[n - 1] += folded
+
+        self.min_price += shift * self.tick_size
+        self.max_price += shift * self.tick_size
+        self.recenter_count += 1
+        self.levels_shifted += abs(shift)
+
+    def apply_deltas(self, indices, deltas):
+        """
+        Add signed quantities at distinct price indices, then bubble each one up once.
+        """
+        qty = self.price_quantity
+        for idx, delta in zip(indices, deltas):
+            qty[idx] += delta
+        for idx in indices:
+            self.bubble_up(idx)
+
     def add_quantity(self, price, quantity):
         """
         Add quantity at a given price, update the tree.
@@ -126,36 +444,22 @@ class TreeOrderBook:
         """
         Return the top-5 price/quantity pairs for this side, according to 'best' definition.
         For BIDs, best is highest; for ASKs, best is lowest.
-        We do a temporary removal from the segment tree to find the top 5, then restore.
-        """
-        saved_indices = []
-        saved_qty = []
-        # Extract top-5
-        for _ in range(5):
-            best_idx = self.segment_tree[1]
-            if best_idx == 0xFFFFFFFF:
-                # No more valid prices
-                break
-            current_qty = self.price_quantity[best_idx]
-            saved_indices.append(best_idx)
-            saved_qty.append(current_qty)
-
-            # Temporarily remove so we can find the next best
-            self.price_quantity[best_idx] = 0
-            self.bubble_up(best_idx)
-
-        # Restore them
-        for idx, qty in zip(saved_indices, saved_qty):
-            self.price_quantity[idx] = qty
-            self.bubble_up(idx)
+        Served from top_cache, so the tree is not touched.
+        """
+        cache = self.top_cache
+        return self.format_top_5(cache, [self.price_quantity[idx] for idx in cache])
 
-        # Format output
+    def format_top_5(self, indices, qtys):
+        """
+        Turn up to 5 best (index, qty) pairs into the (prices, qtys) lists that
+        get_top_5 returns, padding the missing levels.
+        """
         result_prices = []
         result_qtys = []
         for i in range(5):
-            if i < len(saved_indices):
-                result_prices.append(self.index_to_price(saved_indices[i]))
-                result_qtys.append(saved_qty[i])
+            if i < len(indices):
+                result_prices.append(self.index_to_price(indices[i]))
+                result_qtys.append(qtys[i])
             else:
                 # If fewer than 5 found, fill with "worst" price + default quantity (1)
                 if self.side == SIDE_BID:
@@ -176,6 +480,10 @@ class OrderList:
       - order_price_index[i]: stored price index in the tree
       - order_quantity[i]
       - order_ask_bid[i]: which side? (0=bid, 1=ask, 2=invalid, 3=deleted)
+      - order_stock[i]: stock_id the order was added under
+      - order_price[i]: original price (lets a re-centered book re-bin parked orders)
+    The order id is used directly as the slot, so only ids below MAX_ORDER_NUM fit
+    (same as the HLS block). See HashOrderList for arbitrary 64-bit order refs.
     """
 
     def __init__(self):
@@ -185,6 +493,8 @@ class OrderList:
         self.order_quantity = [0] * self.MAX_ORDERS
         # 0=bid, 1=ask, 2=never assigned, 3=deleted
         self.order_ask_bid = [2] * self.MAX_ORDERS
+        self.order_stock = [0] * self.MAX_ORDERS
+        self.order_price = [0] * self.MAX_ORDERS
 
     def is_valid(self, order_id):
         if order_id >= self.MAX_ORDERS:
@@ -201,73 +511,422 @@ class OrderList:
             return 2
         return self.order_ask_bid[order_id]
 
+    def slot_of(self, order_id):
+        """
+        Slot holding this active order in the order_* arrays, or -1.
+        """
+        return order_id if self.is_valid(order_id) else -1
+
+    def insert(self, order_id):
+        """
+        Claim the slot for a new order and mark it valid. Returns -1 if the id doesn't fit.
+        """
+        if order_id >= self.MAX_ORDERS:
+            return -1
+        self.order_valid[order_id] = True
+        return order_id
+
+    def release(self, slot):
+        self.delete_order_completely(slot)
+
+    def active_slots(self):
+        return [slot for slot in range(self.MAX_ORDERS) if self.order_valid[slot]]
+
     def delete_order_completely(self, order_id):
         self.order_valid[order_id] = False
         self.order_quantity[order_id] = 0
         self.order_ask_bid[order_id] = 3
 
 
+class HashOrderList:
+    """
+    Order index keyed by arbitrary 64-bit order reference numbers (real ITCH refs).
+    Open-addressing hash table (Fibonacci hashing, linear probing) over compact parallel arrays:
+      - order_ref[slot]: the order reference number
+      - slot_state[slot]: SLOT_EMPTY / SLOT_USED / SLOT_TOMBSTONE
+      - order_price_index[slot], order_quantity[slot], order_ask_bid[slot], order_stock[slot],
+        order_price[slot]: as in OrderList
+    Deleted orders leave tombstones that later inserts reuse. The table doubles once
+    used + tombstone slots pass MAX_LOAD, or is rebuilt at the same size if it is mostly
+    tombstones, so every slot costs a fixed number of bytes (see memory_stats).
+    """
+
+    MAX_LOAD = 0.7
+    MAX_ORDERS = MASK_64 + 1  # any 64-bit order ref fits
+
+    def __init__(self, capacity=1024):
+        size = 8
+        while size < capacity:
+            size <<= 1
+        self.allocate(size)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.shift = 64 - (capacity.bit_length() - 1)
+        self.live = 0
+        self.tombstones = 0
+
+        self.order_ref = array('Q', bytes(8 * capacity))
+        self.slot_state = array('B', bytes(capacity))
+        self.order_price_index = array('i', bytes(4 * capacity))
+        self.order_quantity = array('I', bytes(4 * capacity))
+        self.order_ask_bid = array('B', bytes(capacity))
+        self.order_stock = array('I', bytes(4 * capacity))
+        self.order_price = array('I', bytes(4 * capacity))
+
+    def home_slot(self, order_id):
+        return ((order_id * HASH_MULT) & MASK_64) >> self.shift
+
+    def slot_of(self, order_id):
+        """
+        Slot holding this active order in the order_* arrays, or -1.
+        """
+        state = self.slot_state
+        refs = self.order_ref
+        mask = self.mask
+        slot = self.home_slot(order_id)
+        while True:
+            st = state[slot]
+            if st == SLOT_EMPTY:
+                return -1
+            if st == SLOT_USED and refs[slot] == order_id:
+                return slot
+            slot = (slot + 1) & mask
+
+    def insert(self, order_id):
+        """
+        Return the slot for order_id, claiming one if it isn't active yet
+        (an id that is already active keeps its slot, like OrderList).
+        Returns -1 for ids outside 0..2^64-1.
+        """
+        if order_id < 0 or order_id > MASK_64:
+            return -1
+        if self.live + self.tombstones + 1 > self.capacity * self.MAX_LOAD:
+            self.resize()
+
+        state = self.slot_state
+        refs = self.order_ref
+        mask = self.mask
+        slot = self.home_slot(order_id)
+        first_free = -1
+        while True:
+            st = state[slot]
+            if st == SLOT_EMPTY:
+                break
+            if st == SLOT_TOMBSTONE:
+                if first_free < 0:
+                    first_free = slot
+            elif refs[slot] == order_id:
+                return slot
+            slot = (slot + 1) & mask
+
+        if first_free >= 0:
+            slot = first_free
+            self.tombstones -= 1
+        state[slot] = SLOT_USED
+        refs[slot] = order_id
+        self.live += 1
+        return slot
+
+    def release(self, slot):
+        """
+        Delete the order in this slot. A tombstone directly before an empty slot ends
+        every probe chain anyway, so trailing tombstones are turned back into empties.
+        """
+        state = self.slot_state
+        mask = self.mask
+        state[slot] = SLOT_TOMBSTONE
+        self.order_quantity[slot] = 0
+        self.live -= 1
+        self.tombstones += 1
+        if state[(slot + 1) & mask] == SLOT_EMPTY:
+            while state[slot] == SLOT_TOMBSTONE:
+                state[slot] = SLOT_EMPTY
+                self.tombstones -= 1
+                slot = (slot - 1) & mask
+
+    def resize(self):
+        """
+        Rehash all live orders into a fresh table, dropping tombstones.
+        Doubles the capacity unless live orders fill less than half of MAX_LOAD.
+        """
+        old_refs = self.order_ref
+        old_state = self.slot_state
+        old_price_index = self.order_price_index
+        old_quantity = self.order_quantity
+        old_side = self.order_ask_bid
+        old_stock = self.order_stock
+        old_price = self.order_price
+
+        capacity = self.capacity
+        if self.live + 1 > capacity * self.MAX_LOAD / 2:
+            capacity <<= 1
+        self.allocate(capacity)
+
+        for old_slot in range(len(old_state)):
+            if old_state[old_slot] == SLOT_USED:
+                slot = self.insert(old_refs[old_slot])
+                self.order_price_index[slot] = old_price_index[old_slot]
+                self.order_quantity[slot] = old_quantity[old_slot]
+                self.order_ask_bid[slot] = old_side[old_slot]
+                self.order_stock[slot] = old_stock[old_slot]
+                self.order_price[slot] = old_price[old_slot]
+
+    def active_slots(self):
+        state = self.slot_state
+        return [slot for slot in range(self.capacity) if state[slot] == SLOT_USED]
+
+    def is_valid(self, order_id):
+        return self.slot_of(order_id) >= 0
+
+    def side_of(self, order_id):
+        """
+        Return the side (0 or 1) of this order, or 2 if it isn't active.
+        """
+        slot = self.slot_of(order_id)
+        if slot < 0:
+            return 2
+        return self.order_ask_bid[slot]
+
+    def delete_order_completely(self, order_id):
+        slot = self.slot_of(order_id)
+        if slot >= 0:
+            self.release(slot)
+
+    def memory_stats(self):
+        """
+        Report the table footprint. Every slot costs bytes_per_slot whatever the order ref;
+        right after a doubling the table is between MAX_LOAD / 2 and MAX_LOAD full.
+        """
+        bytes_per_slot = sum(a.itemsize for a in (
+            self.order_ref, self.slot_state, self.order_price_index,
+            self.order_quantity, self.order_ask_bid, self.order_stock,
+            self.order_price))
+        total_bytes = bytes_per_slot * self.capacity
+        return {
+            "capacity": self.capacity,
+            "live_orders": self.live,
+            "tombstones": self.tombstones,
+            "load_factor": (self.live + self.tombstones) / self.capacity,
+            "bytes_per_slot": bytes_per_slot,
+            "total_bytes": total_bytes,
+            "bytes_per_order": total_bytes / self.live if self.live else 0.0,
+        }
+
+
+class BookTable(dict):
+    """
+    stock_id -> TreeOrderBook for one side. A missing book is built on first access,
+    so symbols that never see an order cost nothing.
+    """
+
+    def __init__(self, factory):
+        super().__init__()
+        self.factory = factory
+
+    def __missing__(self, stock_id):
+        book = self.factory(stock_id)
+        self[stock_id] = book
+        return book
+
+
 class StockOrderBook:
     """
-    For each of the NUM_STOCKS, we have one bid TreeOrderBook and one ask TreeOrderBook,
-    plus a single global OrderList that references all existing orders.
+    For each of the num_stocks (NUM_STOCKS by default), we have one bid TreeOrderBook and
+    one ask TreeOrderBook, plus a single global OrderList that references all existing orders.
+    bid_books / ask_books are BookTables keyed by stock_id (the ITCH stock locate).
+    price_bands maps stock_id -> (min_price, tick) (see load_price_bands); symbols without
+    an entry use DEFAULT_PRICE_BAND. With lazy=True no book is built until a symbol is used
+    and publish_snapshot only covers symbols that have books; otherwise all num_stocks
+    books are built up front as in the HLS block.
+    book_class picks the per-side engine (see OrderbookNumpy for the array-backed one).
+    order_list defaults to the fixed-size OrderList (HLS behaviour); pass a HashOrderList
+    to accept arbitrary 64-bit order reference numbers.
+    recenter=True lets each book's price window follow the market (see recenter_book);
+    book_orders then keeps the ids of each book's resting orders, keyed by (stock_id, side),
+    so a window move only walks that book.
+    Every event marks its (stock_id, side) in dirty, so publish_delta only has to look at
+    the books that saw activity since the last publish.
     """
 
-    def __init__(self):
-        self.bid_books = []
-        self.ask_books = []
-        self.order_list = OrderList()
-
-        # Initialize each stock's bid/ask
-        for i in range(NUM_STOCKS):
-            min_p = MIN_PRICE_INIT[i]
-            tick = TICK_INIT[i]
-            bid_ob = TreeOrderBook(min_price=min_p, tick_size=tick, side=SIDE_BID)
-            ask_ob = TreeOrderBook(min_price=min_p, tick_size=tick, side=SIDE_ASK)
-            self.bid_books.append(bid_ob)
-            self.ask_books.append(ask_ob)
+    book_class = TreeOrderBook
+
+    def __init__(self, order_list=None, recenter=False, num_stocks=NUM_STOCKS,
+                 price_bands=None, lazy=False):
+        self.order_list = order_list if order_list is not None else OrderList()
+        self.recenter = recenter
+        self.num_stocks = num_stocks
+        self.book_orders = {}
+        if price_bands is None:
+            price_bands = {i: (MIN_PRICE_INIT[i], TICK_INIT[i]) for i in range(NUM_STOCKS)}
+        self.price_bands = price_bands
+
+        # Delta publishing state: touched books, last published top-5 per book, publish counter
+        self.dirty = set()
+        self.published = {}
+        self.publish_seq = 0
+
+        self.bid_books = BookTable(lambda stock_id: self.make_book(stock_id, SIDE_BID))
+        self.ask_books = BookTable(lambda stock_id: self.make_book(stock_id, SIDE_ASK))
+
+        # Initialize each stock's bid/ask (BookTable builds them on first access)
+        if not lazy:
+            for i in range(num_stocks):
+                self.bid_books[i]
+                self.ask_books[i]
+
+    def make_book(self, stock_id, side):
+        self.dirty.add((stock_id, side))
+        min_p, tick = self.price_bands.get(stock_id, DEFAULT_PRICE_BAND)
+        return self.book_class(min_price=min_p, tick_size=tick, side=side, recenter=self.recenter)
 
     def add_order(self, stock_id, order_id, price, quantity, side):
         """
         Add an order to the correct side’s TreeOrderBook.
         side=0 (bid) or side=1 (ask).
+        Returns True if the order was stored.
         """
-        if stock_id >= NUM_STOCKS:
-            return
+        if stock_id >= self.num_stocks:
+            return False
+
+        slot = self.order_list.insert(order_id)
+        if slot < 0:
+            return False
+
+        book_side = SIDE_BID if side == SIDE_BID else SIDE_ASK
+        book = self.bid_books[stock_id] if book_side == SIDE_BID else self.ask_books[stock_id]
 
-        if order_id >= self.order_list.MAX_ORDERS:
-            return
+        # Move the price window first if the new top-5 would reach near a band edge
+        if book.recenter:
+            self.check_recenter(stock_id, book_side, price)
+            self.book_orders.setdefault((stock_id, book_side), set()).add(order_id)
 
         # Insert quantity
-        if side == SIDE_BID:
-            idx = self.bid_books[stock_id].price_to_index(price)
-            self.bid_books[stock_id].price_quantity[idx] += quantity
-            self.bid_books[stock_id].bubble_up(idx)
-        else:
-            idx = self.ask_books[stock_id].price_to_index(price)
-            self.ask_books[stock_id].price_quantity[idx] += quantity
-            self.ask_books[stock_id].bubble_up(idx)
+        idx = book.price_to_index(price)
+        book.price_quantity[idx] += quantity
+        book.bubble_up(idx)
+        self.dirty.add((stock_id, book_side))
 
         # Set info in the order list
-        self.order_list.order_valid[order_id] = True
-        self.order_list.order_price_index[order_id] = idx
-        self.order_list.order_quantity[order_id] = quantity
-        self.order_list.order_ask_bid[order_id] = side
+        self.order_list.order_price_index[slot] = idx
+        self.order_list.order_quantity[slot] = quantity
+        self.order_list.order_ask_bid[slot] = side
+        self.order_list.order_stock[slot] = stock_id
+        self.order_list.order_price[slot] = price
+        return True
+
+    def recenter_levels(self, stock_id, side, price=None):
+        """
+        Raw indices (see TreeOrderBook.raw_index) of the best CACHE_SIZE levels of one
+        book, best first, counting an order about to be added at price. Read from the
+        book's best levels. Orders parked on an edge level can have any price beyond it,
+        but the edge index alone already puts the levels within RECENTER_MARGIN of an
+        edge, and recenter_shift then gives 0 only when the best level sits right at its
+        margin, which the parked prices can't change. So the book's resting orders are
+        walked for their real levels only when the window is about to move; a check
+        that leaves it stays O(CACHE_SIZE).
+        """
+        book = self.book_for(stock_id, side)
+        best = book.best_levels()
+        levels = set(best)
+        if price is not None:
+            levels.add(book.raw_index(price))
+        top = heapq.nlargest(CACHE_SIZE, levels) if side == SIDE_BID else heapq.nsmallest(CACHE_SIZE, levels)
+        edges = [idx for idx in (0, book.num_levels - 1) if idx in best and idx in top]
+        if not edges or book.recenter_shift(top) == 0:
+            return top
+
+        ol = self.order_list
+        levels = set()
+        for order_id in self.book_orders.get((stock_id, side), ()):
+            slot = ol.slot_of(order_id)
+            if slot >= 0:
+                levels.add(book.raw_index(ol.order_price[slot]))
+        if price is not None:
+            levels.add(book.raw_index(price))
+        if side == SIDE_BID:
+            return heapq.nlargest(CACHE_SIZE, levels)
+        return heapq.nsmallest(CACHE_SIZE, levels)
+
+    def check_recenter(self, stock_id, side, price=None):
+        """
+        Move one book's window if its top-5 (with an order about to be added at price)
+        reaches within RECENTER_MARGIN of an edge. Runs before adds and after removals.
+        """
+        book = self.book_for(stock_id, side)
+        shift = book.recenter_shift(self.recenter_levels(stock_id, side, price))
+        if shift != 0:
+            self.recenter_book(stock_id, side, shift)
+
+    def recenter_book(self, stock_id, side, shift):
+        """
+        Shift one book's price window by shift levels and move the price index of every
+        resting order on that book by the same amount. Orders that were parked on an edge
+        level (or just got folded onto one) are re-binned from their real price.
+        Only the book's own orders (book_orders) are visited.
+        """
+        book = self.book_for(stock_id, side)
+        book.shift_window(shift)
+        self.dirty.add((stock_id, side))
+
+        ol = self.order_list
+        last = book.num_levels - 1
+        orders = self.book_orders.get((stock_id, side), set())
+        for order_id in list(orders):
+            slot = ol.slot_of(order_id)
+            order_side = SIDE_BID if slot >= 0 and ol.order_ask_bid[slot] == SIDE_BID else SIDE_ASK
+            if slot < 0 or ol.order_stock[slot] != stock_id or order_side != side:
+                # Gone, or re-added under another book
+                orders.discard(order_id)
+                continue
+            moved = min(max(ol.order_price_index[slot] - shift, 0), last)
+            idx = book.price_to_index(ol.order_price[slot])
+            if idx != moved:
+                qty = ol.order_quantity[slot]
+                book.price_quantity[moved] -= qty
+                book.price_quantity[idx] += qty
+            ol.order_price_index[slot] = idx
+        book.rebuild()
+
+    def rebuild_book_orders(self):
+        """
+        Rebuild book_orders from the order list (after it was loaded from elsewhere,
+        e.g. a checkpoint). Walks every slot once.
+        """
+        ol = self.order_list
+        refs = getattr(ol, 'order_ref', None)
+        self.book_orders = {}
+        for slot in ol.active_slots():
+            side = SIDE_BID if ol.order_ask_bid[slot] == SIDE_BID else SIDE_ASK
+            order_id = refs[slot] if refs is not None else slot
+            self.book_orders.setdefault((ol.order_stock[slot], side), set()).add(order_id)
+
+    def recenter_stats(self):
+        """
+        Totals of window moves across all books.
+        """
+        books = list(self.bid_books.values()) + list(self.ask_books.values())
+        return {
+            "recenters": sum(book.recenter_count for book in books),
+            "levels_shifted": sum(book.levels_shifted for book in books),
+        }
 
     def cancel_order(self, stock_id, order_id, cancel_qty):
         """
         Cancel (reduce) some shares from an existing order. If cancel_qty is 0xFFFFFFFF,
-        it means remove all.
+        it means remove all. Returns True if an active order was hit.
         """
-        if stock_id >= NUM_STOCKS:
-            return
+        if stock_id >= self.num_stocks:
+            return False
 
-        if not self.order_list.is_valid(order_id):
-            return
+        slot = self.order_list.slot_of(order_id)
+        if slot < 0:
+            return False
 
-        side = self.order_list.order_ask_bid[order_id]
-        idx = self.order_list.order_price_index[order_id]
-        old_qty = self.order_list.order_quantity[order_id]
+        side = self.order_list.order_ask_bid[slot]
+        idx = self.order_list.order_price_index[slot]
+        old_qty = self.order_list.order_quantity[slot]
 
         if cancel_qty == 0xFFFFFFFF:
             remove_qty = old_qty
@@ -277,14 +936,124 @@ class StockOrderBook:
         # Remove from tree
         if side == SIDE_BID:
             actual_removed = self.bid_books[stock_id].remove_quantity(idx, remove_qty)
+            self.dirty.add((stock_id, SIDE_BID))
         else:
             actual_removed = self.ask_books[stock_id].remove_quantity(idx, remove_qty)
+            self.dirty.add((stock_id, SIDE_ASK))
 
         new_qty = old_qty - actual_removed
-        self.order_list.order_quantity[order_id] = new_qty
+        self.order_list.order_quantity[slot] = new_qty
         if new_qty == 0:
             # Mark as deleted
-            self.order_list.delete_order_completely(order_id)
+            self.order_list.release(slot)
+
+        if self.recenter:
+            # A deeper level may have moved up into the top-5, next to an edge
+            book_side = SIDE_BID if side == SIDE_BID else SIDE_ASK
+            if new_qty == 0:
+                self.book_orders.get((stock_id, book_side), set()).discard(order_id)
+            self.check_recenter(stock_id, book_side)
+        return True
+
+    def apply_batch(self, order_type, stock_id, order_ref, shares, price, side):
+        """
+        Apply a batch of events given as equal-length sequences (lists or NumPy arrays).
+        order_type uses the 136-bit message codes (0x1 add, 0x2 cancel, 0x4 execute, 0x8 delete).
+
+        Order-list bookkeeping runs in event order so cancels can hit orders added earlier
+        in the same batch; level quantities are accumulated as deltas and pushed into each
+        touched book once at the end (TreeOrderBook.apply_deltas), so a level hit many
+        times in a batch is bubbled up once. Returns the number of events that changed
+        the book. With recenter=True a window move needs the live best levels, so the
+        batch goes through apply_events instead.
+        """
+        if self.recenter:
+            return self.apply_events(order_type, stock_id, order_ref, shares, price, side)
+
+        ol = self.order_list
+        order_price_index = ol.order_price_index
+        order_quantity = ol.order_quantity
+        order_ask_bid = ol.order_ask_bid
+        books = (self.bid_books, self.ask_books)
+
+        # (book side, stock, price index) -> pending quantity delta
+        pending = {}
+        applied = 0
+
+        for o_type, stock, ref, qty, p, s in zip(
+                as_list(order_type), as_list(stock_id), as_list(order_ref),
+                as_list(shares), as_list(price), as_list(side)):
+            if stock >= self.num_stocks:
+                continue
+
+            if o_type == ORDER_ADD:
+                slot = ol.insert(ref)
+                if slot < 0:
+                    continue
+                if ol.order_quantity is not order_quantity:
+                    # A HashOrderList insert resized the columns; the cached ones are stale
+                    order_price_index = ol.order_price_index
+                    order_quantity = ol.order_quantity
+                    order_ask_bid = ol.order_ask_bid
+                book_side = SIDE_BID if s == SIDE_BID else SIDE_ASK
+                idx = books[book_side][stock].price_to_index(p)
+                key = (book_side, stock, idx)
+                pending[key] = pending.get(key, 0) + qty
+
+                order_price_index[slot] = idx
+                order_quantity[slot] = qty
+                order_ask_bid[slot] = s
+                ol.order_stock[slot] = stock
+                ol.order_price[slot] = p
+                applied += 1
+
+            elif o_type in (ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE):
+                slot = ol.slot_of(ref)
+                if slot < 0:
+                    continue
+                book_side = SIDE_BID if order_ask_bid[slot] == SIDE_BID else SIDE_ASK
+                idx = order_price_index[slot]
+                old_qty = order_quantity[slot]
+                remove_qty = old_qty if o_type == ORDER_DELETE else min(qty, old_qty)
+
+                # Can't remove more than the level holds (matches remove_quantity)
+                key = (book_side, stock, idx)
+                level_qty = int(books[book_side][stock].price_quantity[idx]) + pending.get(key, 0)
+                remove_qty = min(remove_qty, level_qty)
+                pending[key] = pending.get(key, 0) - remove_qty
+
+                new_qty = old_qty - remove_qty
+                order_quantity[slot] = new_qty
+                if new_qty == 0:
+                    ol.release(slot)
+                applied += 1
+
+        # Group the deltas per book and update each touched book once
+        per_book = {}
+        for (book_side, stock, idx), delta in pending.items():
+            if delta != 0:
+                indices, deltas = per_book.setdefault((book_side, stock), ([], []))
+                indices.append(idx)
+                deltas.append(delta)
+        for (book_side, stock), (indices, deltas) in per_book.items():
+            books[book_side][stock].apply_deltas(indices, deltas)
+            self.dirty.add((stock, book_side))
+
+        return applied
+
+    def apply_events(self, order_type, stock_id, order_ref, shares, price, side):
+        """
+        apply_batch one event at a time, through add_order/cancel_order.
+        """
+        applied = 0
+        for o_type, stock, ref, qty, p, s in zip(
+                as_list(order_type), as_list(stock_id), as_list(order_ref),
+                as_list(shares), as_list(price), as_list(side)):
+            if o_type == ORDER_ADD:
+                applied += self.add_order(stock, ref, p, qty, s)
+            elif o_type in (ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE):
+                applied += self.cancel_order(stock, ref, 0xFFFFFFFF if o_type == ORDER_DELETE else qty)
+        return applied
 
     def get_top_5(self, stock_id, side):
         """
@@ -296,9 +1065,31 @@ class StockOrderBook:
         else:
             return self.ask_books[stock_id].get_top_5()
 
+    def book_for(self, stock_id, side):
+        return self.bid_books[stock_id] if side == SIDE_BID else self.ask_books[stock_id]
+
+    def get_depth(self, stock_id, side, levels):
+        """
+        Cumulative quantity over the best `levels` non-empty levels of one side.
+        Returns (price of the last level counted, cumulative quantity).
+        """
+        return self.book_for(stock_id, side).depth(levels)
+
+    def get_volume_between(self, stock_id, side, low_price, high_price):
+        """
+        Total quantity resting on one side at prices in [low_price, high_price].
+        """
+        return self.book_for(stock_id, side).volume_between(low_price, high_price)
+
+    def get_price_for_quantity(self, stock_id, side, quantity):
+        """
+        Price at which cumulative size from the best level reaches quantity (None if never).
+        """
+        return self.book_for(stock_id, side).price_for_quantity(quantity)
+
     def publish_snapshot(self):
         """
-        Return a snapshot of top-5 bids and asks for all stocks.
+        Return a snapshot of top-5 bids and asks for all stocks that have books.
         The original HLS code wrote them out as a stream, but here we simply return them.
         Format:
             [
@@ -312,7 +1103,7 @@ class StockOrderBook:
             ]
         """
         result = []
-        for s in range(NUM_STOCKS):
+        for s in sorted(self.bid_books.keys() | self.ask_books.keys()):
             ask_p, ask_q = self.ask_books[s].get_top_5()
             bid_p, bid_q = self.bid_books[s].get_top_5()
             result.append({
@@ -322,15 +1113,59 @@ class StockOrderBook:
                 "bid_prices": bid_p,
                 "bid_qty": bid_q
             })
+            self.published[(s, SIDE_ASK)] = (ask_p, ask_q)
+            self.published[(s, SIDE_BID)] = (bid_p, bid_q)
+        self.dirty.clear()
+        self.publish_seq += 1
         return result
 
+    def publish_delta(self):
+        """
+        Return only the books whose top-5 changed since the last publish (delta or full):
+            {
+              "seq": n,
+              "updates": [
+                {"stock": s, "bid_prices": [...5...], "bid_qty": [...5...]},   # changed side(s) only
+                ...
+              ]
+            }
+        A stock's first update carries both sides, so a consumer merging updates always
+        holds a complete entry per stock. Cost scales with the number of touched books.
+        """
+        self.publish_seq += 1
+        changed = {}
+        for stock_id, side in sorted(self.dirty):
+            sides = [side]
+            other = SIDE_ASK if side == SIDE_BID else SIDE_BID
+            if (stock_id, other) not in self.published:
+                sides.append(other)
+            for sd in sides:
+                top = self.get_top_5(stock_id, sd)
+                if self.published.get((stock_id, sd)) == top:
+                    continue
+                self.published[(stock_id, sd)] = top
+                entry = changed.setdefault(stock_id, {"stock": stock_id})
+                prefix = "bid" if sd == SIDE_BID else "ask"
+                entry[prefix + "_prices"], entry[prefix + "_qty"] = top
+        self.dirty.clear()
+        return {"seq": self.publish_seq, "updates": [changed[s] for s in sorted(changed)]}
+
 
 # -------------------------------------------------------------------------
 # The main manager that processes 136-bit messages
 # -------------------------------------------------------------------------
 class OrderBookManager:
-    def __init__(self):
-        self.stock_order_book = StockOrderBook()
+    stock_book_class = StockOrderBook
+
+    def __init__(self, config_path=None, **book_options):
+        """
+        book_options are passed to the StockOrderBook (order_list, recenter, num_stocks,
+        price_bands, lazy). config_path: a config CSV (e.g. PRICE_BAND_CSV) to read
+        price_bands from with load_price_bands, unless price_bands is given.
+        """
+        if config_path is not None and 'price_bands' not in book_options:
+            book_options['price_bands'] = load_price_bands(config_path)
+        self.stock_order_book = self.stock_book_class(**book_options)
         self.initialized = True
         self.num_new_order = 0
         self.publish_threshold = 20  # Publish snapshot after 20 new "add" calls
@@ -433,12 +1268,78 @@ class OrderBookManager:
         """
         return self.stock_order_book.get_top_5(stock_id, side)
 
+    def get_depth(self, stock_id, side, levels):
+        """
+        Cumulative depth over the best `levels` non-empty levels: (last price, quantity).
+        """
+        return self.stock_order_book.get_depth(stock_id, side, levels)
+
+    def get_volume_between(self, stock_id, side, low_price, high_price):
+        """
+        Total quantity on one side inside the price band [low_price, high_price].
+        """
+        return self.stock_order_book.get_volume_between(stock_id, side, low_price, high_price)
+
+    def get_price_for_quantity(self, stock_id, side, quantity):
+        """
+        Price where cumulative size from the top of book first reaches quantity.
+        """
+        return self.stock_order_book.get_price_for_quantity(stock_id, side, quantity)
+
     def publish_snapshot(self):
         """
         Return full snapshot (top-5 bids and asks for each stock).
         """
         return self.stock_order_book.publish_snapshot()
 
+    def publish_delta(self):
+        """
+        Return only the stocks/sides whose top-5 changed since the last publish.
+        """
+        return self.stock_order_book.publish_delta()
+
+    def apply_batch(self, order_type, stock_id, order_ref, shares, price, side):
+        """
+        Apply a batch of add/cancel/execute/delete events given as columns
+        (see StockOrderBook.apply_batch). Returns the number of events applied.
+        """
+        self.num_new_order += sum(1 for o_type in as_list(order_type) if o_type == ORDER_ADD)
+        return self.stock_order_book.apply_batch(order_type, stock_id, order_ref, shares, price, side)
+
+    def process_batch(self, records):
+        """
+        Apply many 136-bit messages in one call.
+        records: bytes/bytearray/memoryview of packed 17-byte records (see
+        OrderbookNumpy.PACKED_136_DTYPE), or a NumPy structured array with
+        type/stock_id/order_ref/shares/price/side fields.
+        Returns per-batch stats:
+          applied              - events that changed the book
+          dropped_invalid      - unknown order_type codes
+          dropped_out_of_range - stock_id or order_ref the book can't hold
+          ignored              - valid cancels/executes/deletes for orders that aren't active
+        """
+        from OrderbookNumpy import batch_columns
+
+        order_type, stock_id, order_ref, shares, price, side = batch_columns(records)
+        valid = ((order_type == ORDER_ADD) | (order_type == ORDER_CANCEL) |
+                 (order_type == ORDER_EXECUTE) | (order_type == ORDER_DELETE))
+        in_range = (stock_id < self.stock_order_book.num_stocks) & \
+                   (order_ref < self.stock_order_book.order_list.MAX_ORDERS)
+        keep = valid & in_range
+
+        # Count adds like process_message_136bit does (before the range checks)
+        self.num_new_order += int((order_type == ORDER_ADD).sum())
+        applied = self.stock_order_book.apply_batch(order_type[keep], stock_id[keep], order_ref[keep],
+                                                    shares[keep], price[keep], side[keep])
+        num_valid = int(valid.sum())
+        num_kept = int(keep.sum())
+        return {
+            "applied": applied,
+            "dropped_invalid": len(order_type) - num_valid,
+            "dropped_out_of_range": num_valid - num_kept,
+            "ignored": num_kept - applied,
+        }
+
 
 # -------------------------------------------------------------------------
 # Example usage / test
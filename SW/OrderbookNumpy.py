@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+import numpy as np
+
+from Orderbook import (
+    NUM_STOCKS, MIN_PRICE_INIT, TICK_INIT, SIDE_BID, SIDE_ASK, NEG_ONE, CACHE_SIZE, COUNT_BITS,
+    ORDER_ADD, ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE,
+    TreeOrderBook, StockOrderBook, OrderBookManager,
+)
+
+
+# -------------------------------------------------------------------------
+# Packed 136-bit records
+# -------------------------------------------------------------------------
+# One HLS input word stored as 17 little-endian bytes (int.from_bytes(rec, 'little')
+# gives the same integer process_message_136bit takes):
+#   bytes 0..3   stock_id
+#   bytes 4..7   order_ref_num
+#   bytes 8..11  num_shares
+#   bytes 12..15 price
+#   byte  16     order_type (bits 0..3) | buy_sell (bit 4)
+PACKED_136_DTYPE = np.dtype([
+    ('stock_id', '<u4'),
+    ('order_ref', '<u4'),
+    ('shares', '<u4'),
+    ('price', '<u4'),
+    ('type_side', 'u1'),
+])
+RECORD_BYTES = PACKED_136_DTYPE.itemsize  # 17
+BATCH_FIELDS = ('type', 'stock_id', 'order_ref', 'shares', 'price', 'side')
+
+
+def batch_columns(records):
+    """
+    Split a batch into (type, stock_id, order_ref, shares, price, side) NumPy columns.
+    records is either a bytes-like buffer of packed 17-byte records (zero-copy view)
+    or a NumPy structured array with the BATCH_FIELDS fields.
+    """
+    if isinstance(records, np.ndarray) and records.dtype.names is not None:
+        missing = [name for name in BATCH_FIELDS if name not in records.dtype.names]
+        if missing:
+            raise ValueError(f"Structured batch is missing fields: {missing}")
+        return tuple(records[name] for name in BATCH_FIELDS)
+
+    buf = memoryview(records).cast('B')
+    if len(buf) % RECORD_BYTES != 0:
+        raise ValueError(f"Batch length {len(buf)} is not a multiple of {RECORD_BYTES} bytes")
+    packed = np.frombuffer(buf, dtype=PACKED_136_DTYPE)
+    type_side = packed['type_side']
+    return (type_side & 0xF, packed['stock_id'], packed['order_ref'],
+            packed['shares'], packed['price'], (type_side >> 4) & 0x1)
+
+
+def pack_136bit(messages):
+    """
+    Pack 136-bit message integers into the 17-byte record format.
+    """
+    return b''.join(int(m).to_bytes(RECORD_BYTES, byteorder='little') for m in messages)
+
+
+# -------------------------------------------------------------------------
+# Array-backed engine
+# -------------------------------------------------------------------------
+# Same tree layout as TreeOrderBook (leaves at num_levels..2*num_levels-1,
+# root at 1, NEG_ONE for "no price"), but both structures live in NumPy arrays
+# so a whole batch of events can be folded into per-level quantity deltas and
+# the touched paths rebuilt one tree level at a time.
+
+class NumpyTreeOrderBook(TreeOrderBook):
+    """
+    TreeOrderBook with segment_tree (uint32), price_quantity (int64) and agg_tree (int64)
+    stored as NumPy arrays.
+    - apply_deltas(): add signed quantities at many price indices, then rebuild only their paths.
+    - rebuild_paths(): vectorized bubble_up for a set of leaves, one tree level per step.
+    """
+
+    def __init__(self, min_price=1000000, tick_size=10000, side=SIDE_BID, recenter=False):
+        super().__init__(min_price=min_price, tick_size=tick_size, side=side, recenter=recenter)
+        self.segment_tree = np.full(2 * self.num_levels, NEG_ONE, dtype=np.uint32)
+        self.price_quantity = np.zeros(self.num_levels, dtype=np.int64)
+        self.agg_tree = np.zeros(2 * self.num_levels, dtype=np.int64)
+
+    def combine(self, left, right):
+        """
+        Vectorized choose_preferred over two uint32 arrays of child indices.
+        For BIDs, NEG_ONE + 1 wraps to 0, so a plain max ignores empty children.
+        """
+        if self.side == SIDE_BID:
+            return np.maximum(left + 1, right + 1) - 1
+        return np.minimum(left, right)
+
+    def rebuild_paths(self, leaf_indices):
+        """
+        Recompute the segment tree from the given leaves up to the root.
+        Each loop iteration handles one level for all affected nodes at once.
+        """
+        leaves = np.unique(np.asarray(leaf_indices, dtype=np.int64))
+        if leaves.size == 0:
+            return
+        tree = self.segment_tree
+        agg_tree = self.agg_tree
+        nodes = leaves + self.num_levels
+        qty = self.price_quantity[leaves]
+        tree[nodes] = np.where(qty > 0, leaves, NEG_ONE)
+        agg_tree[nodes] = (qty << COUNT_BITS) | (qty > 0)
+
+        nodes = np.unique(nodes >> 1)
+        while nodes[0] > 0:
+            left, right = nodes << 1, (nodes << 1) + 1
+            tree[nodes] = self.combine(tree[left], tree[right])
+            agg_tree[nodes] = agg_tree[left] + agg_tree[right]
+            nodes = np.unique(nodes >> 1)
+
+    def rebuild(self):
+        """
+        Rebuild the whole tree from price_quantity.
+        """
+        tree = self.segment_tree
+        n = self.num_levels
+        leaves = np.arange(n, dtype=np.uint32)
+        tree[n:2 * n] = np.where(self.price_quantity > 0, leaves, NEG_ONE)
+        while n > 1:
+            half = n >> 1
+            tree[half:n] = self.combine(tree[n:2 * n:2], tree[n + 1:2 * n:2])
+            n = half
+        self.rebuild_aggregates()
+
+    def rebuild_aggregates(self):
+        """
+        Recompute agg_tree from price_quantity, one tree level per step.
+        """
+        n = self.num_levels
+        agg_tree = self.agg_tree
+        qty = self.price_quantity
+        agg_tree[n:2 * n] = (qty << COUNT_BITS) | (qty > 0)
+        while n > 1:
+            half = n >> 1
+            agg_tree[half:n] = agg_tree[n:2 * n:2] + agg_tree[n + 1:2 * n:2]
+            n = half
+
+    def bubble_up(self, leaf_idx):
+        self.rebuild_paths((leaf_idx,))
+
+    def apply_deltas(self, indices, deltas):
+        """
+        Add signed quantities at the given price indices, then rebuild their paths.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        np.add.at(self.price_quantity, indices, np.asarray(deltas, dtype=np.int64))
+        self.rebuild_paths(indices)
+
+    def remove_quantity(self, idx, quantity):
+        quantity = min(quantity, int(self.price_quantity[idx]))
+        self.price_quantity[idx] -= quantity
+        self.bubble_up(idx)
+        return quantity
+
+    def best_levels(self):
+        """
+        The best CACHE_SIZE non-empty price indices, best first (there is no top_cache).
+        """
+        levels = np.flatnonzero(self.price_quantity > 0)
+        if self.side == SIDE_BID:
+            levels = levels[::-1]
+        return levels[:CACHE_SIZE].tolist()
+
+    def get_top_5(self):
+        """
+        Same output as TreeOrderBook.get_top_5, read straight from the non-empty levels
+        instead of temporarily removing entries from the tree.
+        """
+        levels = np.flatnonzero(self.price_quantity > 0)
+        if self.side == SIDE_BID:
+            best = levels[::-1][:5]
+        else:
+            best = levels[:5]
+        return self.format_top_5(best.tolist(), self.price_quantity[best].tolist())
+
+
+class NumpyStockOrderBook(StockOrderBook):
+    """
+    StockOrderBook on NumpyTreeOrderBook sides: apply_batch's per-book deltas go into
+    each tree with one vectorized path rebuild (NumpyTreeOrderBook.apply_deltas).
+    The single-event add_order/cancel_order paths are inherited and still work.
+    """
+
+    book_class = NumpyTreeOrderBook
+
+
+class NumpyOrderBookManager(OrderBookManager):
+    """
+    OrderBookManager on the NumPy engine (apply_batch / process_batch take the vectorized path).
+    """
+
+    stock_book_class = NumpyStockOrderBook
+
+
+# -------------------------------------------------------------------------
+# Example usage / equivalence check against the list-based engine
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    import random
+    import time
+
+    from Orderbook import MAX_LEVELS, MAX_ORDER_NUM
+
+    random.seed(7)
+    NUM_EVENTS = 50000
+    events = []
+    live = []
+    for _ in range(NUM_EVENTS):
+        if not live or random.random() < 0.5:
+            stock = random.randrange(NUM_STOCKS)
+            ref = random.randrange(MAX_ORDER_NUM)
+            price = MIN_PRICE_INIT[stock] + TICK_INIT[stock] * random.randrange(MAX_LEVELS)
+            events.append((ORDER_ADD, stock, ref, random.randint(1, 100), price, random.randint(0, 1)))
+            live.append((stock, ref))
+        else:
+            stock, ref = random.choice(live)
+            o_type = random.choice((ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE))
+            events.append((o_type, stock, ref, random.randint(1, 60), 0, 0))
+
+    reference = OrderBookManager()
+    start = time.perf_counter()
+    for o_type, stock, ref, qty, price, side in events:
+        msg = stock | (ref << 32) | (qty << 64) | (price << 96) | (o_type << 128) | (side << 132)
+        reference.process_message_136bit(msg)
+    ref_elapsed = time.perf_counter() - start
+
+    batched = NumpyOrderBookManager()
+    packed = pack_136bit(
+        stock | (ref << 32) | (qty << 64) | (price << 96) | (o_type << 128) | (side << 132)
+        for o_type, stock, ref, qty, price, side in events)
+    start = time.perf_counter()
+    stats = batched.process_batch(packed)
+    batch_elapsed = time.perf_counter() - start
+
+    assert batched.publish_snapshot() == reference.publish_snapshot(), "snapshot mismatch"
+    print(f"list engine : {NUM_EVENTS / ref_elapsed:,.0f} events/sec")
+    print(f"numpy batch : {NUM_EVENTS / batch_elapsed:,.0f} events/sec")
+    print(f"batch stats : {stats}")
+    print("Snapshots match.")
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Order book sharded by stock_id over worker processes.
+
+The feed handler keeps the OrderBookManager interface (add_order / cancel_order /
+execute_order / delete_order / process_batch / publish_snapshot ...), but each event is
+packed into a 17-byte record (OrderbookNumpy.PACKED_136_DTYPE) and routed to shard
+stock_id % num_shards. Records travel through one single-producer/single-consumer
+ring buffer in shared memory per shard; the worker drains its ring in batches into its
+own OrderBookManager (process_batch). Queries go over a control pipe and carry the
+producer's write position, so a worker answers only after it has applied every event
+sent before the query.
+"""
+import multiprocessing as mp
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Orderbook import (
+    NUM_STOCKS, SIDE_BID,
+    ORDER_ADD, ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE,
+)
+from OrderbookNumpy import PACKED_136_DTYPE, RECORD_BYTES, NumpyOrderBookManager
+
+RING_RECORDS = 1 << 16  # ring capacity per shard, in records
+FLUSH_RECORDS = 256  # records buffered per shard on the feed side before a push
+DRAIN_RECORDS = 8192  # max records a worker applies per process_batch call
+IDLE_WAIT = 0.0005  # seconds a worker with an empty ring waits on its control pipe
+
+RECORD = struct.Struct('<IIIIB')  # stock_id, order_ref, shares, price, type | side << 4
+assert RECORD.size == RECORD_BYTES
+
+
+# -------------------------------------------------------------------------
+# Shared-memory ring
+# -------------------------------------------------------------------------
+class ShmRing:
+    """
+    Single-producer/single-consumer ring of 17-byte records in shared memory.
+    - head (records written) and tail (records read) are free-running uint64 counters
+      on separate cache lines; only the producer stores head and only the consumer
+      stores tail, so no lock is needed.
+    - Record data is copied in before head moves, and out before tail moves.
+    """
+
+    HEADER_BYTES = 128  # head at byte 0, tail at byte 64
+
+    def __init__(self, capacity=RING_RECORDS, name=None):
+        self.capacity = capacity
+        size = self.HEADER_BYTES + capacity * RECORD_BYTES
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.attach()
+        if self.owner:
+            self.counters[:] = 0
+
+    def attach(self):
+        self.counters = np.ndarray((16,), dtype=np.uint64, buffer=self.shm.buf)
+        self.data = np.ndarray((self.capacity * RECORD_BYTES,), dtype=np.uint8,
+                               buffer=self.shm.buf, offset=self.HEADER_BYTES)
+
+    def __getstate__(self):
+        # Passed to spawn-started workers: reattach by name
+        return {'capacity': self.capacity, 'name': self.shm.name}
+
+    def __setstate__(self, state):
+        self.capacity = state['capacity']
+        self.shm = shared_memory.SharedMemory(name=state['name'])
+        self.owner = False
+        self.attach()
+
+    @property
+    def head(self):
+        return int(self.counters[0])
+
+    @property
+    def tail(self):
+        return int(self.counters[8])
+
+    def push(self, records):
+        """
+        Append packed records, waiting for the consumer while the ring is full.
+        """
+        src = np.frombuffer(records, dtype=np.uint8)
+        total = len(src) // RECORD_BYTES
+        done = 0
+        while done < total:
+            head = self.head
+            free = self.capacity - (head - self.tail)
+            if free == 0:
+                time.sleep(0)
+                continue
+            n = min(free, total - done)
+            pos = head % self.capacity
+            first = min(n, self.capacity - pos)
+            chunk = src[done * RECORD_BYTES:(done + n) * RECORD_BYTES]
+            self.data[pos * RECORD_BYTES:(pos + first) * RECORD_BYTES] = chunk[:first * RECORD_BYTES]
+            if first < n:
+                self.data[:(n - first) * RECORD_BYTES] = chunk[first * RECORD_BYTES:]
+            self.counters[0] = head + n
+            done += n
+
+    def pop(self, max_records):
+        """
+        Copy out up to max_records records (b'' if the ring is empty).
+        """
+        tail = self.tail
+        n = min(self.head - tail, max_records)
+        if n <= 0:
+            return b''
+        pos = tail % self.capacity
+        first = min(n, self.capacity - pos)
+        out = self.data[pos * RECORD_BYTES:(pos + first) * RECORD_BYTES].tobytes()
+        if first < n:
+            out += self.data[:(n - first) * RECORD_BYTES].tobytes()
+        self.counters[8] = tail + n
+        return out
+
+    def detach(self):
+        del self.counters, self.data
+        self.shm.close()
+
+    def close(self):
+        self.detach()
+        if self.owner:
+            self.shm.unlink()
+
+
+# -------------------------------------------------------------------------
+# Worker process
+# -------------------------------------------------------------------------
+def shard_worker(ring, conn, shard, num_shards, manager_class, book_options):
+    """
+    Worker loop: apply records from the ring, answer queries from the control pipe.
+    Every query is (command, producer_head, *args); the ring is drained up to
+    producer_head before answering.
+    """
+    lazy = book_options.pop('lazy', False)
+    manager = manager_class(lazy=True, **book_options)
+    sob = manager.stock_order_book
+    if not lazy:
+        # Only this shard's symbols, so merged snapshots match an unsharded book
+        for stock_id in range(shard, sob.num_stocks, num_shards):
+            sob.bid_books[stock_id]
+            sob.ask_books[stock_id]
+
+    totals = {"applied": 0, "dropped_invalid": 0, "dropped_out_of_range": 0, "ignored": 0}
+
+    def drain(until=None):
+        while True:
+            records = ring.pop(DRAIN_RECORDS)
+            if not records:
+                if until is None or ring.tail >= until:
+                    return
+                time.sleep(0)
+                continue
+            for key, value in manager.process_batch(records).items():
+                totals[key] += value
+
+    while True:
+        drain()
+        if not conn.poll(IDLE_WAIT):
+            continue
+        command, producer_head, *args = conn.recv()
+        drain(producer_head)
+        if command == 'snapshot':
+            conn.send(manager.publish_snapshot())
+        elif command == 'delta':
+            conn.send(manager.publish_delta())
+        elif command == 'query':
+            method, method_args = args
+            conn.send(getattr(manager, method)(*method_args))
+        elif command == 'stats':
+            conn.send(dict(totals, num_new_order=manager.num_new_order))
+        elif command == 'stop':
+            conn.send(None)
+            break
+    # A forked worker holds the feed side's ShmRing object: detach, never unlink
+    ring.detach()
+
+
+# -------------------------------------------------------------------------
+# Feed-side manager
+# -------------------------------------------------------------------------
+class ShardedOrderBookManager:
+    """
+    OrderBookManager look-alike that spreads symbols over num_shards worker processes.
+    - Events are buffered per shard (FLUSH_RECORDS) and pushed to the shard's ShmRing.
+    - publish_snapshot / publish_delta / get_top_5 / get_depth ... flush, ask the
+      owning shard(s) and merge the answers in stock_id order.
+    - Workers use manager_class (NumpyOrderBookManager by default) for their books;
+      book_options (order_list, num_stocks, price_bands, config_path, recenter, lazy)
+      mean the same as for OrderBookManager, so the same options give the same
+      snapshots sharded or not.
+    Call close() (or use it as a context manager) to stop the workers.
+    """
+
+    def __init__(self, num_shards=None, manager_class=NumpyOrderBookManager,
+                 ring_records=RING_RECORDS, **book_options):
+        self.num_shards = num_shards or mp.cpu_count()
+        self.num_stocks = book_options.get('num_stocks', NUM_STOCKS)
+        self.num_new_order = 0
+        self.publish_seq = 0
+        self.rings = []
+        self.conns = []
+        self.workers = []
+        self.pending = [bytearray() for _ in range(self.num_shards)]
+        for shard in range(self.num_shards):
+            ring = ShmRing(ring_records)
+            parent_conn, child_conn = mp.Pipe()
+            worker = mp.Process(target=shard_worker, daemon=True,
+                                args=(ring, child_conn, shard, self.num_shards,
+                                      manager_class, dict(book_options)))
+            worker.start()
+            self.rings.append(ring)
+            self.conns.append(parent_conn)
+            self.workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- event path ----
+    def route(self, stock_id, order_ref, shares, price, order_type, side):
+        shard = stock_id % self.num_shards
+        buf = self.pending[shard]
+        buf += RECORD.pack(stock_id, order_ref, shares, price, order_type | (side << 4))
+        if len(buf) >= FLUSH_RECORDS * RECORD_BYTES:
+            self.rings[shard].push(buf)
+            buf.clear()
+
+    def flush(self):
+        for shard, buf in enumerate(self.pending):
+            if buf:
+                self.rings[shard].push(buf)
+                buf.clear()
+
+    def process_message_136bit(self, in_data):
+        """
+        Route one 136-bit message (same bit layout as OrderBookManager.process_message_136bit).
+        """
+        order_type = (in_data >> 128) & 0xF
+        if order_type == ORDER_ADD:
+            self.num_new_order += 1
+        self.route(in_data & 0xFFFFFFFF, (in_data >> 32) & 0xFFFFFFFF, (in_data >> 64) & 0xFFFFFFFF,
+                   (in_data >> 96) & 0xFFFFFFFF, order_type, (in_data >> 132) & 0x1)
+
+    def add_order(self, stock_id, order_id, price, quantity, side):
+        self.num_new_order += 1
+        self.route(stock_id, order_id, quantity, price, ORDER_ADD, side)
+
+    def cancel_order(self, stock_id, order_id, cancel_qty):
+        self.route(stock_id, order_id, cancel_qty, 0, ORDER_CANCEL, SIDE_BID)
+
+    def execute_order(self, stock_id, order_id, execute_qty):
+        self.route(stock_id, order_id, execute_qty, 0, ORDER_EXECUTE, SIDE_BID)
+
+    def delete_order(self, stock_id, order_id):
+        self.route(stock_id, order_id, 0xFFFFFFFF, 0, ORDER_DELETE, SIDE_BID)
+
+    def process_batch(self, records):
+        """
+        Route a buffer of packed 17-byte records (see OrderbookNumpy.PACKED_136_DTYPE)
+        to the shards in one pass. Returns the number of records routed; per-shard
+        apply stats are accumulated by the workers (see stats()).
+        """
+        packed = np.frombuffer(records, dtype=PACKED_136_DTYPE)
+        self.num_new_order += int(((packed['type_side'] & 0xF) == ORDER_ADD).sum())
+        self.flush()
+        shards = packed['stock_id'] % self.num_shards
+        for shard in range(self.num_shards):
+            part = packed[shards == shard]
+            if len(part):
+                self.rings[shard].push(part.tobytes())
+        return len(packed)
+
+    # ---- queries ----
+    def ask(self, shard, *message):
+        self.conns[shard].send((message[0], self.rings[shard].head) + message[1:])
+
+    def ask_all(self, *message):
+        self.flush()
+        for shard in range(self.num_shards):
+            self.ask(shard, *message)
+        return [conn.recv() for conn in self.conns]
+
+    def query(self, stock_id, method, *args):
+        self.flush()
+        shard = stock_id % self.num_shards
+        self.ask(shard, 'query', method, (stock_id,) + args)
+        return self.conns[shard].recv()
+
+    def get_top_5(self, stock_id, side):
+        return self.query(stock_id, 'get_top_5', side)
+
+    def get_depth(self, stock_id, side, levels):
+        return self.query(stock_id, 'get_depth', side, levels)
+
+    def get_volume_between(self, stock_id, side, low_price, high_price):
+        return self.query(stock_id, 'get_volume_between', side, low_price, high_price)
+
+    def get_price_for_quantity(self, stock_id, side, quantity):
+        return self.query(stock_id, 'get_price_for_quantity', side, quantity)
+
+    def publish_snapshot(self):
+        """
+        Merged snapshot of all shards, same format and order as OrderBookManager.publish_snapshot.
+        """
+        entries = [entry for part in self.ask_all('snapshot') for entry in part]
+        return sorted(entries, key=lambda entry: entry["stock"])
+
+    def publish_delta(self):
+        """
+        Merged delta of all shards; seq counts merged publishes (see StockOrderBook.publish_delta).
+        """
+        updates = [entry for part in self.ask_all('delta') for entry in part["updates"]]
+        self.publish_seq += 1
+        return {"seq": self.publish_seq, "updates": sorted(updates, key=lambda entry: entry["stock"])}
+
+    def stats(self):
+        """
+        Summed process_batch stats of all workers (plus their num_new_order).
+        """
+        totals = {}
+        for part in self.ask_all('stats'):
+            for key, value in part.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def close(self):
+        if not self.workers:
+            return
+        self.ask_all('stop')
+        for worker in self.workers:
+            worker.join()
+        for ring in self.rings:
+            ring.close()
+        self.workers = []
+
+
+# -------------------------------------------------------------------------
+# Example usage / equivalence check against a single-process book
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    import random
+
+    from Orderbook import OrderBookManager, HashOrderList, MIN_PRICE_INIT, TICK_INIT, MAX_LEVELS, MAX_ORDER_NUM
+
+    random.seed(9)
+    # Refs run well past MAX_ORDER_NUM, so the default OrderList drops some adds on
+    # both sides and HashOrderList keeps them all
+    events = []
+    next_ref = 1
+    live = []
+    for _ in range(30000):
+        stock = random.randrange(NUM_STOCKS)
+        if not live or random.random() < 0.55:
+            price = MIN_PRICE_INIT[stock] + TICK_INIT[stock] * random.randrange(MAX_LEVELS)
+            events.append(('add_order', stock, next_ref, price, random.randint(1, 100), random.randint(0, 1)))
+            live.append((stock, next_ref))
+            next_ref += 1
+        else:
+            stock, ref = live.pop(random.randrange(len(live)))
+            events.append(('cancel_order', stock, ref, random.randint(1, 120)))
+    assert next_ref > MAX_ORDER_NUM
+
+    for name, make_options in (("default order list", dict),
+                               ("HashOrderList", lambda: {"order_list": HashOrderList()})):
+        reference = OrderBookManager(**make_options())
+        with ShardedOrderBookManager(num_shards=3, **make_options()) as sharded:
+            for method, *args in events:
+                getattr(reference, method)(*args)
+                getattr(sharded, method)(*args)
+            assert sharded.publish_snapshot() == reference.publish_snapshot(), f"{name}: snapshot mismatch"
+            assert sharded.get_depth(1, SIDE_BID, 10) == reference.get_depth(1, SIDE_BID, 10)
+            print(f"{name}: stats {sharded.stats()}")
+        print(f"{name}: sharded snapshot matches the single-process book.")
@@ -1,13 +1,32 @@
 #!/usr/bin/env python3
+import logging
+
+TRADED_STOCKS = 4  # stocks the TA -> covariance -> QR -> OrderGen chain is sized for
+
+
 class TaParser:
-    def __init__(self, num_stocks=4):
+    """
+    Market price per traded stock from order book snapshots. Only stocks 0..num_stocks-1
+    are traded; entries for higher stock ids (the book may track thousands) are left
+    out, counted in dropped_entries and logged once with the first stock id dropped.
+    """
+
+    def __init__(self, num_stocks=TRADED_STOCKS):
         self.num_stocks = num_stocks
+        self.dropped_entries = 0
+        # Latest known entry per stock and prices, for update_delta
+        self.entries = {}
+        self.market_prices = [0.0] * self.num_stocks
 
     def update(self, snapshot):
         market_prices = [0.0] * self.num_stocks
 
         for entry in snapshot:
             stock_index = entry['stock']
+            if stock_index >= self.num_stocks:
+                # Snapshot may cover more symbols than this TA block trades
+                self.drop(stock_index)
+                continue
             ask_prices = entry['ask_prices']
             ask_qty = entry['ask_qty']
             bid_prices = entry['bid_prices']
@@ -20,4 +39,30 @@ class TaParser:
 
             market_prices[stock_index] = weighted_price / total_weight if total_weight > 0 else 0.0
 
-        return market_prices
\ No newline at end of file
+        return market_prices
+
+    def drop(self, stock_index):
+        if not self.dropped_entries:
+            logging.warning(f"TaParser trades stocks 0..{self.num_stocks - 1}; "
+                            f"stock {stock_index} and any other beyond are left out")
+        self.dropped_entries += 1
+
+    def update_delta(self, delta):
+        """
+        Same result as update() on the full snapshot, from a StockOrderBook.publish_delta()
+        result: changed sides are merged into the last known entry per stock and only
+        those stocks are recomputed.
+        """
+        touched = []
+        for entry in delta['updates']:
+            stock_index = entry['stock']
+            if stock_index >= self.num_stocks:
+                self.drop(stock_index)
+                continue
+            self.entries.setdefault(stock_index, {}).update(entry)
+            touched.append(self.entries[stock_index])
+
+        prices = self.update(touched)
+        for entry in touched:
+            self.market_prices[entry['stock']] = prices[entry['stock']]
+        return list(self.market_prices)
\ No newline at end of file
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+asyncio mode of test_tcp_client (python test_tcp_client.py --mode asyncio).
+
+Two stages instead of one blocking loop:
+- Ingest (FeedProtocol.data_received, on the event loop): frames, decodes and applies
+  every message to the order book, and every PUBLISH_THRESHOLD order messages puts the
+  book snapshot in a single `latest` slot, overwriting one analytics hasn't taken yet.
+- Analytics (analytics_task): takes the latest snapshot and runs TA -> covariance -> QR
+  -> OrderGen on it in a worker thread, so the event loop keeps ingesting meanwhile.
+  Snapshots published during a run are skipped (counted), not queued: analytics never
+  falls behind and never trades on a stale book. OUCH orders go out through the
+  transport's write buffer.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from itch_parser import ITCHParser
+from itch_framer import StreamFramer
+from TaParser import TaParser
+from CovUpdate import CovarianceUpdateStack
+from QrDecompLinSolver import QRDecompLinSolver
+from OrderGen import OrderGenerator
+
+PUBLISH_THRESHOLD = 20  # order messages between snapshots, as in the classic loop
+
+
+class Analytics:
+    """
+    The TA -> covariance -> QR -> OrderGen chain of the classic loop, on one snapshot.
+    """
+
+    def __init__(self):
+        self.ta_parser = TaParser()
+        self.ta_cov = CovarianceUpdateStack()
+        self.ta_qr = QRDecompLinSolver()
+        self.ta_og = OrderGenerator()
+
+    def run(self, snapshot):
+        """
+        Returns the OUCH blob to send, or None when the chain stops early.
+        """
+        logging.info("Order book: ")
+        for entry in snapshot:
+            logging.info(entry)
+
+        market_prices = self.ta_parser.update(snapshot)
+        logging.info(f"TA Parser: {market_prices}")
+
+        K, proceed = self.ta_cov.update(market_prices)
+        logging.info(f"Covariance Matrix: {K}\tProceed: {proceed}")
+        if not proceed:
+            return None
+
+        weights, proceed_2 = self.ta_qr.solve(K)
+        if not proceed_2:
+            logging.info("division by zero occured")
+            return None
+        logging.info(f"QR: Solved weights: {weights}")
+
+        output_blob = self.ta_og.order_gen(weights, market_prices)
+        logging.info(f"Order Generation (hex): {output_blob.hex()}")
+        return output_blob
+
+
+class FeedProtocol(asyncio.Protocol):
+    """
+    Ingest stage: ITCH stream -> order book, snapshots handed to analytics_task.
+    """
+
+    def __init__(self, orderbook, publish_threshold=PUBLISH_THRESHOLD):
+        self.orderbook = orderbook
+        self.publish_threshold = publish_threshold
+        self.parser = ITCHParser()
+        self.framer = StreamFramer()
+        self.transport = None
+        self.order_count = 0
+        self.latest = None  # newest snapshot analytics hasn't taken yet
+        self.snapshot_ready = asyncio.Event()
+        self.finished = asyncio.get_running_loop().create_future()
+        # Ingest stats
+        self.messages = 0
+        self.snapshots = 0
+        self.skipped = 0  # snapshots overwritten before analytics took them
+        self.longest_ingest = 0.0  # seconds, longest single data_received
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        start = time.perf_counter()
+        self.framer.feed(data)
+        for message in self.framer.frames():
+            self.handle_message(message)
+        self.longest_ingest = max(self.longest_ingest, time.perf_counter() - start)
+
+    def handle_message(self, message):
+        self.messages += 1
+        decoded_message = self.parser.view_from(message)
+        if decoded_message is None:
+            return
+        message_type = decoded_message.MessageType
+        stock_id = decoded_message.StockID
+        order_id = decoded_message.OrderReferenceNumber
+        orderbook = self.orderbook
+
+        if message_type == 'A':
+            orderbook.add_order(stock_id=stock_id, order_id=order_id, price=decoded_message.Price,
+                                quantity=decoded_message.Shares, side=decoded_message.BuySellIndicator)
+        elif message_type == 'X':
+            orderbook.cancel_order(stock_id=stock_id, order_id=order_id, cancel_qty=decoded_message.Shares)
+        elif message_type == 'E':
+            orderbook.execute_order(stock_id=stock_id, order_id=order_id, execute_qty=decoded_message.Shares)
+        elif message_type == 'D':
+            orderbook.delete_order(stock_id=stock_id, order_id=order_id)
+
+        self.order_count += 1
+        if self.order_count >= self.publish_threshold:
+            # Never waits on analytics: an untaken snapshot is simply replaced
+            if self.latest is not None:
+                self.skipped += 1
+            self.latest = self.orderbook.publish_snapshot()
+            self.snapshots += 1
+            self.snapshot_ready.set()
+            self.order_count = 0
+
+    def eof_received(self):
+        # Keep the write side open so the last analytics run can still send its orders
+        self.snapshot_ready.set()
+        if not self.finished.done():
+            self.finished.set_result(None)
+        return True
+
+    def connection_lost(self, exc):
+        self.snapshot_ready.set()
+        if not self.finished.done():
+            # exc is set when ingest raised in data_received (the transport closes on it)
+            if exc is not None:
+                self.finished.set_exception(exc)
+            else:
+                self.finished.set_result(None)
+
+
+async def analytics_task(protocol, analytics, executor):
+    """
+    Analytics stage: run the chain on the latest snapshot, again and again, until the
+    feed has ended and nothing new is left. Returns (runs, orders sent).
+    """
+    loop = asyncio.get_running_loop()
+    runs = sent = 0
+    while True:
+        snapshot = protocol.latest
+        if snapshot is None:
+            if protocol.finished.done():
+                return runs, sent
+            await protocol.snapshot_ready.wait()
+            protocol.snapshot_ready.clear()
+            continue
+        protocol.latest = None
+        output_blob = await loop.run_in_executor(executor, analytics.run, snapshot)
+        runs += 1
+        if output_blob is not None and not protocol.transport.is_closing():
+            protocol.transport.write(output_blob)
+            sent += 1
+            print("Packet sent to server.")
+
+
+async def run(server_ip, server_port, orderbook):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_connection(lambda: FeedProtocol(orderbook), server_ip, server_port)
+    print(f"Connected to {server_ip}:{server_port} (asyncio)")
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='analytics') as executor:
+        try:
+            runs, sent = await analytics_task(protocol, Analytics(), executor)
+            await protocol.finished  # re-raises an ingest error
+        finally:
+            transport.close()
+    print(f"{protocol.messages} messages, {protocol.snapshots} snapshots, {runs} analytics runs "
+          f"({protocol.skipped} skipped for a newer one), {sent} orders sent, "
+          f"longest ingest step {protocol.longest_ingest * 1000:.2f} ms")
+    return protocol
+
+
+def main(server_ip, server_port, orderbook):
+    try:
+        asyncio.run(run(server_ip, server_port, orderbook))
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        print("Connection closed")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Coalesced sends for itch_server: frames are queued and written with one
+socket.sendmsg call (scatter-gather straight from the frames, nothing is joined)
+once the batch holds max_messages frames, max_bytes bytes, or its oldest frame has
+waited max_delay_us. With a Pacer, pass sender.idle as its idle hook so a batch is
+flushed before the pacer sleeps past the batch's time budget.
+
+Bigger batches mean fewer syscalls and fuller TCP segments; TCP_NODELAY decides
+whether a small batch leaves at once or waits for Nagle. bench_batching.py sweeps
+both to find the receiver's ingest ceiling.
+"""
+import os
+import socket
+import time
+
+DEFAULT_BATCH = 1  # messages per send (1 = a send per message)
+DEFAULT_MAX_DELAY_US = 1000  # oldest queued frame waits at most this long
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') else 1024  # buffers per sendmsg
+
+
+def set_nodelay(sock, enabled=True):
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if enabled else 0)
+
+
+class BatchSender:
+    """
+    Queues frames for sock and sends each batch with one sendmsg (one sendall of
+    the joined batch where the platform has no sendmsg). sock must be blocking.
+    - max_messages: frames per batch, capped at IOV_MAX.
+    - max_bytes: flush once the batch reaches this many bytes (None = no limit).
+    - max_delay_us: flush once the oldest frame is this old (None = no limit).
+    """
+
+    def __init__(self, sock, max_messages=DEFAULT_BATCH, max_bytes=None, max_delay_us=DEFAULT_MAX_DELAY_US):
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+        self.sock = sock
+        self.max_messages = min(max_messages, IOV_MAX)
+        self.max_bytes = max_bytes
+        self.max_delay_ns = None if max_delay_us is None else int(max_delay_us * 1000)
+        self.use_sendmsg = hasattr(sock, 'sendmsg')
+        self.parts = []
+        self.queued_bytes = 0
+        self.flush_by = 0  # perf_counter_ns by which the current batch must go
+        # Stats
+        self.messages = 0
+        self.bytes = 0
+        self.syscalls = 0
+
+    def send(self, frame):
+        parts = self.parts
+        if not parts and self.max_delay_ns is not None:
+            self.flush_by = time.perf_counter_ns() + self.max_delay_ns
+        parts.append(frame)
+        self.queued_bytes += len(frame)
+        if (len(parts) >= self.max_messages
+                or (self.max_bytes is not None and self.queued_bytes >= self.max_bytes)
+                or (self.max_delay_ns is not None and time.perf_counter_ns() >= self.flush_by)):
+            self.flush()
+
+    def idle(self, deadline):
+        """
+        Pacer hook: nothing more arrives before `deadline` (perf_counter_ns), so send
+        now if the batch would be overdue by then.
+        """
+        if self.parts and (self.max_delay_ns is None or deadline >= self.flush_by):
+            self.flush()
+
+    def flush(self):
+        parts = self.parts
+        if not parts:
+            return
+        total = self.queued_bytes
+        if self.use_sendmsg:
+            sent = self.sock.sendmsg(parts)
+            self.syscalls += 1
+            if sent < total:
+                # Interrupted part way (rare on a blocking socket): send what is left
+                self.sock.sendall(b''.join(parts)[sent:])
+                self.syscalls += 1
+        else:
+            self.sock.sendall(b''.join(parts))
+            self.syscalls += 1
+        self.messages += len(parts)
+        self.bytes += total
+        self.parts = []
+        self.queued_bytes = 0
+
+    def report_line(self, seconds):
+        """
+        Syscalls and throughput over `seconds` of sending.
+        """
+        seconds = seconds or float('nan')
+        per_call = self.messages / self.syscalls if self.syscalls else 0
+        return (f"batch {self.max_messages}: {self.messages:,} messages in {self.syscalls:,} sends "
+                f"({per_call:.1f} per send), {self.syscalls / seconds:,.0f} syscalls/sec, "
+                f"{self.messages / seconds:,.0f} msgs/sec, {self.bytes / seconds / 1e6:,.1f} MB/s")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+itch_server send path: syscalls/sec and throughput per batch size (BatchSender), with
+TCP_NODELAY off and on. Frames go out unpaced, as fast as the receiver takes them.
+Run from SW/:
+    python bench_batching.py [--messages 200000] [--batches 1 4 16 64 256 1024]
+sweeps against a receiver thread over loopback.
+    python bench_batching.py --listen 0.0.0.0:22
+waits for one client (e.g. the FPGA board's lwIP tcp_client) and runs the whole sweep
+on that connection, so the numbers are the client's real ingest ceiling; --messages
+should be well above the socket send buffer (7.6 MB at the default) so the sender
+is held to the client's pace rather than filling buffers.
+
+Note: HW/SDK/tcp_client's receive callback forwards p->len bytes, the first pbuf of
+a chain only; bigger segments from large batches can arrive as chained pbufs.
+"""
+import argparse
+import contextlib
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from batch_sender import BatchSender, set_nodelay
+from itch_encoder import csv_to_bin
+from itch_replay import ReplaySource
+
+DEFAULT_BATCHES = (1, 4, 16, 64, 256, 1024)
+RECV_SIZE = 1024 * 1024
+
+
+def load_frames(bin_path, csv_path, count):
+    """
+    count frames (memoryviews), cycling through the .bin (or one encoded from csv_path).
+    """
+    if bin_path is None:
+        bin_path = os.path.join(tempfile.mkdtemp(), 'bench_batching.bin')
+        with contextlib.redirect_stdout(io.StringIO()):
+            csv_to_bin(csv_path, bin_path)
+    source = ReplaySource(bin_path)
+    frames = list(source.frames())
+    return [frames[i % len(frames)] for i in range(count)]
+
+
+def loopback_pair():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    client = socket.create_connection(listener.getsockname())
+    server, _ = listener.accept()
+    listener.close()
+    return server, client
+
+
+def drain(sock, expected, done):
+    buf = bytearray(RECV_SIZE)
+    received = 0
+    while received < expected:
+        n = sock.recv_into(buf)
+        if not n:
+            break
+        received += n
+    done.append(received)
+
+
+def run(sock, frames, batch, nodelay, receiver=None):
+    """
+    Send all frames in batches of `batch`. Returns (sender, seconds); with a local
+    receiver the time runs until it has every byte.
+    """
+    set_nodelay(sock, nodelay)
+    sender = BatchSender(sock, max_messages=batch, max_delay_us=None)
+    done = []
+    thread = None
+    if receiver is not None:
+        thread = threading.Thread(target=drain, args=(receiver, sum(len(f) for f in frames), done))
+        thread.start()
+    start = time.perf_counter()
+    for frame in frames:
+        sender.send(frame)
+    sender.flush()
+    if thread is not None:
+        thread.join()
+    return sender, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Batched sendmsg throughput of the replay send path.')
+    arg_parser.add_argument('--messages', type=int, default=200000, help='messages per setting')
+    arg_parser.add_argument('--batches', type=int, nargs='+', default=list(DEFAULT_BATCHES),
+                            help='messages per sendmsg to try')
+    arg_parser.add_argument('--bin', default=None, help='frames to send (default: encoded from --csv)')
+    arg_parser.add_argument('--csv', default='data/test.csv', help='order CSV the frames are encoded from')
+    arg_parser.add_argument('--listen', default=None, help='HOST:PORT to wait for a remote client on')
+    args = arg_parser.parse_args()
+
+    frames = load_frames(args.bin, args.csv, args.messages)
+    if args.listen:
+        host, port = args.listen.rsplit(':', 1)
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, int(port)))
+        listener.listen(1)
+        print(f"Waiting for a client on {args.listen}")
+        sock, addr = listener.accept()
+        print(f"Connected to {addr}")
+        receiver = None
+    else:
+        sock, receiver = loopback_pair()
+
+    print(f"{len(frames):,} messages per setting ({sum(len(f) for f in frames) / 1e6:.1f} MB)")
+    print(f"{'batch':>6} {'nodelay':>8} {'sends':>9} {'syscalls/s':>11} {'msgs/s':>11} {'MB/s':>8}")
+    try:
+        for nodelay in (False, True):
+            for batch in args.batches:
+                sender, seconds = run(sock, frames, batch, nodelay, receiver)
+                print(f"{sender.max_messages:>6} {str(nodelay):>8} {sender.syscalls:>9,} "
+                      f"{sender.syscalls / seconds:>11,.0f} {sender.messages / seconds:>11,.0f} "
+                      f"{sender.bytes / seconds / 1e6:>8.1f}")
+    finally:
+        sock.close()
+        if receiver is not None:
+            receiver.close()
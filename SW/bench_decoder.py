@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+ITCHParser decode cost per message, reading the five fields the order book uses
+(StockID, BuySellIndicator, Price, Shares, OrderReferenceNumber) like test_tcp_client.py:
+- decode_message: slice + concat + format-string unpack + ASCII-decode of every field
+  + namedtuple(**kwargs)
+- decode_from: byte-indexed dispatch to a precompiled Struct, unpack_from at an offset
+  of the whole buffer, fillers skipped
+- view_from: one reused OrderMessageView re-pointed at each message, fields decoded on
+  access (no message object per message)
+Run from SW/:
+    python bench_decoder.py [--messages 200000]
+"""
+import argparse
+import random
+import struct
+import time
+
+from itch_parser import ITCHParser, ORDER_MESSAGE_DEFINITION
+
+FRAME_BYTES = 38  # 2-byte length + 36-byte message
+
+
+def make_stream(num_messages, seed=1):
+    """
+    One buffer of length-prefixed A/E/D/X frames, like a recv() of the server feed.
+    """
+    rng = random.Random(seed)
+    layout = struct.Struct(ORDER_MESSAGE_DEFINITION['format'])
+    frames = []
+    for _ in range(num_messages):
+        message = layout.pack(rng.choice((b'A', b'E', b'D', b'X')), b'\xaa' * 14,
+                              rng.randrange(1 << 32), rng.randint(0, 1), rng.randint(1, 1000),
+                              rng.randrange(4), b'\xbb' * 4, rng.randrange(1000000, 3000000))
+        frames.append(len(message).to_bytes(2, byteorder='big') + message)
+    return b''.join(frames)
+
+
+def read_fields(message):
+    return (message.StockID, message.BuySellIndicator, message.Price, message.Shares,
+            message.OrderReferenceNumber)
+
+
+def run_decode_message(parser, stream):
+    checksum = 0
+    for pos in range(0, len(stream), FRAME_BYTES):
+        message = stream[pos + 2:pos + FRAME_BYTES]
+        decoded = parser.decode_message(message[0:1], message[1:])
+        checksum += decoded.StockID + decoded.BuySellIndicator + decoded.Price + decoded.Shares + \
+            decoded.OrderReferenceNumber
+    return checksum
+
+
+def run_decode_from(parser, stream):
+    view = memoryview(stream)
+    decode_from = parser.decode_from
+    checksum = 0
+    for pos in range(2, len(stream), FRAME_BYTES):
+        decoded = decode_from(view, pos)
+        checksum += decoded.StockID + decoded.BuySellIndicator + decoded.Price + decoded.Shares + \
+            decoded.OrderReferenceNumber
+    return checksum
+
+
+def run_view_from(parser, stream):
+    view = memoryview(stream)
+    view_from = parser.view_from
+    checksum = 0
+    for pos in range(2, len(stream), FRAME_BYTES):
+        decoded = view_from(view, pos)
+        checksum += decoded.StockID + decoded.BuySellIndicator + decoded.Price + decoded.Shares + \
+            decoded.OrderReferenceNumber
+    return checksum
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='decode_message vs decode_from vs view_from throughput.')
+    arg_parser.add_argument('--messages', type=int, default=200000, help='messages per run')
+    args = arg_parser.parse_args()
+
+    parser = ITCHParser()
+    stream = make_stream(args.messages)
+
+    results = {}
+    print(f"{'decoder':>15} {'msgs/sec':>12} {'ns/msg':>8}")
+    for name, run in (('decode_message', run_decode_message), ('decode_from', run_decode_from),
+                      ('view_from', run_view_from)):
+        start = time.perf_counter()
+        results[name] = run(parser, stream)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>15} {args.messages / elapsed:>12,.0f} {elapsed / args.messages * 1e9:>8.0f}")
+    assert len(set(results.values())) == 1, results
+
+    # All paths must agree on every field, message by message
+    view = memoryview(stream)
+    for pos in range(0, len(stream), FRAME_BYTES):
+        slow = parser.decode_message(stream[pos + 2:pos + 3], stream[pos + 3:pos + FRAME_BYTES])
+        fast = parser.decode_from(view, pos + 2)
+        assert all(getattr(slow, field) == getattr(fast, field) for field in fast._fields)
+        assert read_fields(parser.view_from(view, pos + 2)) == read_fields(fast)
+    print("Decoded fields match.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Depth / band volume / quantity-threshold queries: segment-tree range queries
+(TreeOrderBook.depth, volume_between, price_for_quantity) against a linear scan
+of price_quantity, on a populated book of each engine.
+Run from SW/:
+    python bench_depth.py [--queries 20000] [--fill 0.5]
+"""
+import argparse
+import random
+import time
+
+from Orderbook import TreeOrderBook, MAX_LEVELS, SIDE_BID, SIDE_ASK
+from OrderbookNumpy import NumpyTreeOrderBook
+
+MIN_PRICE = 1000000
+TICK = 600
+
+
+# -------------------------------------------------------------------------
+# Linear-scan versions (what callers had to do before the aggregate trees)
+# -------------------------------------------------------------------------
+def levels_from_best(book):
+    if book.side == SIDE_BID:
+        return range(book.num_levels - 1, -1, -1)
+    return range(book.num_levels)
+
+
+def scan_depth(book, levels):
+    qty = book.price_quantity
+    total = 0
+    last = None
+    for idx in levels_from_best(book):
+        if levels <= 0:
+            break
+        if qty[idx] > 0:
+            total += int(qty[idx])
+            last = idx
+            levels -= 1
+    return (None, 0) if last is None else (book.index_to_price(last), total)
+
+
+def scan_volume_between(book, low_price, high_price):
+    qty = book.price_quantity
+    return sum(int(qty[idx]) for idx in range(book.num_levels)
+               if low_price <= book.index_to_price(idx) <= high_price)
+
+
+def scan_price_for_quantity(book, quantity):
+    qty = book.price_quantity
+    total = 0
+    for idx in levels_from_best(book):
+        total += int(qty[idx])
+        if qty[idx] > 0 and total >= quantity:
+            return book.index_to_price(idx)
+    return None
+
+
+# -------------------------------------------------------------------------
+# Benchmark
+# -------------------------------------------------------------------------
+def make_book(book_class, side, fill, rng):
+    book = book_class(min_price=MIN_PRICE, tick_size=TICK, side=side)
+    for idx in range(MAX_LEVELS):
+        if rng.random() < fill:
+            book.add_quantity(book.index_to_price(idx), rng.randint(1, 500))
+    return book
+
+
+def make_queries(book, num_queries, rng):
+    total = book.range_quantity(0, MAX_LEVELS)
+    queries = []
+    for _ in range(num_queries):
+        low = MIN_PRICE + TICK * rng.randrange(MAX_LEVELS)
+        high = low + TICK * rng.randrange(64)
+        queries.append((rng.randint(1, 100), low, high, rng.randint(1, max(total, 1))))
+    return queries
+
+
+def time_queries(fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tree range queries vs linear scan of price levels.')
+    parser.add_argument('--queries', type=int, default=20000, help='queries per measurement')
+    parser.add_argument('--fill', type=float, default=0.5, help='fraction of price levels with quantity')
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    cases = [
+        ('depth', lambda b, q: b.depth(q[0]), lambda b, q: scan_depth(b, q[0])),
+        ('volume_between', lambda b, q: b.volume_between(q[1], q[2]),
+         lambda b, q: scan_volume_between(b, q[1], q[2])),
+        ('price_for_quantity', lambda b, q: b.price_for_quantity(q[3]),
+         lambda b, q: scan_price_for_quantity(b, q[3])),
+    ]
+
+    print(f"{'engine':>19} {'side':>4} {'query':>19} {'tree us':>9} {'scan us':>9} {'speedup':>8}")
+    for book_class in (TreeOrderBook, NumpyTreeOrderBook):
+        for side in (SIDE_BID, SIDE_ASK):
+            book = make_book(book_class, side, args.fill, rng)
+            queries = make_queries(book, args.queries, rng)
+            for name, tree_fn, scan_fn in cases:
+                for q in queries[:200]:
+                    assert tree_fn(book, q) == scan_fn(book, q), (name, q)
+                tree_us = time_queries(lambda q: tree_fn(book, q), queries)
+                scan_us = time_queries(lambda q: scan_fn(book, q), queries)
+                print(f"{book_class.__name__:>19} {'bid' if side == SIDE_BID else 'ask':>4} {name:>19} "
+                      f"{tree_us:>9.2f} {scan_us:>9.2f} {scan_us / tree_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Framing cost of the ITCH client receive loop with 1 MB recv chunks: the old
+`data = data[2 + length:]` loop (re-slices the rest of the chunk for every message and
+drops messages split across reads) against StreamFramer (recv_into a preallocated
+buffer, memoryview frames, split messages reassembled).
+Run from SW/:
+    python bench_framer.py [--megabytes 8] [--chunk 1048576]
+"""
+import argparse
+import random
+import time
+
+from itch_framer import StreamFramer, LENGTH
+
+MESSAGE_BYTES = 36
+
+
+class ChunkedSource:
+    """
+    Socket stand-in that hands out a byte stream in fixed-size reads.
+    """
+
+    def __init__(self, stream, chunk):
+        self.stream = memoryview(stream)
+        self.chunk = chunk
+        self.pos = 0
+
+    def recv(self, bufsize):
+        n = min(bufsize, self.chunk)
+        data = self.stream[self.pos:self.pos + n].tobytes()
+        self.pos += len(data)
+        return data
+
+    def recv_into(self, buf):
+        n = min(len(buf), self.chunk, len(self.stream) - self.pos)
+        buf[:n] = self.stream[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+def make_stream(megabytes, seed=1):
+    rng = random.Random(seed)
+    message = bytes(rng.randrange(256) for _ in range(MESSAGE_BYTES))
+    frame = LENGTH.pack(MESSAGE_BYTES) + message
+    return frame * (megabytes * 1024 * 1024 // len(frame))
+
+
+def legacy_loop(sock, recv_size):
+    """
+    The receive loop test_tcp_client.py used before StreamFramer. Returns messages seen.
+    """
+    count = 0
+    num_bytes_to_skip = 0
+    while True:
+        data = sock.recv(recv_size)
+        if not data:
+            break
+        while data:
+            if num_bytes_to_skip > 0:
+                if num_bytes_to_skip > len(data):
+                    num_bytes_to_skip -= len(data)
+                    break
+                else:
+                    data = data[num_bytes_to_skip:]
+                    num_bytes_to_skip = 0
+            if len(data) < 2:
+                break
+            length = int.from_bytes(data[:2], byteorder='big')
+            if length > len(data[2:]):
+                num_bytes_to_skip = length - len(data[2:])
+                break
+            message = data[2:2 + length]
+            count += message[0] >= 0
+            data = data[2 + length:]
+    return count
+
+
+def framer_loop(sock, recv_size):
+    count = 0
+    framer = StreamFramer(recv_size=recv_size)
+    while framer.fill(sock):
+        for message in framer.frames():
+            count += message[0] >= 0
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ITCH receive-loop framing throughput.')
+    parser.add_argument('--megabytes', type=int, default=8, help='size of the replayed stream')
+    parser.add_argument('--chunk', type=int, default=1024 * 1024, help='bytes per recv')
+    args = parser.parse_args()
+
+    stream = make_stream(args.megabytes)
+    expected = len(stream) // (2 + MESSAGE_BYTES)
+    print(f"{args.megabytes} MB stream, {expected} messages, {args.chunk} byte reads")
+    print(f"{'loop':>8} {'msgs/sec':>12} {'MB/s':>8} {'messages':>9} {'lost':>5}")
+    for name, loop in (('legacy', legacy_loop), ('framer', framer_loop)):
+        start = time.perf_counter()
+        count = loop(ChunkedSource(stream, args.chunk), args.chunk)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>8} {count / elapsed:>12,.0f} {len(stream) / elapsed / 1e6:>8.1f} "
+              f"{count:>9} {expected - count:>5}")
+
+
+if __name__ == "__main__":
+    main()
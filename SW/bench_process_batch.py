@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Order book ingest: one process_message_136bit call per record against
+OrderBookManager.process_batch on packed 17-byte records, for both engines and a
+few batch sizes. Events cluster around a drifting mid price, as in a live feed, so a
+batch hits the same levels many times and its deltas fold together.
+Run from SW/:
+    python bench_process_batch.py [--events 200000] [--batches 16 256 4096]
+"""
+import argparse
+import random
+import time
+
+from Orderbook import (
+    OrderBookManager, HashOrderList, MIN_PRICE_INIT, TICK_INIT, MAX_LEVELS, NUM_STOCKS,
+    ORDER_ADD, ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE,
+)
+from OrderbookNumpy import NumpyOrderBookManager, pack_136bit, RECORD_BYTES
+
+DEFAULT_BATCHES = (16, 256, 4096)
+SPREAD_LEVELS = 20  # orders land within this many levels of the mid
+
+
+def make_messages(num_events, rng):
+    """
+    136-bit message integers: adds around each stock's mid, and cancels / executes /
+    deletes of resting orders.
+    """
+    mids = [MAX_LEVELS // 2] * NUM_STOCKS
+    live = []
+    next_ref = 0
+    messages = []
+    for _ in range(num_events):
+        if not live or rng.random() < 0.5:
+            stock = rng.randrange(NUM_STOCKS)
+            mids[stock] = min(max(mids[stock] + rng.choice((-1, 0, 1)), SPREAD_LEVELS), MAX_LEVELS - SPREAD_LEVELS)
+            side = rng.randint(0, 1)
+            offset = rng.randrange(1, SPREAD_LEVELS)
+            level = mids[stock] - offset if side == 0 else mids[stock] + offset
+            price = MIN_PRICE_INIT[stock] + TICK_INIT[stock] * level
+            ref = next_ref
+            next_ref += 1
+            live.append((stock, ref))
+            o_type, shares = ORDER_ADD, rng.randint(1, 100) * 100
+        else:
+            stock, ref = live.pop(rng.randrange(len(live))) if rng.random() < 0.5 else rng.choice(live)
+            o_type, shares, price, side = rng.choice((ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE)), 100, 0, 0
+        messages.append(stock | (ref << 32) | (shares << 64) | (price << 96) | (o_type << 128) | (side << 132))
+    return messages
+
+
+def per_message(messages):
+    manager = OrderBookManager(order_list=HashOrderList())
+    start = time.perf_counter()
+    for message in messages:
+        manager.process_message_136bit(message)
+    return manager, time.perf_counter() - start
+
+
+def batched(manager_class, packed, batch):
+    manager = manager_class(order_list=HashOrderList())
+    step = batch * RECORD_BYTES
+    view = memoryview(packed)
+    start = time.perf_counter()
+    for pos in range(0, len(packed), step):
+        manager.process_batch(view[pos:pos + step])
+    return manager, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='process_message_136bit vs process_batch records/sec.')
+    parser.add_argument('--events', type=int, default=200000, help='records per run')
+    parser.add_argument('--batches', type=int, nargs='+', default=DEFAULT_BATCHES, help='records per process_batch')
+    args = parser.parse_args()
+
+    messages = make_messages(args.events, random.Random(5))
+    packed = pack_136bit(messages)
+    reference, elapsed = per_message(messages)
+    expected = reference.publish_snapshot()
+    base_rate = args.events / elapsed
+
+    print(f"{'path':>36} {'batch':>6} {'records/sec':>13} {'speedup':>8}")
+    print(f"{'process_message_136bit':>36} {1:>6} {base_rate:>13,.0f} {1:>7.1f}x")
+    for manager_class in (OrderBookManager, NumpyOrderBookManager):
+        for batch in args.batches:
+            manager, elapsed = batched(manager_class, packed, batch)
+            assert manager.publish_snapshot() == expected, f"{manager_class.__name__} batch {batch}: snapshot mismatch"
+            rate = args.events / elapsed
+            print(f"{manager_class.__name__ + '.process_batch':>36} {batch:>6} {rate:>13,.0f} "
+                  f"{rate / base_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Throughput of the sharded order book (ShardedOrderbook) vs shard count, against a
+single-process NumPy book, with events spread over many symbols.
+Each run routes packed 136-bit records in chunks and ends with a round trip to every
+worker, so the time covers applying every event. Scaling needs free cores: shard
+counts above os.cpu_count() only add overhead.
+Run from SW/:
+    python bench_shards.py [--events 400000] [--symbols 1000] [--shards 1 2 4 8]
+"""
+import argparse
+import os
+import random
+import time
+
+from Orderbook import HashOrderList, DEFAULT_PRICE_BAND, MAX_LEVELS, ORDER_ADD, ORDER_DELETE
+from OrderbookNumpy import NumpyOrderBookManager, RECORD_BYTES, pack_136bit
+from ShardedOrderbook import ShardedOrderBookManager
+
+CHUNK_RECORDS = 4096  # records per process_batch call, like a recv-sized burst
+
+
+def make_records(num_symbols, num_events, seed=1):
+    """
+    Half adds, half deletes of live orders, spread uniformly over num_symbols.
+    """
+    rng = random.Random(seed)
+    min_price, tick = DEFAULT_PRICE_BAND
+    messages = []
+    live = []
+    next_ref = 1
+    for _ in range(num_events):
+        if not live or rng.random() < 0.5:
+            stock = rng.randrange(num_symbols)
+            price = min_price + tick * rng.randrange(MAX_LEVELS)
+            side = rng.randint(0, 1)
+            messages.append(stock | (next_ref << 32) | (rng.randint(1, 100) << 64) | (price << 96) |
+                            (ORDER_ADD << 128) | (side << 132))
+            live.append((stock, next_ref))
+            next_ref += 1
+        else:
+            stock, ref = live.pop(rng.randrange(len(live)))
+            messages.append(stock | (ref << 32) | (ORDER_DELETE << 128))
+    return pack_136bit(messages)
+
+
+def chunks(records):
+    step = CHUNK_RECORDS * RECORD_BYTES
+    return [records[i:i + step] for i in range(0, len(records), step)]
+
+
+def run_single(parts, num_symbols):
+    manager = NumpyOrderBookManager(order_list=HashOrderList(), num_stocks=num_symbols, lazy=True)
+    start = time.perf_counter()
+    for part in parts:
+        manager.process_batch(part)
+    return time.perf_counter() - start
+
+
+def run_sharded(parts, num_symbols, num_shards):
+    with ShardedOrderBookManager(num_shards=num_shards, order_list=HashOrderList(), num_stocks=num_symbols,
+                                 lazy=True) as manager:
+        start = time.perf_counter()
+        for part in parts:
+            manager.process_batch(part)
+        manager.stats()  # waits until every worker has applied everything
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded order book throughput vs shard count.')
+    parser.add_argument('--events', type=int, default=400000, help='events per run')
+    parser.add_argument('--symbols', type=int, default=1000, help='active symbols')
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8], help='shard counts to run')
+    args = parser.parse_args()
+
+    parts = chunks(make_records(args.symbols, args.events))
+    print(f"{args.events} events over {args.symbols} symbols, {os.cpu_count()} CPUs")
+    single = run_single(parts, args.symbols)
+    print(f"{'shards':>8} {'events/sec':>12} {'vs single':>10}")
+    print(f"{'single':>8} {args.events / single:>12,.0f} {1.0:>9.2f}x")
+    for num_shards in args.shards:
+        elapsed = run_sharded(parts, args.symbols, num_shards)
+        print(f"{num_shards:>8} {args.events / elapsed:>12,.0f} {single / elapsed:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the software model: every stage of test_tcp_client timed on its
+own, plus end-to-end replays, all driven by data/test.csv.
+Stages (inputs are produced by running the pipeline once, the way the client does:
+snapshot every 20 order messages -> TA -> covariance -> QR -> OrderGen):
+    decode_message        ITCHParser.decode_message, per message
+    framing               StreamFramer fill + frames, per 64 KB read
+    book_add/cancel/execute/delete   OrderBookManager calls, per message (test.csv only adds
+                          orders, so every order is then cancelled in part, executed and deleted)
+    get_top_5, publish_snapshot      on the replayed book
+    ta_update             TaParser.update, per snapshot
+    cov_update            CovarianceUpdateStack.update, per price vector
+    qr_solve              QRDecompLinSolver.solve, per covariance matrix
+    order_gen             OrderGenerator.order_gen, per weight vector
+    e2e_classic/asyncio   test_tcp_client.main against a local server, per replay
+For each: msgs/sec (items processed per second of timed calls) and p50/p99/p99.9
+latency per call. Results are written as JSON and compared to an earlier results file
+(--baseline, by default data/bench_baseline.json once --save-baseline has written it);
+p50 / p99 latency rises beyond --tolerance are flagged (exit status 1). Medians are used rather than msgs/sec, which a single scheduler hiccup skews.
+An e2e replay that fails (the client prints its own errors) has its captured output
+printed; the stage is listed under "failed" and the exit status is 1.
+Run from SW/:
+    python bench_suite.py [--repeat 50] [--e2e-runs 5] [--output data/bench_results.json]
+                          [--baseline FILE | --no-baseline] [--save-baseline]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import itch_encoder
+from itch_parser import ITCHParser
+from itch_framer import StreamFramer
+from bench_framer import ChunkedSource
+from Orderbook import OrderBookManager
+from TaParser import TaParser
+from CovUpdate import CovarianceUpdateStack
+from QrDecompLinSolver import QRDecompLinSolver
+from OrderGen import OrderGenerator
+
+CSV_PATH = 'data/test.csv'
+OUTPUT_DEFAULT = 'data/bench_results.json'
+BASELINE_DEFAULT = 'data/bench_baseline.json'
+PUBLISH_THRESHOLD = 20  # order messages between snapshots, as in test_tcp_client
+FRAMING_READ = 64 * 1024
+FRAMING_BYTES = 8 * 1024 * 1024
+CLIENT_ERROR = 'An error occurred'  # what test_tcp_client / async_client print for a caught exception
+BOOK_CALLS = {'A': 'book_add', 'X': 'book_cancel', 'E': 'book_execute', 'D': 'book_delete'}
+
+
+# -------------------------------------------------------------------------
+# Timing
+# -------------------------------------------------------------------------
+def time_calls(fn, calls):
+    """
+    Call fn(*args) for every args in calls; per-call latencies in ns.
+    """
+    latencies = np.empty(len(calls), dtype=np.int64)
+    now = time.perf_counter_ns
+    for i, args in enumerate(calls):
+        start = now()
+        fn(*args)
+        latencies[i] = now() - start
+    return latencies
+
+
+def summarize(latencies, unit, items=None):
+    """
+    Stage result: items/sec over the timed calls and latency percentiles in µs.
+    items defaults to one per call.
+    """
+    latencies = np.asarray(latencies, dtype=np.int64)
+    seconds = latencies.sum() / 1e9
+    items = len(latencies) if items is None else items
+    p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9]) / 1000
+    return {'unit': unit, 'calls': len(latencies), 'messages': int(items), 'seconds': seconds,
+            'msgs_per_sec': items / seconds if seconds else 0.0,
+            'p50_us': p50, 'p99_us': p99, 'p999_us': p999}
+
+
+# -------------------------------------------------------------------------
+# Inputs
+# -------------------------------------------------------------------------
+def load_feed(csv_path):
+    """
+    test.csv -> (length-prefixed .bin stream, list of 36-byte messages).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_path = os.path.join(tmp, 'test.bin')
+        with contextlib.redirect_stdout(io.StringIO()):
+            itch_encoder.csv_to_bin(csv_path, bin_path)
+        with open(bin_path, 'rb') as f:
+            stream = f.read()
+    framer = StreamFramer()
+    framer.feed(stream)
+    return stream, [bytes(message) for message in framer.frames()]
+
+
+def replay_book(decoded):
+    """
+    Book operations per message, plus what the client would hand to analytics.
+    Returns (operations, snapshots, final book).
+    """
+    operations = []
+    for message in decoded:
+        stock_id, order_id, quantity = message.StockID, message.OrderReferenceNumber, message.Shares
+        if message.MessageType == 'A':
+            operations.append(('A', (stock_id, order_id, message.Price, quantity, message.BuySellIndicator)))
+        elif message.MessageType == 'X':
+            operations.append(('X', (stock_id, order_id, quantity)))
+        elif message.MessageType == 'E':
+            operations.append(('E', (stock_id, order_id, quantity)))
+        elif message.MessageType == 'D':
+            operations.append(('D', (stock_id, order_id)))
+
+    orderbook = OrderBookManager()
+    methods = {'A': orderbook.add_order, 'X': orderbook.cancel_order,
+               'E': orderbook.execute_order, 'D': orderbook.delete_order}
+    snapshots = []
+    for i, (code, args) in enumerate(operations, 1):
+        methods[code](*args)
+        if i % PUBLISH_THRESHOLD == 0:
+            snapshots.append(orderbook.publish_snapshot())
+    return operations, snapshots, orderbook
+
+
+def analytics_inputs(snapshots):
+    """
+    Run TA -> covariance -> QR once over the snapshots and keep each stage's inputs.
+    """
+    ta_parser, ta_cov, ta_qr = TaParser(), CovarianceUpdateStack(), QRDecompLinSolver()
+    prices, matrices, orders = [], [], []
+    for snapshot in snapshots:
+        market_prices = ta_parser.update(snapshot)
+        prices.append(market_prices)
+        K, proceed = ta_cov.update(market_prices)
+        if proceed:
+            K = [row[:] for row in K]  # the stack updates its matrix in place
+            matrices.append(K)
+            weights, proceed_2 = ta_qr.solve(K)
+            if proceed_2:
+                orders.append((weights, market_prices))
+    return prices, matrices, orders
+
+
+# -------------------------------------------------------------------------
+# Stages
+# -------------------------------------------------------------------------
+def bench_decode(messages, repeat):
+    parser = ITCHParser()
+    calls = [(message[0:1], message[1:]) for message in messages] * repeat
+    return summarize(time_calls(parser.decode_message, calls), 'message')
+
+
+def bench_framing(stream):
+    data = stream * max(1, FRAMING_BYTES // len(stream))
+    source = ChunkedSource(data, FRAMING_READ)
+    framer = StreamFramer(recv_size=FRAMING_READ)
+    latencies = []
+    count = 0
+    now = time.perf_counter_ns
+    while True:
+        start = now()
+        if not framer.fill(source):
+            break
+        for message in framer.frames():
+            count += 1
+        latencies.append(now() - start)
+    return summarize(latencies, f'{FRAMING_READ // 1024} KB read', count)
+
+
+def teardown_operations(operations):
+    """
+    Cancel part of, execute one share of, then delete every order the replay added.
+    """
+    teardown = []
+    for code, args in operations:
+        if code == 'A':
+            stock_id, order_id, _, quantity, _ = args
+            teardown += [('X', (stock_id, order_id, max(1, quantity // 2))), ('E', (stock_id, order_id, 1)),
+                         ('D', (stock_id, order_id))]
+    return teardown
+
+
+def bench_book(operations, repeat):
+    """
+    Every operation of the replay and its teardown, timed per call and grouped by message
+    type; a fresh book per repetition so order ids stay valid.
+    """
+    operations = operations + teardown_operations(operations)
+    latencies = {code: [] for code in BOOK_CALLS}
+    now = time.perf_counter_ns
+    for _ in range(repeat):
+        orderbook = OrderBookManager()
+        methods = {'A': orderbook.add_order, 'X': orderbook.cancel_order,
+                   'E': orderbook.execute_order, 'D': orderbook.delete_order}
+        for code, args in operations:
+            method = methods[code]
+            start = now()
+            method(*args)
+            latencies[code].append(now() - start)
+    return {BOOK_CALLS[code]: summarize(values, 'message') for code, values in latencies.items() if values}
+
+
+def bench_queries(orderbook, repeat):
+    top_calls = [(stock_id, side) for stock_id in range(4) for side in (0, 1)] * repeat
+    return {
+        'get_top_5': summarize(time_calls(orderbook.get_top_5, top_calls), 'call'),
+        'publish_snapshot': summarize(time_calls(orderbook.publish_snapshot, [()] * repeat * 4), 'call'),
+    }
+
+
+def bench_analytics(snapshots, prices, matrices, orders, repeat):
+    results = {'ta_update': summarize(time_calls(TaParser().update, [(s,) for s in snapshots] * repeat),
+                                      'snapshot')}
+    # Stateful stages: a fresh object per pass over the recorded inputs
+    cov = [time_calls(CovarianceUpdateStack().update, [(p,) for p in prices]) for _ in range(repeat)]
+    results['cov_update'] = summarize(np.concatenate(cov), 'price vector')
+    if matrices:
+        qr = time_calls(QRDecompLinSolver().solve, [(K,) for K in matrices] * repeat)
+        results['qr_solve'] = summarize(qr, 'matrix')
+    if orders:
+        with contextlib.redirect_stdout(io.StringIO()):  # order_gen prints the portfolio value
+            og = [time_calls(OrderGenerator().order_gen, orders) for _ in range(repeat)]
+        results['order_gen'] = summarize(np.concatenate(og), 'weight vector')
+    return results
+
+
+def bench_e2e(stream, num_messages, runs, mode):
+    """
+    test_tcp_client.main against a local server that sends the whole stream and closes
+    its write side; per-call latency is one complete replay.
+    """
+    import test_tcp_client
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('localhost', 0))
+    server.listen(1)
+
+    def serve():
+        for _ in range(runs):
+            try:
+                conn, _ = server.accept()
+            except OSError:  # listener shut down after a failed run
+                return
+            with conn, contextlib.suppress(OSError):
+                conn.sendall(stream)
+                conn.shutdown(socket.SHUT_WR)
+                while conn.recv(65536):  # OUCH orders from the client
+                    pass
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    saved_port = test_tcp_client.SERVER_PORT
+    test_tcp_client.SERVER_PORT = server.getsockname()[1]
+    logging.disable(logging.INFO)
+    latencies = []
+    try:
+        for _ in range(runs):
+            output = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(output):
+                    start = time.perf_counter_ns()
+                    test_tcp_client.main(mode=mode)
+                    latencies.append(time.perf_counter_ns() - start)
+            except Exception:
+                print(output.getvalue(), end='', file=sys.stderr)
+                raise
+            # The client catches its own errors and only prints them
+            if CLIENT_ERROR in output.getvalue():
+                print(output.getvalue(), end='', file=sys.stderr)
+                raise RuntimeError(f"test_tcp_client.main(mode={mode!r}) failed, its output is above")
+    finally:
+        logging.disable(logging.NOTSET)
+        test_tcp_client.SERVER_PORT = saved_port
+        with contextlib.suppress(OSError):
+            server.shutdown(socket.SHUT_RDWR)  # wakes serve() if a failed run left it in accept()
+        thread.join()
+        server.close()
+    return summarize(latencies, 'replay', num_messages * runs)
+
+
+# -------------------------------------------------------------------------
+# Baseline comparison
+# -------------------------------------------------------------------------
+def compare(results, baseline, tolerance):
+    """
+    {stage: [problems]} for stages slower than the baseline by more than tolerance
+    (p50 or p99 latency higher by that fraction).
+    """
+    regressions = {}
+    for name, result in results['stages'].items():
+        base = baseline['stages'].get(name)
+        if base is None:
+            continue
+        problems = []
+        if result['p50_us'] > base['p50_us'] * (1 + tolerance):
+            problems.append(f"p50 {base['p50_us']:.1f} -> {result['p50_us']:.1f} us")
+        if result['p99_us'] > base['p99_us'] * (1 + tolerance):
+            problems.append(f"p99 {base['p99_us']:.1f} -> {result['p99_us']:.1f} us")
+        if problems:
+            regressions[name] = problems
+    return regressions
+
+
+def print_table(results, baseline=None):
+    print(f"{'stage':>18} {'unit':>14} {'calls':>8} {'msgs/sec':>12} {'p50 us':>9} {'p99 us':>9} "
+          f"{'p99.9 us':>9}" + (f" {'p50 vs base':>12}" if baseline else ''))
+    for name, r in results['stages'].items():
+        line = (f"{name:>18} {r['unit']:>14} {r['calls']:>8} {r['msgs_per_sec']:>12,.0f} {r['p50_us']:>9.1f} "
+                f"{r['p99_us']:>9.1f} {r['p999_us']:>9.1f}")
+        base = baseline['stages'].get(name) if baseline else None
+        if base:
+            line += f" {base['p50_us'] / r['p50_us']:>11.2f}x"
+        print(line)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Per-stage and end-to-end benchmarks of the SW model.')
+    arg_parser.add_argument('--csv', default=CSV_PATH, help='order CSV the feed is encoded from')
+    arg_parser.add_argument('--repeat', type=int, default=50, help='passes over the inputs per stage')
+    arg_parser.add_argument('--e2e-runs', type=int, default=5, help='end-to-end replays per mode (0 = skip)')
+    arg_parser.add_argument('--output', default=OUTPUT_DEFAULT, help='JSON results file')
+    arg_parser.add_argument('--baseline', default=BASELINE_DEFAULT if os.path.exists(BASELINE_DEFAULT) else None,
+                            help=f'results file to compare against (default {BASELINE_DEFAULT} if it exists)')
+    arg_parser.add_argument('--no-baseline', action='store_true', help='skip the baseline comparison')
+    arg_parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='fractional latency rise (p50 or p99) flagged as a regression')
+    arg_parser.add_argument('--save-baseline', action='store_true',
+                            help=f'also copy the results to {BASELINE_DEFAULT}')
+    args = arg_parser.parse_args()
+
+    stream, messages = load_feed(args.csv)
+    parser = ITCHParser()
+    decoded = [parser.decode_from(message) for message in messages]
+    operations, snapshots, orderbook = replay_book(decoded)
+    prices, matrices, orders = analytics_inputs(snapshots)
+
+    stages = {'decode_message': bench_decode(messages, args.repeat), 'framing': bench_framing(stream)}
+    stages.update(bench_book(operations, args.repeat))
+    stages.update(bench_queries(orderbook, args.repeat))
+    stages.update(bench_analytics(snapshots, prices, matrices, orders, args.repeat))
+    failed = []
+    if args.e2e_runs:
+        for mode in ('classic', 'asyncio'):
+            try:
+                stages[f'e2e_{mode}'] = bench_e2e(stream, len(messages), args.e2e_runs, mode)
+            except RuntimeError as e:
+                print(f"FAILED e2e_{mode}: {e}")
+                failed.append(f'e2e_{mode}')
+
+    results = {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                 'numpy': np.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count(),
+                 'csv': args.csv, 'messages': len(messages), 'repeat': args.repeat},
+        'stages': stages,
+        'failed': failed,
+    }
+    baseline = None
+    if args.baseline and not args.no_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if failed:
+        print(f"FAILED: {', '.join(failed)} (no baseline saved, exit status 1)")
+        raise SystemExit(1)
+    if args.save_baseline:
+        shutil.copyfile(args.output, BASELINE_DEFAULT)
+        print(f"Baseline saved to {BASELINE_DEFAULT}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, problems in regressions.items():
+            print(f"REGRESSION {name}: {'; '.join(problems)}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Add/cancel throughput of a lazily allocated StockOrderBook as the symbol count grows.
+Run from SW/:
+    python bench_symbols.py [--events 200000] [--repeat 3] [--config data/config.csv]
+Symbols get their (min_price, tick) from --config (load_price_bands); the ones it
+doesn't list use DEFAULT_PRICE_BAND. Each row is the best of --repeat runs (one busy
+core skews single runs by tens of percent).
+
+Per-event work doesn't depend on the symbol count (same calls, same tree depth), but
+the memory it touches does: every symbol with orders holds two 256-level books (the
+"MB of books" column), and thousands of them don't stay in the CPU caches. Books are
+kept small for that reason: __slots__, and one packed agg_tree instead of separate
+size and count trees (10.4 KB per empty side, was 14.7 KB). Measured best-of on a
+2 MiB L2, 4 -> 8000 symbols went from 228k -> 159k to 264k -> 176k events/sec.
+The rest of the gap is per-event pointer chasing through Python objects (the book
+table, list items, int objects), which also shows with the trees taken out of the
+loop. Storing the levels in array('q') buffers flattens the curve a little but is
+slower at every size, as each read boxes a new int.
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+from Orderbook import (
+    StockOrderBook, TreeOrderBook, HashOrderList, DEFAULT_PRICE_BAND, MAX_LEVELS, PRICE_BAND_CSV,
+    SIDE_BID, SIDE_ASK, load_price_bands,
+)
+
+SYMBOL_COUNTS = [4, 64, 512, 2048, 8000]
+
+
+def make_events(num_symbols, num_events, price_bands=None, seed=1):
+    """
+    Half adds, half cancels of live orders, spread uniformly over num_symbols, priced
+    inside each symbol's band.
+    """
+    rng = random.Random(seed)
+    price_bands = price_bands or {}
+    events = []
+    live = []
+    next_ref = 1
+    for _ in range(num_events):
+        if not live or rng.random() < 0.5:
+            stock = rng.randrange(num_symbols)
+            min_price, tick = price_bands.get(stock, DEFAULT_PRICE_BAND)
+            price = min_price + tick * rng.randrange(MAX_LEVELS)
+            events.append(('A', stock, next_ref, price, rng.randint(1, 100), rng.choice((SIDE_BID, SIDE_ASK))))
+            live.append((stock, next_ref))
+            next_ref += 1
+        else:
+            stock, ref = live.pop(rng.randrange(len(live)))
+            events.append(('X', stock, ref, 0, 0xFFFFFFFF, 0))
+    return events
+
+
+def apply(book, events):
+    for kind, stock, ref, price, qty, side in events:
+        if kind == 'A':
+            book.add_order(stock, ref, price, qty, side)
+        else:
+            book.cancel_order(stock, ref, qty)
+
+
+def run(num_symbols, num_events, price_bands=None):
+    """
+    Returns (steady-state events/sec, first-pass events/sec, books built).
+    The first pass includes building each symbol's books on first use; the second pass
+    replays the same kind of flow once every active symbol has its books.
+    """
+    book = StockOrderBook(order_list=HashOrderList(), num_stocks=num_symbols, price_bands=price_bands, lazy=True)
+    events = make_events(num_symbols, 2 * num_events, price_bands)
+    warmup, measured = events[:num_events], events[num_events:]
+
+    start = time.perf_counter()
+    apply(book, warmup)
+    first_rate = num_events / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    apply(book, measured)
+    rate = num_events / (time.perf_counter() - start)
+    return rate, first_rate, len(book.bid_books) + len(book.ask_books)
+
+
+def idle_symbol_cost(num_symbols):
+    """
+    Bytes allocated by a lazy book that tracks num_symbols but has seen no orders.
+    """
+    tracemalloc.start()
+    book = StockOrderBook(order_list=HashOrderList(capacity=8), num_stocks=num_symbols, lazy=True)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del book
+    return size
+
+
+def book_bytes():
+    """
+    Bytes held by one built (empty) TreeOrderBook side.
+    """
+    tracemalloc.start()
+    book = TreeOrderBook()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del book
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Order book add/cancel throughput vs symbol count.')
+    parser.add_argument('--events', type=int, default=200000, help='events per run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per symbol count (best is shown)')
+    parser.add_argument('--config', default=PRICE_BAND_CSV, help='per-symbol price bands (skipped if missing)')
+    args = parser.parse_args()
+
+    price_bands = load_price_bands(args.config) if os.path.exists(args.config) else None
+    per_book = book_bytes()
+    print(f"{'symbols':>8} {'events/sec':>12} {'first pass':>12} {'books built':>12} {'MB of books':>12} "
+          f"{'idle bytes':>11}")
+    for num_symbols in SYMBOL_COUNTS:
+        runs = [run(num_symbols, args.events, price_bands) for _ in range(args.repeat)]
+        rate = max(r[0] for r in runs)
+        first_rate = max(r[1] for r in runs)
+        books = runs[0][2]
+        print(f"{num_symbols:>8} {rate:>12,.0f} {first_rate:>12,.0f} {books:>12} {books * per_book / 1e6:>12.1f} "
+              f"{idle_symbol_cost(num_symbols):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Order book checkpoints: one compact binary file holding every tree, quantity and
+order-list array plus the feed sequence number it corresponds to.
+
+File layout (little-endian, every section starts on an 8-byte boundary):
+    header          HEADER_FORMAT (magic, version, order list kind, feed seq, counts)
+    book table      num_books x BOOK_DTYPE (stock_id, side, band, re-centering counters)
+    segment trees   num_books x (2 * num_levels) uint32
+    quantities      num_books x num_levels int64
+    order list      one array per ORDER_COLUMNS entry, order_capacity entries each
+
+load_checkpoint() memory-maps the file copy-on-write: NumPy-engine books use the mapped
+arrays in place, so a restore only touches the pages it reads.
+"""
+import os
+import struct
+from array import array
+
+import numpy as np
+
+from Orderbook import (
+    OrderBookManager, OrderList, HashOrderList, SIDE_BID, SIDE_ASK, CACHE_SIZE,
+)
+from OrderbookNumpy import NumpyTreeOrderBook
+
+MAGIC = b'OBCK'
+VERSION = 1
+# magic, version, order list kind, feed seq, num_books, num_levels, num_stocks, recenter,
+# order capacity, live orders, tombstones
+HEADER_FORMAT = '<4sHHQIIIIQQQ'
+HEADER_BYTES = struct.calcsize(HEADER_FORMAT)
+
+ORDER_LIST_FIXED = 0
+ORDER_LIST_HASH = 1
+
+BOOK_DTYPE = np.dtype([
+    ('stock_id', '<u4'),
+    ('side', '<u4'),
+    ('min_price', '<i8'),
+    ('tick_size', '<i8'),
+    ('recenter_count', '<u8'),
+    ('levels_shifted', '<u8'),
+])
+
+# (attribute, dtype) per order list kind, in file order
+ORDER_COLUMNS = {
+    ORDER_LIST_FIXED: [
+        ('order_valid', '|u1'),
+        ('order_price_index', '<i4'),
+        ('order_quantity', '<u4'),
+        ('order_ask_bid', '|u1'),
+        ('order_stock', '<u4'),
+        ('order_price', '<u4'),
+    ],
+    ORDER_LIST_HASH: [
+        ('order_ref', '<u8'),
+        ('slot_state', '|u1'),
+        ('order_price_index', '<i4'),
+        ('order_quantity', '<u4'),
+        ('order_ask_bid', '|u1'),
+        ('order_stock', '<u4'),
+        ('order_price', '<u4'),
+    ],
+}
+
+
+def align8(n):
+    return (n + 7) & ~7
+
+
+def layout(kind, num_books, num_levels, order_capacity):
+    """
+    Return [(name, dtype, count, offset)] for every section after the header.
+    """
+    sections = [
+        ('books', BOOK_DTYPE, num_books),
+        ('segment_tree', np.dtype('<u4'), num_books * 2 * num_levels),
+        ('price_quantity', np.dtype('<i8'), num_books * num_levels),
+    ]
+    for name, dtype in ORDER_COLUMNS[kind]:
+        sections.append((name, np.dtype(dtype), order_capacity))
+
+    result = []
+    offset = align8(HEADER_BYTES)
+    for name, dtype, count in sections:
+        result.append((name, dtype, count, offset))
+        offset = align8(offset + dtype.itemsize * count)
+    return result
+
+
+def save_checkpoint(path, manager, feed_seq):
+    """
+    Write the manager's book state and the feed sequence number it reflects to path.
+    The file is written next to path and renamed into place, so a crash mid-write
+    leaves the previous checkpoint intact.
+    """
+    sob = manager.stock_order_book
+    ol = sob.order_list
+    kind = ORDER_LIST_HASH if isinstance(ol, HashOrderList) else ORDER_LIST_FIXED
+
+    books = [(stock_id, SIDE_BID, book) for stock_id, book in sob.bid_books.items()]
+    books += [(stock_id, SIDE_ASK, book) for stock_id, book in sob.ask_books.items()]
+    num_books = len(books)
+    num_levels = books[0][2].num_levels if books else 0
+
+    if kind == ORDER_LIST_HASH:
+        order_capacity, live, tombstones = ol.capacity, ol.live, ol.tombstones
+    else:
+        order_capacity, live, tombstones = ol.MAX_ORDERS, 0, 0
+
+    table = np.zeros(num_books, dtype=BOOK_DTYPE)
+    trees = np.empty((num_books, 2 * num_levels), dtype='<u4')
+    quantities = np.empty((num_books, num_levels), dtype='<i8')
+    for i, (stock_id, side, book) in enumerate(books):
+        table[i] = (stock_id, side, book.min_price, book.tick_size,
+                    book.recenter_count, book.levels_shifted)
+        trees[i] = book.segment_tree
+        quantities[i] = book.price_quantity
+
+    data = {'books': table, 'segment_tree': trees, 'price_quantity': quantities}
+    for name, dtype in ORDER_COLUMNS[kind]:
+        data[name] = np.asarray(getattr(ol, name), dtype=dtype)
+
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, kind, feed_seq, num_books, num_levels,
+                         sob.num_stocks, int(sob.recenter), order_capacity, live, tombstones)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for name, dtype, count, offset in layout(kind, num_books, num_levels, order_capacity):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, manager_class=OrderBookManager, **book_options):
+    """
+    Rebuild a manager from a checkpoint. Returns (manager, feed_seq).
+    book_options go to the manager like in OrderBookManager(...) (e.g. price_bands);
+    num_stocks, recenter, lazy and the order list come from the file.
+    """
+    mapped = np.memmap(path, dtype=np.uint8, mode='c')
+    (magic, version, kind, feed_seq, num_books, num_levels, num_stocks, recenter,
+     order_capacity, live, tombstones) = struct.unpack_from(HEADER_FORMAT, mapped)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not an order book checkpoint (version {VERSION})")
+
+    sections = {}
+    for name, dtype, count, offset in layout(kind, num_books, num_levels, order_capacity):
+        sections[name] = mapped[offset:offset + dtype.itemsize * count].view(dtype)
+
+    if kind == ORDER_LIST_HASH:
+        order_list = HashOrderList(capacity=order_capacity)
+        for name, dtype in ORDER_COLUMNS[kind]:
+            column = getattr(order_list, name)
+            setattr(order_list, name, array(column.typecode, sections[name].tobytes()))
+        order_list.live = live
+        order_list.tombstones = tombstones
+    else:
+        order_list = OrderList()
+        order_list.order_valid = sections['order_valid'].astype(bool).tolist()
+        for name, dtype in ORDER_COLUMNS[kind][1:]:
+            setattr(order_list, name, sections[name].tolist())
+
+    manager = manager_class(order_list=order_list, recenter=bool(recenter),
+                            num_stocks=num_stocks, lazy=True, **book_options)
+    sob = manager.stock_order_book
+    trees = sections['segment_tree'].reshape(num_books, 2 * num_levels)
+    quantities = sections['price_quantity'].reshape(num_books, num_levels)
+
+    for i, entry in enumerate(sections['books']):
+        stock_id = int(entry['stock_id'])
+        side = int(entry['side'])
+        book = sob.bid_books[stock_id] if side == SIDE_BID else sob.ask_books[stock_id]
+        book.min_price = int(entry['min_price'])
+        book.tick_size = int(entry['tick_size'])
+        book.max_price = book.min_price + book.tick_size * (book.num_levels - 1)
+        book.recenter_count = int(entry['recenter_count'])
+        book.levels_shifted = int(entry['levels_shifted'])
+
+        if isinstance(book, NumpyTreeOrderBook):
+            # Use the mapped pages directly
+            book.segment_tree = trees[i]
+            book.price_quantity = quantities[i]
+        else:
+            book.segment_tree = trees[i].tolist()
+            book.price_quantity = quantities[i].tolist()
+            levels = np.flatnonzero(quantities[i] > 0)
+            if side == SIDE_BID:
+                levels = levels[::-1]
+            book.top_cache = levels[:CACHE_SIZE].tolist()
+        # The aggregate trees are derived from price_quantity, so they aren't stored
+        book.rebuild_aggregates()
+    if sob.recenter:
+        sob.rebuild_book_orders()
+
+    return manager, feed_seq
+
+
+# -------------------------------------------------------------------------
+# Example usage: checkpoint a book, restore it, compare snapshots
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    from Orderbook import MIN_PRICE_INIT, TICK_INIT, MAX_LEVELS, MAX_ORDER_NUM
+    from OrderbookNumpy import NumpyOrderBookManager
+
+    random.seed(3)
+    for manager_class in (OrderBookManager, NumpyOrderBookManager):
+        for order_list in (OrderList(), HashOrderList()):
+            manager = manager_class(order_list=order_list)
+            for _ in range(20000):
+                stock = random.randrange(4)
+                ref = random.randrange(MAX_ORDER_NUM)
+                if random.random() < 0.6:
+                    price = MIN_PRICE_INIT[stock] + TICK_INIT[stock] * random.randrange(MAX_LEVELS)
+                    manager.add_order(stock, ref, price, random.randint(1, 100), random.randint(0, 1))
+                else:
+                    manager.cancel_order(stock, ref, random.randint(1, 60))
+
+            path = os.path.join(tempfile.gettempdir(), 'orderbook.ckpt')
+            save_checkpoint(path, manager, feed_seq=20000)
+            start = time.perf_counter()
+            restored, seq = load_checkpoint(path, manager_class=manager_class)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            assert seq == 20000
+            assert restored.publish_snapshot() == manager.publish_snapshot(), "snapshot mismatch"
+            print(f"{manager_class.__name__:>22} / {type(order_list).__name__:<13} "
+                  f"{os.path.getsize(path):>8} bytes, restored in {elapsed_ms:.2f} ms")
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+asyncio fan-out replay server: one process drives the FPGA board and any number of
+test_tcp_client.py instances with the same feed at once.
+
+    python fanout_server.py [data/output.bin] [--host 0.0.0.0] [--port 22]
+        [--rate 20000 | --burst 50 --period-us 1000 | --speed 10 | --delay 0.06]
+        [--policy pause|drop|disconnect] [--high-water 4194304]
+
+- Every connection gets its own cursor (from --start, optionally only --stocks) and
+  its own Pacer over one shared memory-mapped ReplaySource; nothing is read per client.
+- Frames due at the same time go out in one transport.write; a client's task sleeps
+  on the event loop until its next deadline, so clients never wait on each other
+  (pacing is at event-loop resolution, ~1 ms, with late frames sent together).
+- A client whose transport buffer passes --high-water is slow. Per --policy:
+    pause:      stop its replay until the buffer drains to --low-water; its
+                schedule resumes from there (nothing is lost, it just falls behind)
+    drop:       keep its schedule and skip frames until it drains (counted)
+    disconnect: close it
+- Orders (OUCH) the clients send back are counted per client; itch_server.py
+  --monitor is still the way to log them for the GUI.
+Per-client stats are printed when a client's replay ends, and again when it closes.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+
+import pacer
+from itch_replay import ReplaySource
+
+DEFAULT_FILE = 'data/output.bin'
+DEFAULT_PORT = 22
+POLICIES = ('pause', 'drop', 'disconnect')
+HIGH_WATER = 4 * 1024 * 1024  # transport buffer bytes that make a client slow
+LOW_WATER = 1024 * 1024  # ... and that make it not slow again
+MAX_WRITE_FRAMES = 4096  # frames per write before yielding to the other clients
+
+LOGGING_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class ReplayClient(asyncio.Protocol):
+    """
+    One connection: cursor, pacing and slow-client state.
+    """
+    ids = itertools.count(1)
+
+    def __init__(self, server):
+        self.server = server
+        self.id = next(self.ids)
+        self.pacer = server.make_pacer()
+        self.transport = None
+        self.peer = None
+        self.slow = False
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.closed = False
+        self.task = None
+        # Stats
+        self.sent = 0
+        self.dropped = 0
+        self.slow_spells = 0
+        self.slow_seconds = 0.0
+        self.slow_since = None
+        self.received = 0
+
+    # -------------------------------------------------------------------------
+    # asyncio.Protocol
+    # -------------------------------------------------------------------------
+    def connection_made(self, transport):
+        self.transport = transport
+        self.peer = transport.get_extra_info('peername')
+        transport.set_write_buffer_limits(high=self.server.high_water, low=self.server.low_water)
+        print(f"client {self.id}: connected from {self.peer}")
+        self.task = asyncio.get_running_loop().create_task(self.replay())
+        self.server.clients.add(self)
+
+    def data_received(self, data):
+        self.received += len(data)
+        logging.debug(f"client {self.id}: {len(data)} bytes of orders")
+
+    def pause_writing(self):
+        self.slow = True
+        self.slow_spells += 1
+        self.slow_since = time.perf_counter()
+        self.drained.clear()
+        if self.server.policy == 'disconnect':
+            print(f"client {self.id}: over {self.server.high_water:,} buffered bytes, disconnecting")
+            self.closed = True
+            self.transport.abort()
+
+    def resume_writing(self):
+        self.slow = False
+        self.slow_seconds += time.perf_counter() - self.slow_since
+        self.drained.set()
+
+    def connection_lost(self, exc):
+        print(f"client {self.id}: closed, {self.received:,} bytes of orders received")
+        self.closed = True
+        self.drained.set()
+        self.server.clients.discard(self)
+
+    # -------------------------------------------------------------------------
+    # Replay
+    # -------------------------------------------------------------------------
+    def write(self, batch):
+        if not batch or self.closed:
+            return
+        if self.slow and self.server.policy == 'drop':
+            self.dropped += len(batch)
+            return
+        self.transport.write(b''.join(batch))
+        self.sent += len(batch)
+
+    async def replay(self):
+        server = self.server
+        now = time.perf_counter_ns
+        policy = server.policy
+        schedule = self.pacer.schedule(server.source.frames(server.start, server.stock_ids))
+        origin = now()
+        batch = []
+        try:
+            for index, (offset, frame) in enumerate(schedule):
+                if offset is None:
+                    deadline = now()
+                else:
+                    deadline = origin + offset
+                    delay = deadline - now()
+                    if delay > 0:
+                        self.write(batch)
+                        batch = []
+                        await asyncio.sleep(delay / 1e9)
+                if self.closed:
+                    return
+                origin += self.pacer.release(index, deadline, now())
+                batch.append(frame)
+                if len(batch) >= MAX_WRITE_FRAMES:
+                    self.write(batch)
+                    batch = []
+                    await asyncio.sleep(0)  # let the other clients run
+                if self.slow and policy == 'pause':
+                    self.write(batch)
+                    batch = []
+                    paused = now()
+                    await self.drained.wait()
+                    # Pick the schedule up where it stopped
+                    origin += now() - paused
+            self.write(batch)
+        except Exception as e:
+            print(f"client {self.id}: replay failed: {e}")
+        finally:
+            if not self.closed:
+                # Half-close once the buffered frames are out; the client closes when it is
+                # done (closing outright would reset it if it is still sending orders)
+                if self.transport.can_write_eof():
+                    self.transport.write_eof()
+                else:
+                    self.transport.close()
+            self.report()
+
+    def report(self):
+        if self.slow_since is not None and self.slow:
+            self.slow_seconds += time.perf_counter() - self.slow_since
+        print(f"client {self.id} {self.peer}: {self.sent:,} sent, {self.dropped:,} dropped, "
+              f"slow {self.slow_spells} times ({self.slow_seconds:.2f} s)")
+        print(f"client {self.id}: {self.pacer.report_line()}")
+
+
+class FanoutServer:
+    """
+    The shared store, the replay settings every client starts with, and the clients.
+    """
+
+    def __init__(self, source, pacing_args, start=0, stock_ids=None, policy='pause',
+                 high_water=HIGH_WATER, low_water=LOW_WATER):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.source = source
+        self.pacing_args = pacing_args
+        self.start = start
+        self.stock_ids = stock_ids
+        self.policy = policy
+        self.high_water = high_water
+        self.low_water = min(low_water, high_water)
+        self.clients = set()
+
+    def make_pacer(self):
+        """
+        A fresh Pacer per client (pacing_args: pacer.add_arguments options plus --delay).
+        """
+        args = self.pacing_args
+        return pacer.from_arguments(args) or pacer.Pacer(rate=1 / args.delay if args.delay else None)
+
+    async def serve(self, host, port):
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(lambda: ReplayClient(self), host, port, reuse_address=True)
+        print(f"Listening on {host}:{port}, {self.source.size:,} bytes mapped from {self.source.path}, "
+              f"slow-client policy {self.policy}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format=LOGGING_FORMAT, level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Replay one ITCH .bin to many clients at once.')
+    arg_parser.add_argument('bin_file', nargs='?', default=DEFAULT_FILE, help='length-prefixed ITCH file')
+    arg_parser.add_argument('--host', default='0.0.0.0', help='address to listen on')
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    arg_parser.add_argument('--start', type=int, default=0, help='first message to replay (seeks via the .idx sidecar)')
+    arg_parser.add_argument('--stocks', type=int, nargs='+', default=None, help='replay only these stock ids')
+    arg_parser.add_argument('--delay', type=float, default=0.0,
+                            help='seconds between messages (without --rate/--period-us/--speed; 0 = unpaced)')
+    pacer.add_arguments(arg_parser)
+    arg_parser.add_argument('--policy', choices=POLICIES, default='pause', help='what to do with a slow client')
+    arg_parser.add_argument('--high-water', type=int, default=HIGH_WATER, help='buffered bytes that make a client slow')
+    arg_parser.add_argument('--low-water', type=int, default=LOW_WATER, help='buffered bytes it must drain to')
+    args = arg_parser.parse_args()
+
+    source = ReplaySource(args.bin_file)
+    pacer.check_source(arg_parser, args, source)
+    fanout = FanoutServer(source, args, args.start, args.stocks, args.policy,
+                          args.high_water, args.low_water)
+    try:
+        asyncio.run(fanout.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Stopped.")
@@ -1,5 +1,6 @@
 import socket
 from itch_parser import ITCHParser
+from itch_framer import StreamFramer
 import logging
 import os
 import argparse
@@ -27,45 +28,25 @@ def main(output_file):
         # Connect the socket to the server
         client_socket.connect((server_ip, server_port))
         print(f"Connected to {server_ip}:{server_port}")
-        num_bytes_to_skip = 0
+        framer = StreamFramer()
         with open(output_file, 'wb') as output_file_handle:
-            while True:
-                # Receive data from the server
-                data = client_socket.recv(1024 * 1024)
-                if not data:
-                    break
-                while data:
-                    # Skip bytes if necessary. Some messages are split across multiple data packets. Skipping incomplete messages.
-                    if num_bytes_to_skip > 0:
-                        if num_bytes_to_skip > len(data):
-                            num_bytes_to_skip -= len(data)
-                            break
-                        else:
-                            data = data[num_bytes_to_skip:]
-                            num_bytes_to_skip = 0
-                    # Parse the message length
-                    length = int.from_bytes(data[:2], byteorder='big')
-                    if length > len(data[2:]):
-                        logging.debug(f"Expected message length: {length}, actual length: {len(data[2:])}")
-                        num_bytes_to_skip = length - len(data[2:])
-                    message = data[2:2 + length]
+            # Receive data from the server; the framer keeps messages split across reads
+            while framer.fill(client_socket):
+                for message in framer.frames():
+                    length = len(message)
                     # Decode the message
-                    message_type_code = message[0:1]
-                    message_data = message[1:]
+                    message_type_code = message[0:1].tobytes()
 
                     logging.debug(f"message_type_code: {message_type_code}, message length: {length}. ")
 
-                    decoded_message = parser.decode_message(message_type_code, message_data)
+                    decoded_message = parser.decode_from(message)
                     if decoded_message is not None:
                         if LOGGING_LEVEL == logging.DEBUG:
                             parser.print_human_readable_message(decoded_message)
 
                     if message_type_code in [b'A', b'F', b'E', b'C', b'X', b'D', b'U']:
-                        full_message = length.to_bytes(2, byteorder='big') + message
-                        output_file_handle.write(full_message)
-
-                    # Move to the next message
-                    data = data[2 + length:]
+                        output_file_handle.write(length.to_bytes(2, byteorder='big'))
+                        output_file_handle.write(message)
 
     except Exception as e:
         print(f"An error occurred: {e}")
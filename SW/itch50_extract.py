@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Offline extractor: NASDAQ ITCH 5.0 day file (.gz) -> length-prefixed replay .bin.
+
+Produces the same file get_test_data_tcp_client.py records from a live server
+(default: the order messages A F E C X D U), straight from the raw download:
+    python itch50_extract.py data/01302019.NASDAQ_ITCH50.gz \
+        -o data/01302019.NASDAQ_ITCH50_AFECXDU.bin [--types AFECXDU] [--locates 13 42]
+
+Pipeline, one thread per stage with bounded queues between them (memory stays at a
+few chunks no matter how big the day file is):
+    reader  - READ_SIZE blocks of compressed bytes from disk
+    inflate - zlib.decompressobj, at most INFLATE_SIZE bytes out per step (multi-member
+              gzip files are followed member by member)
+    filter  - (calling thread) frames found with itch50_parser.scan_offsets, selected by
+              type and stock locate, selected frames cut out with one boolean mask
+    writer  - output in WRITE_SIZE buffered writes
+zlib and file I/O release the GIL, so decompression overlaps filtering and writing.
+"""
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from itch50_parser import byte_strided, scan_offsets
+
+READ_SIZE = 8 * 1024 * 1024  # compressed bytes per read
+INFLATE_SIZE = 32 * 1024 * 1024  # decompressed bytes per step
+WRITE_SIZE = 64 * 1024 * 1024  # output buffered before each write
+QUEUE_DEPTH = 4  # chunks in flight between two stages
+DEFAULT_TYPES = 'AFECXDU'
+DEFAULT_INPUT = 'data/01302019.NASDAQ_ITCH50.gz'
+DEFAULT_OUTPUT = 'data/01302019.NASDAQ_ITCH50_AFECXDU.bin'
+PROGRESS_EVERY = 5.0  # seconds between progress lines
+
+LOGGING_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_DONE = None  # end-of-stream marker passed down the queues
+
+
+# -------------------------------------------------------------------------
+# Pipeline stages
+# -------------------------------------------------------------------------
+class Stage(threading.Thread):
+    """
+    Worker thread that passes whatever it produces to `output` and always ends the
+    stream with _DONE, so a failure upstream can't leave the next stage waiting.
+    An exception is kept in .error and re-raised by extract().
+    """
+
+    def __init__(self, name, work, output=None):
+        super().__init__(name=name, daemon=True)
+        self.work = work
+        self.output = output
+        self.error = None
+
+    def run(self):
+        try:
+            self.work()
+        except BaseException as e:
+            self.error = e
+        finally:
+            if self.output is not None:
+                self.output.put(_DONE)
+
+
+def put_while_alive(output, item, consumer):
+    """
+    output.put(item), unless the consumer stage stops first: then nothing will ever
+    drain the queue, so give up and return False.
+    """
+    while True:
+        try:
+            output.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            if not consumer.is_alive():
+                return False
+
+
+def read_chunks(path, output, stats, stop):
+    with open(path, 'rb') as f:
+        while not stop.is_set():
+            block = f.read(READ_SIZE)
+            if not block:
+                return
+            stats['compressed_bytes'] += len(block)
+            output.put(block)
+
+
+def inflate_chunks(source, output, stop):
+    """
+    gzip -> raw bytes. Output steps are capped at INFLATE_SIZE (unconsumed_tail keeps
+    the rest of the input), so one highly compressed block can't blow up memory.
+    """
+    inflater = zlib.decompressobj(wbits=31)
+    in_member = False
+    while True:
+        block = source.get()
+        if block is _DONE or stop.is_set():
+            return
+        while block and not stop.is_set():
+            in_member = True
+            data = inflater.decompress(block, INFLATE_SIZE)
+            if data:
+                output.put(data)
+            if inflater.eof:
+                # Next gzip member (concatenated .gz files are legal)
+                block = inflater.unused_data
+                inflater = zlib.decompressobj(wbits=31)
+                in_member = False
+            else:
+                block = inflater.unconsumed_tail
+    if in_member:
+        raise EOFError("compressed file ended before the end-of-stream marker was reached")
+
+
+def write_chunks(path, source):
+    with open(path, 'wb', buffering=0) as f:
+        pending = []
+        size = 0
+        while True:
+            data = source.get()
+            if data is _DONE:
+                break
+            pending.append(data)
+            size += len(data)
+            if size >= WRITE_SIZE:
+                f.write(b''.join(pending))
+                pending, size = [], 0
+        if pending:
+            f.write(b''.join(pending))
+
+
+# -------------------------------------------------------------------------
+# Frame filter
+# -------------------------------------------------------------------------
+class FrameFilter:
+    """
+    Selects frames of a length-prefixed ITCH 5.0 stream fed in arbitrary chunks.
+    - types: message type letters to keep.
+    - locates: stock locate codes to keep (None = all). Messages without a stock
+      (system events, locate 0) only pass if 0 is in the set.
+    A frame cut off at the end of a chunk is carried over to the next one.
+    """
+
+    def __init__(self, types=DEFAULT_TYPES, locates=None):
+        self.keep_type = np.zeros(256, dtype=bool)
+        self.keep_type[list(types.encode())] = True
+        self.keep_locate = None
+        if locates is not None:
+            self.keep_locate = np.zeros(65536, dtype=bool)
+            self.keep_locate[list(locates)] = True
+        self.carry = b''
+        self.messages = 0
+        self.kept = 0
+        self.type_counts = np.zeros(256, dtype=np.int64)
+
+    def feed(self, chunk):
+        """
+        Returns the bytes of the selected complete frames (length prefix included).
+        """
+        data = self.carry + chunk if self.carry else chunk
+        raw = np.frombuffer(data, dtype=np.uint8)
+        frames = scan_offsets(raw)
+        if not len(frames):
+            self.carry = data
+            return b''
+        sizes = byte_strided(raw, 2)[frames].astype(np.int64) + 2
+        consumed = int(frames[-1] + sizes[-1])
+        self.carry = data[consumed:]
+
+        # Zero-length frames have no type byte (the read is clamped) and are never kept
+        types = raw[np.minimum(frames + 2, len(raw) - 1)]
+        keep = self.keep_type[types] & (sizes > 2)
+        if self.keep_locate is not None:
+            has_locate = sizes >= 5
+            locates = byte_strided(raw, 2)[np.where(has_locate, frames + 3, 0)]
+            keep &= has_locate & self.keep_locate[locates]
+
+        self.messages += len(frames)
+        self.kept += int(np.count_nonzero(keep))
+        self.type_counts += np.bincount(types, minlength=256)
+        if keep.all():
+            return raw[:consumed].tobytes()
+        return raw[:consumed][np.repeat(keep, sizes)].tobytes()
+
+
+# -------------------------------------------------------------------------
+# Driver
+# -------------------------------------------------------------------------
+def extract(input_path, output_path, types=DEFAULT_TYPES, locates=None, progress=True):
+    """
+    Run the whole pipeline. Returns a stats dict (bytes in/out, messages seen/kept,
+    per-type counts, seconds).
+    """
+    stats = {'compressed_bytes': 0, 'raw_bytes': 0, 'output_bytes': 0}
+    compressed = queue.Queue(QUEUE_DEPTH)
+    inflated = queue.Queue(QUEUE_DEPTH)
+    selected = queue.Queue(QUEUE_DEPTH)
+    stop = threading.Event()  # set once the pipeline ends, early or not
+    reader = Stage('reader', lambda: read_chunks(input_path, compressed, stats, stop), compressed)
+    inflate = Stage('inflate', lambda: inflate_chunks(compressed, inflated, stop), inflated)
+    writer = Stage('writer', lambda: write_chunks(output_path, selected))
+    frame_filter = FrameFilter(types, locates)
+    start = time.perf_counter()
+    last_report = start
+    for stage in (reader, inflate, writer):
+        stage.start()
+    try:
+        while True:
+            chunk = inflated.get()
+            if chunk is _DONE:
+                break
+            stats['raw_bytes'] += len(chunk)
+            out = frame_filter.feed(chunk)
+            stats['output_bytes'] += len(out)
+            if out and not put_while_alive(selected, out, writer):
+                break  # the writer failed; its error is raised below
+            now = time.perf_counter()
+            if progress and now - last_report >= PROGRESS_EVERY:
+                last_report = now
+                logging.info(f"{stats['raw_bytes'] / 1e9:.2f} GB inflated, {frame_filter.messages:,} messages, "
+                             f"{frame_filter.messages / (now - start):,.0f} msgs/sec")
+    finally:
+        stop.set()
+        put_while_alive(selected, _DONE, writer)
+        writer.join()
+        # After an early stop the stages upstream may be blocked on a full queue
+        for stage, output in ((inflate, inflated), (reader, compressed)):
+            while stage.is_alive():
+                try:
+                    output.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+    for stage in (reader, inflate, writer):
+        if stage.error is not None:
+            raise stage.error
+    if frame_filter.carry:
+        logging.warning(f"{len(frame_filter.carry)} bytes of truncated frame at the end of {input_path}")
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['messages'] = frame_filter.messages
+    stats['kept'] = frame_filter.kept
+    stats['type_counts'] = {chr(code): int(count) for code, count in enumerate(frame_filter.type_counts) if count}
+    return stats
+
+
+def report(stats):
+    seconds = stats['seconds']
+    print(f"{stats['compressed_bytes'] / 1e6:,.0f} MB gz -> {stats['raw_bytes'] / 1e6:,.0f} MB raw -> "
+          f"{stats['output_bytes'] / 1e6:,.0f} MB written in {seconds:.1f} s")
+    print(f"{stats['messages']:,} messages ({stats['messages'] / seconds:,.0f} msgs/sec, "
+          f"{stats['raw_bytes'] / seconds / 1e6:,.0f} MB/s inflated), {stats['kept']:,} kept")
+    print("by type: " + ", ".join(f"{code} {count:,}" for code, count in sorted(stats['type_counts'].items())))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format=LOGGING_FORMAT, level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Extract ITCH 5.0 messages from a .gz day file into a replay .bin.')
+    parser.add_argument('input', nargs='?', default=DEFAULT_INPUT, help='gzipped ITCH 5.0 file')
+    parser.add_argument('-o', '--output_file', default=DEFAULT_OUTPUT, help='length-prefixed output file')
+    parser.add_argument('--types', default=DEFAULT_TYPES, help='message type letters to keep')
+    parser.add_argument('--locates', type=int, nargs='+', help='stock locate codes to keep (default all)')
+    args = parser.parse_args()
+
+    if os.path.dirname(args.output_file):
+        os.makedirs(os.path.dirname(args.output_file), exist_ok=True)
+    report(extract(args.input, args.output_file, args.types, args.locates))
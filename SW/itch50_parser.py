@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+NASDAQ TotalView-ITCH 5.0 parser (the 01302019.NASDAQ_ITCH50 files itch_server.py refers to).
+
+Every message type is described once in MESSAGE_SPECS; at import each entry is turned
+into a precompiled struct.Struct, a namedtuple class and a generated decode function,
+cached in a 256-entry table indexed by the type byte. 6-byte timestamps come out as
+integer nanoseconds since midnight (format_timestamp() renders them without datetime).
+
+Two ways in:
+- ITCH50Parser.decode(buf, offset): one message (starting at its type byte) as a namedtuple.
+- decode_columns(buf): every order message (A F E C X D U) of a length-prefixed stream
+  decoded straight into preallocated NumPy columns (ORDER_COLUMNS), no
+  per-message Python work. Frame offsets are found by scan_offsets (vectorized, see there).
+"""
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# -------------------------------------------------------------------------
+# Message table (ITCH 5.0 spec, section 1.x); every message starts with
+# MessageType, StockLocate, TrackingNumber, Timestamp (11 bytes)
+# -------------------------------------------------------------------------
+# field kinds:
+#   ('u', n)     unsigned big-endian integer of n bytes (1, 2, 4, 8)
+#   ('ts', 6)    6-byte nanoseconds since midnight
+#   ('price', n) integer price, 4 decimal places (n = 4) or 8 decimal places (n = 8)
+#   ('alpha', n) ASCII, right-padded with spaces
+HEADER_FIELDS = [
+    ('StockLocate', ('u', 2)),
+    ('TrackingNumber', ('u', 2)),
+    ('Timestamp', ('ts', 6)),
+]
+
+MESSAGE_SPECS = {
+    'S': ('SystemEvent', [('EventCode', ('alpha', 1))]),
+    'R': ('StockDirectory', [
+        ('Stock', ('alpha', 8)), ('MarketCategory', ('alpha', 1)),
+        ('FinancialStatusIndicator', ('alpha', 1)), ('RoundLotSize', ('u', 4)),
+        ('RoundLotsOnly', ('alpha', 1)), ('IssueClassification', ('alpha', 1)),
+        ('IssueSubType', ('alpha', 2)), ('Authenticity', ('alpha', 1)),
+        ('ShortSaleThresholdIndicator', ('alpha', 1)), ('IPOFlag', ('alpha', 1)),
+        ('LULDReferencePriceTier', ('alpha', 1)), ('ETPFlag', ('alpha', 1)),
+        ('ETPLeverageFactor', ('u', 4)), ('InverseIndicator', ('alpha', 1)),
+    ]),
+    'H': ('StockTradingAction', [
+        ('Stock', ('alpha', 8)), ('TradingState', ('alpha', 1)),
+        ('Reserved', ('alpha', 1)), ('Reason', ('alpha', 4)),
+    ]),
+    'Y': ('RegSHORestriction', [('Stock', ('alpha', 8)), ('RegSHOAction', ('alpha', 1))]),
+    'L': ('MarketParticipantPosition', [
+        ('MPID', ('alpha', 4)), ('Stock', ('alpha', 8)), ('PrimaryMarketMaker', ('alpha', 1)),
+        ('MarketMakerMode', ('alpha', 1)), ('MarketParticipantState', ('alpha', 1)),
+    ]),
+    'V': ('MWCBDeclineLevel', [
+        ('Level1', ('price', 8)), ('Level2', ('price', 8)), ('Level3', ('price', 8)),
+    ]),
+    'W': ('MWCBStatus', [('BreachedLevel', ('alpha', 1))]),
+    'K': ('IPOQuotingPeriodUpdate', [
+        ('Stock', ('alpha', 8)), ('IPOQuotationReleaseTime', ('u', 4)),
+        ('IPOQuotationReleaseQualifier', ('alpha', 1)), ('IPOPrice', ('price', 4)),
+    ]),
+    'J': ('LULDAuctionCollar', [
+        ('Stock', ('alpha', 8)), ('AuctionCollarReferencePrice', ('price', 4)),
+        ('UpperAuctionCollarPrice', ('price', 4)), ('LowerAuctionCollarPrice', ('price', 4)),
+        ('AuctionCollarExtension', ('u', 4)),
+    ]),
+    'h': ('OperationalHalt', [
+        ('Stock', ('alpha', 8)), ('MarketCode', ('alpha', 1)),
+        ('OperationalHaltAction', ('alpha', 1)),
+    ]),
+    'A': ('AddOrder', [
+        ('OrderReferenceNumber', ('u', 8)), ('BuySellIndicator', ('alpha', 1)),
+        ('Shares', ('u', 4)), ('Stock', ('alpha', 8)), ('Price', ('price', 4)),
+    ]),
+    'F': ('AddOrderMPID', [
+        ('OrderReferenceNumber', ('u', 8)), ('BuySellIndicator', ('alpha', 1)),
+        ('Shares', ('u', 4)), ('Stock', ('alpha', 8)), ('Price', ('price', 4)),
+        ('Attribution', ('alpha', 4)),
+    ]),
+    'E': ('OrderExecuted', [
+        ('OrderReferenceNumber', ('u', 8)), ('ExecutedShares', ('u', 4)),
+        ('MatchNumber', ('u', 8)),
+    ]),
+    'C': ('OrderExecutedWithPrice', [
+        ('OrderReferenceNumber', ('u', 8)), ('ExecutedShares', ('u', 4)),
+        ('MatchNumber', ('u', 8)), ('Printable', ('alpha', 1)), ('ExecutionPrice', ('price', 4)),
+    ]),
+    'X': ('OrderCancel', [('OrderReferenceNumber', ('u', 8)), ('CancelledShares', ('u', 4))]),
+    'D': ('OrderDelete', [('OrderReferenceNumber', ('u', 8))]),
+    'U': ('OrderReplace', [
+        ('OriginalOrderReferenceNumber', ('u', 8)), ('NewOrderReferenceNumber', ('u', 8)),
+        ('Shares', ('u', 4)), ('Price', ('price', 4)),
+    ]),
+    'P': ('Trade', [
+        ('OrderReferenceNumber', ('u', 8)), ('BuySellIndicator', ('alpha', 1)),
+        ('Shares', ('u', 4)), ('Stock', ('alpha', 8)), ('Price', ('price', 4)),
+        ('MatchNumber', ('u', 8)),
+    ]),
+    'Q': ('CrossTrade', [
+        ('Shares', ('u', 8)), ('Stock', ('alpha', 8)), ('CrossPrice', ('price', 4)),
+        ('MatchNumber', ('u', 8)), ('CrossType', ('alpha', 1)),
+    ]),
+    'B': ('BrokenTrade', [('MatchNumber', ('u', 8))]),
+    'I': ('NOII', [
+        ('PairedShares', ('u', 8)), ('ImbalanceShares', ('u', 8)),
+        ('ImbalanceDirection', ('alpha', 1)), ('Stock', ('alpha', 8)),
+        ('FarPrice', ('price', 4)), ('NearPrice', ('price', 4)),
+        ('CurrentReferencePrice', ('price', 4)), ('CrossType', ('alpha', 1)),
+        ('PriceVariationIndicator', ('alpha', 1)),
+    ]),
+    'N': ('RetailPriceImprovementIndicator', [('Stock', ('alpha', 8)), ('InterestFlag', ('alpha', 1))]),
+    'O': ('DirectListingCapitalRaise', [
+        ('Stock', ('alpha', 8)), ('OpenEligibilityStatus', ('alpha', 1)),
+        ('MinimumAllowablePrice', ('price', 4)), ('MaximumAllowablePrice', ('price', 4)),
+        ('NearExecutionPrice', ('price', 4)), ('NearExecutionTime', ('u', 8)),
+        ('LowerPriceRangeCollar', ('price', 4)), ('UpperPriceRangeCollar', ('price', 4)),
+    ]),
+}
+
+INT_CODES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+
+# -------------------------------------------------------------------------
+# Decoder generation
+# -------------------------------------------------------------------------
+def build_decoder(type_code, class_name, body_fields):
+    """
+    Compile one message spec into (Struct, namedtuple class, decode function, field offsets).
+    The decode function is generated source, so each message is one unpack_from plus a
+    tuple build with no per-field dispatch at run time.
+    """
+    fields = [('MessageType', ('alpha', 1))] + HEADER_FIELDS + body_fields
+    fmt = '>'
+    args = []
+    outputs = []
+    offsets = {}
+    pos = 0
+    for name, (kind, size) in fields:
+        offsets[name] = (pos, kind, size)
+        pos += size
+        if kind == 'ts':
+            fmt += 'HI'
+            args += [f'{name}_hi', f'{name}_lo']
+            outputs.append(f'({name}_hi << 32) | {name}_lo')
+        elif kind == 'alpha':
+            fmt += f'{size}s'
+            args.append(name)
+            if size == 1:
+                outputs.append(f"{name}.decode('ascii')")
+            else:
+                outputs.append(f"{name}.decode('ascii').rstrip()")
+        else:
+            fmt += INT_CODES[size]
+            args.append(name)
+            outputs.append(name)
+
+    layout = struct.Struct(fmt)
+    message_class = namedtuple(class_name, [name for name, _ in fields])
+    source = (
+        f"def decode_{class_name}(buf, offset, _unpack_from=_unpack_from, _new=_new):\n"
+        f"    {', '.join(args)}, = _unpack_from(buf, offset)\n"
+        f"    return _new(({', '.join(outputs)},))\n"
+    )
+    namespace = {'_unpack_from': layout.unpack_from, '_new': message_class._make}
+    exec(source, namespace)
+    return layout, message_class, namespace[f'decode_{class_name}'], offsets
+
+
+DECODERS = [None] * 256  # type byte -> generated decode function
+MESSAGE_STRUCTS = {}  # type code -> struct.Struct of the whole message
+MESSAGE_CLASSES = {}  # type code -> namedtuple class
+MESSAGE_LENGTHS = np.zeros(256, dtype=np.int64)  # type byte -> message length (0 = unknown)
+FIELD_OFFSETS = {}  # type code -> {field: (offset, kind, size)}
+for _code, (_class_name, _body) in MESSAGE_SPECS.items():
+    MESSAGE_STRUCTS[_code], MESSAGE_CLASSES[_code], DECODERS[ord(_code)], FIELD_OFFSETS[_code] = \
+        build_decoder(_code, _class_name, _body)
+    MESSAGE_LENGTHS[ord(_code)] = MESSAGE_STRUCTS[_code].size
+LENGTH_BYTE = MESSAGE_LENGTHS.astype(np.uint8)  # every spec length fits in the low byte
+
+
+def format_timestamp(ns):
+    """
+    Nanoseconds since midnight as HH:MM:SS.nnnnnnnnn (integer math only).
+    """
+    seconds, nanos = divmod(ns, 1000000000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{nanos:09d}"
+
+
+class ITCH50Parser:
+    def decode(self, buf, offset=0):
+        """
+        Decode the message starting at buf[offset] (its type byte). Returns the
+        message's namedtuple, or None for an unknown type or a message cut short.
+        """
+        remaining = len(buf) - offset
+        if remaining <= 0:
+            return None
+        type_byte = buf[offset]
+        decoder = DECODERS[type_byte]
+        if decoder is None or remaining < MESSAGE_LENGTHS[type_byte]:
+            return None
+        return decoder(buf, offset)
+
+    def decode_message(self, message_type_code: bytes, message_data: bytes):
+        """
+        Same call shape as ITCHParser.decode_message (type byte, then the rest).
+        """
+        return self.decode(message_type_code + message_data)
+
+    def iter_messages(self, buf):
+        """
+        Yield every message of a length-prefixed stream (2-byte big-endian length + message).
+        """
+        view = memoryview(buf)
+        for offset in scan_offsets(buf):
+            message = self.decode(view, int(offset) + 2)
+            if message is not None:
+                yield message
+
+
+# -------------------------------------------------------------------------
+# Offset scan
+# -------------------------------------------------------------------------
+def scan_offsets_sequential(raw, start=0):
+    """
+    Offsets of every complete frame from start on, one length prefix at a time.
+    """
+    buf = memoryview(raw).cast('B')
+    end = len(buf)
+    offsets = []
+    append = offsets.append
+    pos = start
+    while pos + 2 <= end:
+        length = (buf[pos] << 8) | buf[pos + 1]
+        if pos + 2 + length > end:
+            break
+        append(pos)
+        pos += 2 + length
+    return np.array(offsets, dtype=np.int64)
+
+
+SEGMENT_BYTES = 4096  # scan_offsets walks one chain of frames per segment of this size
+SYNC_WINDOW = 64  # bytes searched for a plausible frame start at each segment boundary
+
+
+def walk_segments(raw, starts, stops):
+    """
+    Follow the length prefixes from every starts[i] until the position reaches stops[i],
+    all segments one step at a time. Returns (rows, final): rows[i] holds the frame
+    offsets visited in segment i, padded with -1; final[i] is the position after its
+    last complete frame (where the walk would carry on).
+    """
+    end = len(raw)
+    lengths = byte_strided(raw, 2)
+    pos = starts.copy()
+    live = (pos < stops) & (pos + 2 <= end)
+    pos[~live] = 0
+    steps = []
+    while live.any():
+        nxt = pos + 2 + lengths[pos]
+        complete = live & (nxt <= end)
+        steps.append(np.where(complete, pos, -1))
+        live = complete & (nxt < stops) & (nxt + 2 <= end)
+        pos = np.where(live, nxt, 0)
+    if not steps:
+        return np.full((len(starts), 1), -1, dtype=np.int64), starts.copy()
+    rows = np.stack(steps, axis=1)
+    last = rows.max(axis=1)
+    final = np.where(last >= 0, last + 2 + lengths[np.maximum(last, 0)], starts)
+    return rows, final
+
+
+def scan_offsets(raw, start=0, length_byte=LENGTH_BYTE):
+    """
+    Offsets (of the 2-byte length prefix) of every complete frame in raw from start on;
+    the same result as scan_offsets_sequential, vectorized across segments:
+    - raw is cut into SEGMENT_BYTES segments. Each one is entered at a guess: the first
+      position in its first SYNC_WINDOW bytes whose length prefix matches the spec
+      length of the type byte after it (the segment boundary if there is none).
+      length_byte maps a type byte to that length (LENGTH_BYTE, ITCH 5.0 by default).
+    - All segments walk their length prefixes in lockstep (walk_segments).
+    - Stitching: the true entry of segment i is where segment i - 1 left off. If the walk
+      of segment i passes through that position it is right from there on (anything
+      before it is dropped); otherwise the segment is walked again from the true entry.
+      Only segments whose predecessor checked out are re-walked, so a bad guess is
+      fixed without spreading; a round or two is typical.
+    """
+    raw = np.frombuffer(raw, dtype=np.uint8) if not isinstance(raw, np.ndarray) else raw
+    end = len(raw)
+    if end - start < 2:
+        return np.empty(0, dtype=np.int64)
+
+    bounds = np.arange(start, end, SEGMENT_BYTES, dtype=np.int64)
+    stops = np.append(bounds[1:], end)
+    starts = bounds.copy()
+    if len(bounds) > 1:
+        window = np.minimum(bounds[1:, None] + np.arange(SYNC_WINDOW), end - 3)
+        expected = length_byte[raw[window + 2]]
+        plausible = (raw[window] == 0) & (raw[window + 1] == expected) & (expected != 0)
+        first = plausible.argmax(axis=1)
+        found = plausible[np.arange(len(first)), first]
+        starts[1:] += np.where(found, first, 0)
+
+    rows, final = walk_segments(raw, starts, stops)
+    while True:
+        entries = np.concatenate(([start], final[:-1]))
+        good = (starts == entries) | (rows == entries[:, None]).any(axis=1)
+        if good.all():
+            break
+        bad = np.flatnonzero(~good)
+        bad = bad[(bad == 0) | good[bad - 1]]
+        starts[bad] = entries[bad]
+        redo, final[bad] = walk_segments(raw, entries[bad], stops[bad])
+        if redo.shape[1] > rows.shape[1]:
+            rows = np.hstack([rows, np.full((len(rows), redo.shape[1] - rows.shape[1]), -1)])
+        rows[bad] = -1
+        rows[bad, :redo.shape[1]] = redo
+    return rows[rows >= entries[:, None]]
+
+
+# -------------------------------------------------------------------------
+# Columnar decode of the order messages
+# -------------------------------------------------------------------------
+ORDER_TYPES = 'AFECXDU'
+ORDER_COLUMNS = {
+    'type': 'u1',  # ASCII type byte
+    'stock_locate': 'u2',
+    'timestamp': 'u8',
+    'order_ref': 'u8',  # OriginalOrderReferenceNumber for U
+    'new_order_ref': 'u8',  # U only
+    'side': 'u1',  # ASCII 'B' / 'S' (A, F); 0 otherwise
+    'shares': 'u4',  # Shares / ExecutedShares / CancelledShares
+    'price': 'u4',  # Price / ExecutionPrice
+    'match_number': 'u8',  # E, C
+}
+
+# column -> message field per type
+COLUMN_FIELDS = {
+    'stock_locate': {code: 'StockLocate' for code in ORDER_TYPES},
+    'timestamp': {code: 'Timestamp' for code in ORDER_TYPES},
+    'order_ref': {'A': 'OrderReferenceNumber', 'F': 'OrderReferenceNumber',
+                  'E': 'OrderReferenceNumber', 'C': 'OrderReferenceNumber',
+                  'X': 'OrderReferenceNumber', 'D': 'OrderReferenceNumber',
+                  'U': 'OriginalOrderReferenceNumber'},
+    'new_order_ref': {'U': 'NewOrderReferenceNumber'},
+    'side': {'A': 'BuySellIndicator', 'F': 'BuySellIndicator'},
+    'shares': {'A': 'Shares', 'F': 'Shares', 'E': 'ExecutedShares', 'C': 'ExecutedShares',
+               'X': 'CancelledShares', 'U': 'Shares'},
+    'price': {'A': 'Price', 'F': 'Price', 'C': 'ExecutionPrice', 'U': 'Price'},
+    'match_number': {'E': 'MatchNumber', 'C': 'MatchNumber'},
+}
+
+IS_ORDER = np.zeros(256, dtype=bool)
+IS_ORDER[list(ORDER_TYPES.encode())] = True
+
+
+def plan_column(by_type):
+    """
+    Group the types feeding one column by where the field sits: [(type codes, offset, kind, size)].
+    A single group covering every order type means one gather for all rows.
+    """
+    groups = {}
+    for code, field in by_type.items():
+        groups.setdefault(FIELD_OFFSETS[code][field], []).append(code)
+    return [(''.join(codes), offset, kind, size) for (offset, kind, size), codes in groups.items()]
+
+
+COLUMN_PLANS = {column: plan_column(by_type) for column, by_type in COLUMN_FIELDS.items()}
+
+
+def allocate_columns(rows):
+    """
+    Preallocated ORDER_COLUMNS arrays for decode_columns(out=...).
+    """
+    return {name: np.empty(rows, dtype=dtype) for name, dtype in ORDER_COLUMNS.items()}
+
+
+def byte_strided(raw, size):
+    """
+    Overlapping view of raw as big-endian `size`-byte integers starting at every byte
+    (element i covers raw[i:i + size]), so any field is one fancy-index away.
+    """
+    if size == 1:
+        return raw
+    return np.ndarray((len(raw) - size + 1,), dtype=f'>u{size}', buffer=raw, strides=(1,))
+
+
+def gather_field(views, positions, kind, size):
+    """
+    Field of `size` bytes at every position, as unsigned integers.
+    A 6-byte timestamp is read as the 8 bytes ending at its last byte and masked.
+    """
+    if kind == 'ts':
+        return views[8][positions - 2] & 0xFFFFFFFFFFFF
+    return views[size][positions]
+
+
+def decode_columns(buf, out=None):
+    """
+    Decode every order message (ORDER_TYPES) of a length-prefixed stream into columns.
+    out: optional dict from allocate_columns(), reused across calls (it must hold at
+    least as many rows as there are order messages). Returns {column: array} for the
+    decoded rows in stream order; fields a type doesn't carry are 0.
+    """
+    raw = np.frombuffer(buf, dtype=np.uint8) if not isinstance(buf, np.ndarray) else buf
+    frames = scan_offsets(raw)
+    frames = frames[frames + 2 < len(raw)]  # an empty last frame has no type byte
+    offsets = frames + 2
+    types = raw[offsets]
+    # order types only, and only at their spec length, so no gather can run past a frame
+    keep = IS_ORDER[types] & (byte_strided(raw, 2)[frames] == MESSAGE_LENGTHS[types])
+    offsets, types = offsets[keep], types[keep]
+    num_rows = len(offsets)
+
+    if out is None:
+        out = allocate_columns(num_rows)
+    elif len(out['type']) < num_rows:
+        raise ValueError(f"out holds {len(out['type'])} rows, stream has {num_rows} order messages")
+    columns = {name: column[:num_rows] for name, column in out.items()}
+    views = {size: byte_strided(raw, size) for size in (1, 2, 4, 8)}
+
+    columns['type'][:] = types
+    rows_of = {}  # type code -> row numbers, only built if some column needs it
+    for name, plan in COLUMN_PLANS.items():
+        column = columns[name]
+        if len(plan) == 1 and len(plan[0][0]) == len(ORDER_TYPES):
+            _, offset, kind, size = plan[0]
+            column[:] = gather_field(views, offsets + offset, kind, size)
+            continue
+        if not rows_of:
+            rows_of = {code: np.flatnonzero(types == ord(code)) for code in ORDER_TYPES}
+        column[:] = 0
+        for codes, offset, kind, size in plan:
+            selected = np.concatenate([rows_of[code] for code in codes])
+            column[selected] = gather_field(views, offsets[selected] + offset, kind, size)
+    return columns
+
+
+# -------------------------------------------------------------------------
+# Example usage: synthetic ITCH 5.0 stream, namedtuple vs columnar decode
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    import random
+    import time
+
+    random.seed(8)
+    parser = ITCH50Parser()
+
+    def random_message(code):
+        fields = []
+        for name, (kind, size) in [('MessageType', ('alpha', 1))] + HEADER_FIELDS + MESSAGE_SPECS[code][1]:
+            if name == 'MessageType':
+                fields.append(code.encode())
+            elif kind == 'ts':
+                ts = random.randrange(34200 * 10**9, 57600 * 10**9)
+                fields += [ts >> 32, ts & 0xFFFFFFFF]
+            elif kind == 'alpha':
+                fields.append(bytes(random.choice(b'ABCDS') for _ in range(size)))
+            else:
+                # Feed-like magnitudes: small numbers with leading zero bytes
+                fields.append(random.randrange(1 << min(8 * size, random.choice((8, 16, 24, 32)))))
+        body = MESSAGE_STRUCTS[code].pack(*fields)
+        return len(body).to_bytes(2, 'big') + body
+
+    # Every type once, then a realistic order-heavy mix
+    mix = 'A' * 40 + 'D' * 36 + 'U' * 10 + 'E' * 5 + 'X' * 4 + 'F' + 'C' + 'P' + 'I' + 'S'
+    frames = [random_message(code) for code in MESSAGE_SPECS]
+    frames += [random_message(random.choice(mix)) for _ in range(200000)]
+    stream = b''.join(frames)
+
+    for code in MESSAGE_SPECS:
+        message = parser.decode(random_message(code), 2)
+        assert type(message) is MESSAGE_CLASSES[code] and message.MessageType == code
+
+    start = time.perf_counter()
+    messages = list(parser.iter_messages(stream))
+    elapsed = time.perf_counter() - start
+    assert len(messages) == len(frames)
+    print(f"namedtuple decode : {len(messages) / elapsed:,.0f} msgs/sec")
+
+    # Best of a few runs into the same preallocated columns (the first one pays page faults)
+    out = allocate_columns(len(frames))
+    elapsed = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        columns = decode_columns(stream, out=out)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    print(f"columnar decode   : {len(frames) / elapsed:,.0f} msgs/sec ({len(columns['type'])} order messages)")
+
+    orders = [m for m in messages if m.MessageType in ORDER_TYPES]
+    assert len(orders) == len(columns['type'])
+    for i, message in enumerate(orders):
+        code = message.MessageType
+        assert columns['type'][i] == ord(code)
+        for column, by_type in COLUMN_FIELDS.items():
+            value = getattr(message, by_type[code]) if code in by_type else 0
+            if column == 'side' and value:
+                value = ord(value)
+            assert columns[column][i] == value, (i, column)
+    print(f"first message at {format_timestamp(messages[0].Timestamp)}; columns match namedtuples.")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Stream framer for the length-prefixed ITCH feed (2-byte big-endian length + message).
+
+Usage:
+    framer = StreamFramer()
+    while framer.fill(sock):            # recv_into the preallocated buffer; 0 at EOF
+        for message in framer.frames(): # memoryview of each complete message, no copies
+            ...
+
+A message split across two reads stays buffered until the rest arrives. Views from
+frames() are only valid until the next fill()/feed(): copy (bytes(view)) anything
+that has to outlive the loop iteration.
+"""
+import struct
+
+RECV_SIZE = 1024 * 1024  # bytes asked for per recv_into
+MAX_FRAME = 2 + 0xFFFF  # largest frame a 2-byte length can describe
+LENGTH = struct.Struct('>H')
+
+
+class StreamFramer:
+    """
+    Preallocated bytearray ring with a read position (start) and a write position (end).
+    - fill()/feed() append after end; when fewer than recv_size bytes are left before the
+      end of the buffer, the unread bytes (at most one partial frame once frames() has
+      run) move back to the front first, so every frame stays contiguous.
+    - frames() walks the complete frames between start and end and advances start.
+    """
+
+    def __init__(self, recv_size=RECV_SIZE):
+        self.recv_size = recv_size
+        self.capacity = recv_size + MAX_FRAME
+        self.buf = bytearray(self.capacity)
+        self.view = memoryview(self.buf)
+        self.start = 0
+        self.end = 0
+        self.compactions = 0
+
+    @property
+    def pending(self):
+        """
+        Bytes received but not yet returned as a frame.
+        """
+        return self.end - self.start
+
+    def make_room(self, size):
+        if self.capacity - self.end >= size:
+            return
+        pending = self.end - self.start
+        if pending > self.capacity - size:
+            raise BufferError(f"{pending} unread bytes leave no room for {size} more")
+        # Slicing the bytearray copies the tail first; a view of it would overlap the target
+        self.buf[:pending] = self.buf[self.start:self.end]
+        self.start = 0
+        self.end = pending
+        self.compactions += 1
+
+    def fill(self, sock):
+        """
+        One recv_into from sock. Returns the number of bytes read (0 = connection closed).
+        """
+        self.make_room(self.recv_size)
+        n = sock.recv_into(self.view[self.end:self.end + self.recv_size])
+        self.end += n
+        return n
+
+    def feed(self, data):
+        """
+        Append bytes that came from somewhere other than a socket (file, asyncio, tests).
+        """
+        self.make_room(len(data))
+        self.buf[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def frames(self):
+        """
+        Yield a memoryview of every complete message in the buffer, without the length prefix.
+        """
+        view = self.view
+        unpack_from = LENGTH.unpack_from
+        pos = self.start
+        end = self.end
+        while end - pos >= 2:
+            (length,) = unpack_from(view, pos)
+            if end - pos - 2 < length:
+                break
+            # Consumed as soon as it is handed out, so breaking out of the loop is safe
+            self.start = pos + 2 + length
+            yield view[pos + 2:self.start]
+            pos = self.start
+
+
+# -------------------------------------------------------------------------
+# Example usage: frames split at arbitrary read boundaries come out whole
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    import random
+
+    random.seed(4)
+    messages = [bytes(random.randrange(256) for _ in range(random.randint(1, 60))) for _ in range(2000)]
+    stream = b''.join(LENGTH.pack(len(m)) + m for m in messages)
+
+    framer = StreamFramer(recv_size=64)
+    received = []
+    pos = 0
+    while pos < len(stream):
+        n = random.randint(1, 64)
+        framer.feed(stream[pos:pos + n])
+        pos += n
+        received.extend(bytes(frame) for frame in framer.frames())
+
+    assert received == messages, "framing mismatch"
+    print(f"{len(received)} frames reassembled from random reads, "
+          f"{framer.compactions} compactions, {framer.pending} bytes pending")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Sidecar offset index for replay .bin files (length-prefixed frames), so a replay can
+start at message K or cover only some stocks by seeking instead of scanning.
+
+    python itch_index.py data/output.bin [--every 1024] [--layout custom|itch50]
+
+writes data/output.bin.idx: a 72-byte header followed by little-endian arrays
+    checkpoints    byte offset of message 0, N, 2N, ... (N = --every)
+    stock_ids      u4, every stock seen, ascending
+    stock_starts   u8, stock_ids[i]'s frames are stock_offsets[stock_starts[i]:stock_starts[i + 1]]
+    stock_offsets  byte offset of every frame, grouped by stock, in file order within a stock
+Offsets are u4 for files under 4 GB, u8 otherwise. ReplayIndex memory-maps the index
+(and the .bin) so nothing is read until it is used. The header records the .bin's
+size and mtime; an index that no longer matches either is stale and gets rebuilt.
+
+Layouts (where the stock is in a frame):
+- custom: the project's 38-byte frames (itch_encoder), StockID u4 at frame byte 26;
+  a file of only those frames is indexed without looking at any length prefix.
+- itch50: ITCH 5.0 (e.g. itch50_extract.py output), StockLocate u2 at frame byte 3;
+  frames are found with itch50_parser.scan_offsets one block at a time.
+"""
+import argparse
+import os
+import struct
+import time
+
+import numpy as np
+
+from itch_loader import FRAME_BYTES, ITCH_FRAME_DTYPE, MESSAGE_LENGTH
+from itch50_parser import byte_strided, scan_offsets
+
+DEFAULT_EVERY = 1024  # messages between checkpoints
+INDEX_SUFFIX = '.idx'
+BLOCK_BYTES = 64 * 1024 * 1024  # .bin bytes scanned per step
+MAGIC = b'ITCHIDX1'
+# magic, version, every, layout, offset size, 6 pad, counts, .bin mtime (ns)
+HEADER = struct.Struct('<8sIIBB6xQQQQQQ')
+VERSION = 2
+LAYOUTS = {'custom': (0, 26, 4), 'itch50': (1, 3, 2)}  # name -> (code, stock byte offset, stock size)
+LAYOUT_NAMES = {code: name for name, (code, _, _) in LAYOUTS.items()}
+LENGTH = struct.Struct('>H')
+FILLER = slice(3, 17)  # custom frame bytes that are always 0xAA
+
+
+def index_path_for(bin_path):
+    return str(bin_path) + INDEX_SUFFIX
+
+
+def is_fixed_custom(raw):
+    """
+    True if raw is nothing but 38-byte custom frames. The 0xAA filler (frame bytes
+    3-16, where ITCH 5.0 has the Timestamp) tells them from 36-byte ITCH 5.0 messages.
+    """
+    if len(raw) % FRAME_BYTES:
+        return False
+    frames = raw.reshape(-1, FRAME_BYTES)
+    step = BLOCK_BYTES // FRAME_BYTES
+    for start in range(0, len(frames), step):
+        block = frames[start:start + step]
+        if not (np.all(block[:, :2].view('>u2') == MESSAGE_LENGTH) and np.all(block[:, FILLER] == 0xAA)):
+            return False
+    return True
+
+
+def detect_layout(raw):
+    return 'custom' if len(raw) and is_fixed_custom(raw) else 'itch50'
+
+
+def scan_frames(raw, stock_offset, stock_size):
+    """
+    (frame offsets, stock per frame) of a length-prefixed file, BLOCK_BYTES at a time.
+    Frames too short to hold a stock get stock -1 and stay out of the per-stock lists.
+    """
+    offsets, stocks = [], []
+    pos = 0
+    end = len(raw)
+    while pos < end:
+        window = raw[pos:min(end, pos + BLOCK_BYTES)]
+        frames = scan_offsets(window)
+        if not len(frames):
+            break  # only a truncated frame is left
+        lengths = byte_strided(window, 2)[frames].astype(np.int64)
+        has_stock = lengths + 2 >= stock_offset + stock_size
+        fields = byte_strided(window, stock_size)[np.where(has_stock, frames + stock_offset, 0)]
+        offsets.append(frames + pos)
+        stocks.append(np.where(has_stock, fields.astype(np.int64), -1))
+        pos += int(frames[-1] + 2 + lengths[-1])
+    if not offsets:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(offsets), np.concatenate(stocks)
+
+
+def build_index(bin_path, every=DEFAULT_EVERY, layout=None, index_path=None):
+    """
+    Index bin_path in one pass and write the sidecar. Returns the index path.
+    layout: 'custom', 'itch50' or None (custom if the file is all 38-byte frames).
+    """
+    index_path = index_path or index_path_for(bin_path)
+    mtime_ns = os.stat(bin_path).st_mtime_ns  # before reading: a later write makes the index stale
+    raw = np.memmap(bin_path, dtype=np.uint8, mode='r') if os.path.getsize(bin_path) else np.empty(0, np.uint8)
+    layout = layout or detect_layout(raw)
+    layout_code, stock_offset, stock_size = LAYOUTS[layout]
+    if layout == 'custom' and is_fixed_custom(raw):
+        offsets = np.arange(0, len(raw), FRAME_BYTES, dtype=np.int64)
+        stocks = raw.view(ITCH_FRAME_DTYPE)['stock_id'].astype(np.int64)
+    else:
+        offsets, stocks = scan_frames(raw, stock_offset, stock_size)
+
+    offset_dtype = np.dtype('<u4') if len(raw) < 1 << 32 else np.dtype('<u8')
+    checkpoints = offsets[::every]
+    has_stock = stocks >= 0
+    order = np.argsort(stocks[has_stock], kind='stable')
+    grouped_stocks = stocks[has_stock][order]
+    stock_offsets = offsets[has_stock][order]
+    stock_ids, counts = np.unique(grouped_stocks, return_counts=True)
+    stock_starts = np.concatenate(([0], np.cumsum(counts)))
+
+    header = HEADER.pack(MAGIC, VERSION, every, layout_code, offset_dtype.itemsize, len(offsets), len(raw),
+                         len(checkpoints), len(stock_ids), len(stock_offsets), mtime_ns)
+    with open(index_path, 'wb') as f:
+        f.write(header)
+        for array in (checkpoints.astype(offset_dtype), stock_ids.astype('<u4'), stock_starts.astype('<u8'),
+                      stock_offsets.astype(offset_dtype)):
+            f.write(array.tobytes())
+            f.write(bytes(-array.nbytes % 8))  # keep the next array 8-byte aligned
+    return index_path
+
+
+class ReplayIndex:
+    """
+    Memory-mapped sidecar index of a .bin file.
+    """
+
+    def __init__(self, bin_path, index_path=None):
+        self.bin_path = bin_path
+        self.index_path = index_path or index_path_for(bin_path)
+        mapped = np.memmap(self.index_path, dtype=np.uint8, mode='r')
+        if len(mapped) < HEADER.size:
+            raise ValueError(f"{self.index_path} is not a version {VERSION} replay index")
+        (magic, version, self.every, layout_code, offset_size, self.num_messages, self.file_size,
+         num_checkpoints, num_stocks, num_entries, mtime_ns) = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.index_path} is not a version {VERSION} replay index")
+        stat = os.stat(bin_path)
+        if stat.st_size != self.file_size:
+            raise ValueError(f"{self.index_path} is stale: it indexes {self.file_size} bytes, "
+                             f"{bin_path} has {stat.st_size}")
+        if stat.st_mtime_ns != mtime_ns:
+            # Same size but rewritten (e.g. re-extracted with other --locates)
+            raise ValueError(f"{self.index_path} is stale: {bin_path} was modified after it was indexed")
+        self.layout = LAYOUT_NAMES[layout_code]
+        offset_dtype = np.dtype(f'<u{offset_size}')
+
+        pos = HEADER.size
+        arrays = []
+        for dtype, count in ((offset_dtype, num_checkpoints), (np.dtype('<u4'), num_stocks),
+                             (np.dtype('<u8'), num_stocks + 1), (offset_dtype, num_entries)):
+            nbytes = dtype.itemsize * count
+            arrays.append(mapped[pos:pos + nbytes].view(dtype))
+            pos += nbytes + -nbytes % 8
+        self.checkpoints, self.stock_ids, self.stock_starts, self.stock_offsets = arrays
+        self.data = np.memmap(bin_path, dtype=np.uint8, mode='r') if self.file_size else b''
+
+    def offset_of(self, message):
+        """
+        Byte offset of message number `message` (file size past the last one): the
+        checkpoint before it, then at most every - 1 length prefixes.
+        """
+        if message >= self.num_messages:
+            return self.file_size
+        pos = int(self.checkpoints[message // self.every])
+        for _ in range(message % self.every):
+            (length,) = LENGTH.unpack_from(self.data, pos)
+            pos += 2 + length
+        return pos
+
+    def stock_frames(self, stock_ids):
+        """
+        Sorted byte offsets of every frame of the given stocks.
+        """
+        found = []
+        for stock_id in stock_ids:
+            i = np.searchsorted(self.stock_ids, stock_id)
+            if i < len(self.stock_ids) and self.stock_ids[i] == stock_id:
+                found.append(self.stock_offsets[self.stock_starts[i]:self.stock_starts[i + 1]])
+        return np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def frames(self, start=0, stock_ids=None):
+        """
+        Yield frames (2-byte length + message, as bytes) from message number `start` on,
+        only those of stock_ids if given.
+        """
+        data = self.data
+        pos = self.offset_of(start)
+        if stock_ids is None:
+            while pos + 2 <= self.file_size:
+                (length,) = LENGTH.unpack_from(data, pos)
+                if pos + 2 + length > self.file_size:
+                    return
+                yield data[pos:pos + 2 + length].tobytes()
+                pos += 2 + length
+            return
+        offsets = self.stock_frames(stock_ids)
+        for offset in offsets[np.searchsorted(offsets, pos):].tolist():
+            (length,) = LENGTH.unpack_from(data, offset)
+            yield data[offset:offset + 2 + length].tobytes()
+
+
+def open_index(bin_path, every=DEFAULT_EVERY, layout=None):
+    """
+    ReplayIndex for bin_path, (re)building the sidecar if it is missing or stale.
+    """
+    try:
+        return ReplayIndex(bin_path)
+    except (FileNotFoundError, ValueError):
+        build_index(bin_path, every, layout)
+        return ReplayIndex(bin_path)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Build the sidecar offset index of a replay .bin file.')
+    arg_parser.add_argument('bin_file', help='length-prefixed ITCH file')
+    arg_parser.add_argument('--every', type=int, default=DEFAULT_EVERY, help='messages between checkpoints')
+    arg_parser.add_argument('--layout', choices=sorted(LAYOUTS), default=None,
+                            help='where the stock is in a frame (default: custom if all frames are 38 bytes)')
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    path = build_index(args.bin_file, args.every, args.layout)
+    elapsed = time.perf_counter() - start
+    index = ReplayIndex(args.bin_file)
+    print(f"{path}: {index.num_messages:,} messages ({index.layout} layout), {len(index.stock_ids):,} stocks, "
+          f"{os.path.getsize(path) / 1e6:,.1f} MB, built at {index.file_size / elapsed / 1e6:,.0f} MB/s")
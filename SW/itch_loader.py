@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Bulk loader for .bin ITCH files (as written by itch_encoder.csv_to_bin).
+
+load_itch(path) memory-maps the file and returns a NumPy structured array with the
+big-endian fields type, order_ref, side, shares, stock_id, price:
+- Fixed 38-byte frames (2-byte length 0x0024 + 36-byte order message): the array is a
+  view straight onto the mapped file, so nothing is decoded per message. If some of
+  those frames aren't A/E/D/X, only the order frames are gathered, as below.
+- Anything else (mixed frame lengths, other message types): a vectorized walk of the
+  2-byte length prefixes (itch50_parser.scan_offsets) finds the A/E/D/X order frames,
+  then every field is gathered for all of them at once into a compact array.
+
+order_batch(records) turns the result into the columns OrderBookManager.process_batch
+takes, so a whole file can be replayed into the book in one call.
+"""
+import os
+import struct
+
+import numpy as np
+
+from Orderbook import ORDER_ADD, ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE
+from itch50_parser import scan_offsets
+
+FRAME_BYTES = 38
+MESSAGE_LENGTH = 36  # value of the length prefix for an order message
+ORDER_TYPES = b'AEDX'
+LENGTH = struct.Struct('>H')
+
+# One 38-byte frame; the Dummy1/Dummy2 fillers are simply not part of the dtype
+ITCH_FRAME_DTYPE = np.dtype({
+    'names': ['length', 'type', 'order_ref', 'side', 'shares', 'stock_id', 'price'],
+    'formats': ['>u2', 'S1', '>u4', 'u1', '>u4', '>u4', '>u4'],
+    'offsets': [0, 2, 17, 21, 22, 26, 34],
+    'itemsize': FRAME_BYTES,
+})
+RECORD_FIELDS = ('type', 'order_ref', 'side', 'shares', 'stock_id', 'price')
+ITCH_RECORD_DTYPE = np.dtype([(name, ITCH_FRAME_DTYPE.fields[name][0]) for name in RECORD_FIELDS])
+
+# ITCH message type byte -> 136-bit order_type code (0 = not an order message)
+ORDER_CODES = np.zeros(256, dtype=np.uint8)
+ORDER_CODES[ord('A')] = ORDER_ADD
+ORDER_CODES[ord('X')] = ORDER_CANCEL
+ORDER_CODES[ord('E')] = ORDER_EXECUTE
+ORDER_CODES[ord('D')] = ORDER_DELETE
+# Length prefix of each order frame, for scan_offsets' segment sync
+ORDER_LENGTH_BYTE = np.where(ORDER_CODES > 0, MESSAGE_LENGTH, 0).astype(np.uint8)
+
+BATCH_DTYPE = np.dtype([
+    ('type', 'u1'), ('stock_id', '>u4'), ('order_ref', '>u4'),
+    ('shares', '>u4'), ('price', '>u4'), ('side', 'u1'),
+])
+
+
+def frame_offsets(raw):
+    """
+    Byte offsets of every A/E/D/X order frame in raw (a uint8 array of the whole file).
+    The length prefixes are walked by itch50_parser.scan_offsets; frames of other types
+    or lengths are skipped, and a truncated last frame is dropped.
+    """
+    offsets = scan_offsets(raw, length_byte=ORDER_LENGTH_BYTE)
+    lengths = (raw[offsets].astype(np.uint16) << 8) | raw[offsets + 1]
+    offsets = offsets[lengths == MESSAGE_LENGTH]
+    return offsets[ORDER_CODES[raw[offsets + 2]] > 0]
+
+
+def gather_records(raw, offsets):
+    """
+    Copy the order fields of the frames at offsets into an ITCH_RECORD_DTYPE array.
+    """
+    records = np.empty(len(offsets), dtype=ITCH_RECORD_DTYPE)
+    as_bytes = records.view(np.uint8).reshape(len(offsets), ITCH_RECORD_DTYPE.itemsize)
+    for name in RECORD_FIELDS:
+        dtype, frame_offset = ITCH_FRAME_DTYPE.fields[name]
+        record_offset = ITCH_RECORD_DTYPE.fields[name][1]
+        columns = frame_offset + np.arange(dtype.itemsize)
+        as_bytes[:, record_offset:record_offset + dtype.itemsize] = raw[offsets[:, None] + columns]
+    return records
+
+
+def load_itch(path):
+    """
+    Load every order message in a .bin file as a structured array (see module docstring).
+    The fixed-frame result is a read-only view onto the mapped file.
+    """
+    if os.path.getsize(path) == 0:
+        # np.memmap can't map an empty file
+        return np.empty(0, dtype=ITCH_RECORD_DTYPE)
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+    if len(raw) % FRAME_BYTES == 0:
+        frames = raw.view(ITCH_FRAME_DTYPE)
+        if np.all(frames['length'] == MESSAGE_LENGTH):
+            is_order = ORDER_CODES[frames['type'].view(np.uint8)] > 0
+            if is_order.all():
+                return frames[list(RECORD_FIELDS)]
+            # Same type filter as frame_offsets applies to mixed files
+            return gather_records(raw, np.flatnonzero(is_order) * FRAME_BYTES)
+    return gather_records(raw, frame_offsets(raw))
+
+
+def order_batch(records):
+    """
+    Columns for OrderBookManager.process_batch from load_itch output: ITCH letters
+    become 136-bit order_type codes; messages that aren't A/E/D/X get code 0 and are
+    counted as dropped_invalid by process_batch.
+    """
+    batch = np.empty(len(records), dtype=BATCH_DTYPE)
+    batch['type'] = ORDER_CODES[records['type'].view(np.uint8)]
+    for name in ('stock_id', 'order_ref', 'shares', 'price', 'side'):
+        batch[name] = records[name]
+    return batch
+
+
+# -------------------------------------------------------------------------
+# Example usage: load fixed and mixed-length files, check against ITCHParser
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    from itch_parser import ITCHParser, ORDER_MESSAGE_DEFINITION
+
+    NUM_MESSAGES = 2000000
+    rng = np.random.default_rng(5)
+    frames = np.zeros(NUM_MESSAGES, dtype=ITCH_FRAME_DTYPE)
+    frames['length'] = MESSAGE_LENGTH
+    frames['type'] = rng.choice(np.frombuffer(ORDER_TYPES, dtype='S1'), NUM_MESSAGES)
+    frames['order_ref'] = rng.integers(0, 1024, NUM_MESSAGES)
+    frames['side'] = rng.integers(0, 2, NUM_MESSAGES)
+    frames['shares'] = rng.integers(1, 1000, NUM_MESSAGES)
+    frames['stock_id'] = rng.integers(0, 4, NUM_MESSAGES)
+    frames['price'] = rng.integers(1000000, 1150000, NUM_MESSAGES)
+    fixed_path = os.path.join(tempfile.gettempdir(), 'itch_fixed.bin')
+    frames.tofile(fixed_path)
+
+    start = time.perf_counter()
+    records = load_itch(fixed_path)
+    print(f"fixed frames : {len(records)} messages in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Spot-check against the per-message parser
+    parser = ITCHParser()
+    data = open(fixed_path, 'rb').read()
+    for i in random.sample(range(NUM_MESSAGES), 1000):
+        msg = parser.decode_from(data, i * FRAME_BYTES + 2)
+        rec = records[i]
+        assert (msg.MessageType.encode(), msg.OrderReferenceNumber, msg.BuySellIndicator, msg.Shares,
+                msg.StockID, msg.Price) == tuple(rec.tolist()), i
+
+    # Mixed file: the same messages with a few non-order frames of other lengths in between
+    mixed_path = os.path.join(tempfile.gettempdir(), 'itch_mixed.bin')
+    layout = struct.Struct(ORDER_MESSAGE_DEFINITION['format'])
+    with open(mixed_path, 'wb') as f:
+        for i in range(0, 200000, 1000):
+            f.write(data[i * FRAME_BYTES:(i + 1000) * FRAME_BYTES])
+            f.write(LENGTH.pack(12) + b'S' + bytes(11))
+    start = time.perf_counter()
+    mixed = load_itch(mixed_path)
+    print(f"mixed frames : {len(mixed)} messages in {(time.perf_counter() - start) * 1000:.1f} ms")
+    assert np.array_equal(mixed, records[:200000].astype(ITCH_RECORD_DTYPE))
+
+    # All 38-byte frames, but a few aren't order messages: both paths must drop them
+    typed_path = os.path.join(tempfile.gettempdir(), 'itch_typed.bin')
+    typed = frames[:200000].copy()
+    typed['type'][::1000] = b'S'
+    typed.tofile(typed_path)
+    kept = load_itch(typed_path)
+    assert np.array_equal(kept, records[:200000][typed['type'] != b'S'].astype(ITCH_RECORD_DTYPE))
+    assert np.array_equal(kept, gather_records(np.fromfile(typed_path, dtype=np.uint8),
+                                               frame_offsets(np.fromfile(typed_path, dtype=np.uint8))))
+
+    # Empty file, and a file cut off inside its last frame
+    empty_path = os.path.join(tempfile.gettempdir(), 'itch_empty.bin')
+    open(empty_path, 'wb').close()
+    assert len(load_itch(empty_path)) == 0
+    with open(mixed_path, 'ab') as f:
+        f.write(data[:FRAME_BYTES - 5])
+    assert np.array_equal(load_itch(mixed_path), mixed)
+
+    batch = order_batch(records)
+    print(f"order batch  : {np.bincount(batch['type'])[[ORDER_ADD, ORDER_CANCEL, ORDER_EXECUTE, ORDER_DELETE]]} "
+          f"(add/cancel/execute/delete)")
+    print("Loaded records match ITCHParser.")
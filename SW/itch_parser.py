@@ -1,138 +1,130 @@
 #!/usr/bin/env python3
-from struct import unpack
+from struct import unpack, Struct
 from collections import namedtuple
 from datetime import datetime
 
+# -------------------------------------------------------------------------
+# CUSTOM order message to match your 36-byte layout
+# -------------------------------------------------------------------------
+#
+# Layout after 2-byte length:
+#   1 byte  -> MessageType (e.g. 'A')
+#   14 bytes-> Dummy1 (0xAA)
+#   4 bytes -> OrderReferenceNumber
+#   1 byte  -> BuySellIndicator (0=Buy or 1=Sell)
+#   4 bytes -> Shares
+#   4 bytes -> StockID
+#   4 bytes -> Dummy2 (0xBB)
+#   4 bytes -> Price
+#
+# => total = 36 bytes
+#
+# 'A' (add), 'E' (execute), 'D' (delete) and 'X' (cancel) all use this layout.
+ORDER_MESSAGE_DEFINITION = {
+    'format': '>c14sIBII4sI',
+    'fields': [
+        ('MessageType',           ('alpha',   1)),  # e.g. 'A'
+        ('Dummy1',                ('alpha',  14)),  # 14 filler bytes
+        ('OrderReferenceNumber',  ('integer', 4)),
+        ('BuySellIndicator',      ('alpha',   1)),  # can decode as '\x00' or '\x01'
+        ('Shares',                ('integer', 4)),
+        ('StockID',               ('integer', 4)),
+        ('Dummy2',                ('alpha',   4)),  # 4 filler bytes
+        ('Price',                 ('integer', 4)),
+    ],
+    'class': namedtuple(
+        'AddOrderMessage',
+        [
+            'MessageType',
+            'Dummy1',
+            'OrderReferenceNumber',
+            'BuySellIndicator',
+            'Shares',
+            'StockID',
+            'Dummy2',
+            'Price'
+        ]
+    )
+}
+
+# Fast path (decode_from): the same layout compiled once, type byte and fillers skipped
+# with pad bytes, so unpack_from only produces the five fields the book uses.
+ORDER_MESSAGE_STRUCT = Struct('>15xIBII4xI')
+OrderMessage = namedtuple(
+    'OrderMessage',
+    ['MessageType', 'OrderReferenceNumber', 'BuySellIndicator', 'Shares', 'StockID', 'Price']
+)
+
+_U32 = Struct('>I').unpack_from
+
+
+class OrderMessageView:
+    """
+    Flyweight over an order message in place: holds only (buf, offset) and decodes a
+    field when it is read, so nothing is built for fields nobody looks at.
+    ITCHParser.view_from() re-points one instance per parser at each message, so a hot
+    loop allocates no message objects; read what you need (or to_message()) before the
+    next view_from() call. Field names match OrderMessage.
+    """
+    __slots__ = ('buf', 'offset')
+    _fields = OrderMessage._fields
+
+    def __init__(self, buf=b'', offset=0):
+        self.buf = buf
+        self.offset = offset
+
+    @property
+    def MessageType(self):
+        return chr(self.buf[self.offset])
+
+    @property
+    def OrderReferenceNumber(self):
+        return _U32(self.buf, self.offset + 15)[0]
+
+    @property
+    def BuySellIndicator(self):
+        return self.buf[self.offset + 19]
+
+    @property
+    def Shares(self):
+        return _U32(self.buf, self.offset + 20)[0]
+
+    @property
+    def StockID(self):
+        return _U32(self.buf, self.offset + 24)[0]
+
+    @property
+    def Price(self):
+        return _U32(self.buf, self.offset + 32)[0]
+
+    def to_message(self):
+        """
+        Copy of the current message as an OrderMessage (outlives the buffer and view).
+        """
+        return OrderMessage(self.MessageType, *ORDER_MESSAGE_STRUCT.unpack_from(self.buf, self.offset))
+
+
 class ITCHParser:
     def __init__(self):
         # For demonstration, we keep the other message definitions as-is or remove them.
-        # We focus on 'A' since that's what your encoder writes.
+        # We focus on the order messages since that's what your encoder writes.
 
         self.message_definitions = {
-
-            # -----------------------------------------------------------------
-            # CUSTOM 'A' MESSAGE to match your 36-byte layout
-            # -----------------------------------------------------------------
-            #
-            # Layout after 2-byte length:
-            #   1 byte  -> MessageType (e.g. 'A')
-            #   14 bytes-> Dummy1 (0xAA)
-            #   4 bytes -> OrderReferenceNumber
-            #   1 byte  -> BuySellIndicator (0=Buy or 1=Sell)
-            #   4 bytes -> Shares
-            #   4 bytes -> StockID
-            #   4 bytes -> Dummy2 (0xBB)
-            #   4 bytes -> Price
-            #
-            # => total = 36 bytes
-            #
-            'A': {
-                'format': '>c14sIBII4sI',
-                'fields': [
-                    ('MessageType',           ('alpha',   1)),  # e.g. 'A'
-                    ('Dummy1',                ('alpha',  14)),  # 14 filler bytes
-                    ('OrderReferenceNumber',  ('integer', 4)),
-                    ('BuySellIndicator',      ('alpha',   1)),  # can decode as '\x00' or '\x01'
-                    ('Shares',                ('integer', 4)),
-                    ('StockID',               ('integer', 4)),
-                    ('Dummy2',                ('alpha',   4)),  # 4 filler bytes
-                    ('Price',                 ('integer', 4)),
-                ],
-                'class': namedtuple(
-                    'AddOrderMessage',
-                    [
-                        'MessageType',
-                        'Dummy1',
-                        'OrderReferenceNumber',
-                        'BuySellIndicator',
-                        'Shares',
-                        'StockID',
-                        'Dummy2',
-                        'Price'
-                    ]
-                )
-            },
-            'E': {
-                'format': '>c14sIBII4sI',
-                'fields': [
-                    ('MessageType', ('alpha', 1)),  # e.g. 'A'
-                    ('Dummy1', ('alpha', 14)),  # 14 filler bytes
-                    ('OrderReferenceNumber', ('integer', 4)),
-                    ('BuySellIndicator', ('alpha', 1)),  # can decode as '\x00' or '\x01'
-                    ('Shares', ('integer', 4)),
-                    ('StockID', ('integer', 4)),
-                    ('Dummy2', ('alpha', 4)),  # 4 filler bytes
-                    ('Price', ('integer', 4)),
-                ],
-                'class': namedtuple(
-                    'AddOrderMessage',
-                    [
-                        'MessageType',
-                        'Dummy1',
-                        'OrderReferenceNumber',
-                        'BuySellIndicator',
-                        'Shares',
-                        'StockID',
-                        'Dummy2',
-                        'Price'
-                    ]
-                )
-            },
-            'D': {
-                'format': '>c14sIBII4sI',
-                'fields': [
-                    ('MessageType', ('alpha', 1)),  # e.g. 'A'
-                    ('Dummy1', ('alpha', 14)),  # 14 filler bytes
-                    ('OrderReferenceNumber', ('integer', 4)),
-                    ('BuySellIndicator', ('alpha', 1)),  # can decode as '\x00' or '\x01'
-                    ('Shares', ('integer', 4)),
-                    ('StockID', ('integer', 4)),
-                    ('Dummy2', ('alpha', 4)),  # 4 filler bytes
-                    ('Price', ('integer', 4)),
-                ],
-                'class': namedtuple(
-                    'AddOrderMessage',
-                    [
-                        'MessageType',
-                        'Dummy1',
-                        'OrderReferenceNumber',
-                        'BuySellIndicator',
-                        'Shares',
-                        'StockID',
-                        'Dummy2',
-                        'Price'
-                    ]
-                )
-            },
-            'X': {
-                'format': '>c14sIBII4sI',
-                'fields': [
-                    ('MessageType', ('alpha', 1)),  # e.g. 'A'
-                    ('Dummy1', ('alpha', 14)),  # 14 filler bytes
-                    ('OrderReferenceNumber', ('integer', 4)),
-                    ('BuySellIndicator', ('alpha', 1)),  # can decode as '\x00' or '\x01'
-                    ('Shares', ('integer', 4)),
-                    ('StockID', ('integer', 4)),
-                    ('Dummy2', ('alpha', 4)),  # 4 filler bytes
-                    ('Price', ('integer', 4)),
-                ],
-                'class': namedtuple(
-                    'AddOrderMessage',
-                    [
-                        'MessageType',
-                        'Dummy1',
-                        'OrderReferenceNumber',
-                        'BuySellIndicator',
-                        'Shares',
-                        'StockID',
-                        'Dummy2',
-                        'Price'
-                    ]
-                )
-            },
+            'A': ORDER_MESSAGE_DEFINITION,
+            'E': ORDER_MESSAGE_DEFINITION,
+            'D': ORDER_MESSAGE_DEFINITION,
+            'X': ORDER_MESSAGE_DEFINITION,
             # ... (you can define other messages if you wish)
         }
 
+        # decode_from dispatch: first message byte -> (compiled Struct, MessageType string)
+        self.fast_decoders = [None] * 256
+        for message_type in self.message_definitions:
+            self.fast_decoders[ord(message_type)] = (ORDER_MESSAGE_STRUCT, message_type)
+
+        # view_from re-points this one instance at every message
+        self.message_view = OrderMessageView()
+
     def convert_time(self, stamp: bytes):
         # Not relevant for the custom 'A' message, but included for completeness
         time_val = int.from_bytes(stamp, byteorder='big')  # e.g., nanosec
@@ -181,6 +173,42 @@ class ITCHParser:
 
         return message_class(**kwargs)
 
+    def decode_from(self, buf, offset=0):
+        """
+        Fast decoder: decode the message starting at buf[offset] (its type byte) in place.
+        buf can be bytes, bytearray or a memoryview (e.g. a whole recv buffer), so
+        nothing is sliced or copied. Returns an OrderMessage (same field names as
+        decode_message minus the Dummy fillers), or None for unknown types or a
+        message cut short.
+        """
+        remaining = len(buf) - offset
+        if remaining <= 0:
+            return None
+        decoder = self.fast_decoders[buf[offset]]
+        if decoder is None:
+            return None
+        layout, message_type = decoder
+        if remaining < layout.size:
+            return None
+        return OrderMessage(message_type, *layout.unpack_from(buf, offset))
+
+    def view_from(self, buf, offset=0):
+        """
+        Like decode_from, but returns the parser's OrderMessageView pointed at the
+        message instead of a new tuple (same None cases). The view is reused by the
+        next call.
+        """
+        remaining = len(buf) - offset
+        if remaining <= 0:
+            return None
+        decoder = self.fast_decoders[buf[offset]]
+        if decoder is None or remaining < decoder[0].size:
+            return None
+        view = self.message_view
+        view.buf = buf
+        view.offset = offset
+        return view
+
     def print_human_readable_message(self, message):
         """
         Prints a decoded message in a human-readable format.
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped replay source for itch_server: the .bin is mapped once at startup and
+every connection reads from the same mapping, so starting a replay costs nothing and
+RSS stays flat no matter how big the file is (pages come from the page cache).
+
+Two ways out of the mapping:
+- send_to(sock): contiguous byte runs handed to socket.sendfile (the kernel copies
+  straight from the page cache) - the whole file, or from message K / only some
+  stocks via the .idx sidecar (itch_index.py), adjacent selected frames merged.
+  Runs too short for a syscall each (interleaved stocks) are gathered instead.
+- frames(): one zero-copy memoryview per frame, for paced per-message sends.
+
+A client resuming from a checkpoint asks for its first message with a RESUME_REQUEST
+(itch_server.py --resume), so the messages it already has are never sent.
+
+    python itch_replay.py data/output.bin [--start K] [--stocks 1 2]
+replays to a local socket pair and reports the sendfile throughput.
+"""
+import argparse
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from itch50_parser import byte_strided
+from itch_index import open_index
+
+LENGTH = struct.Struct('>H')
+RESUME_REQUEST = struct.Struct('>4sQ')  # magic, first message number to replay
+RESUME_MAGIC = b'RSUM'
+SENDFILE_MIN = 64 * 1024  # shorter runs are gathered and sent with sendall instead
+GATHER_BYTES = 1024 * 1024  # gathered bytes per sendall
+
+
+def resume_request(start):
+    return RESUME_REQUEST.pack(RESUME_MAGIC, start)
+
+
+def read_resume_request(sock):
+    """
+    Message number a client asks the replay to start at, None if it closes first.
+    """
+    data = sock.recv(RESUME_REQUEST.size, socket.MSG_WAITALL)
+    if len(data) < RESUME_REQUEST.size:
+        return None
+    magic, start = RESUME_REQUEST.unpack(data)
+    if magic != RESUME_MAGIC:
+        raise ValueError(f"expected a resume request, got {data.hex()}")
+    return start
+
+
+class ReplaySource:
+    """
+    Read-only mapping of a length-prefixed .bin file, shared by all connections.
+    The index is only opened (built on first use) when a replay starts past message 0
+    or is limited to some stocks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        # An empty file can't be mapped
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.view = memoryview(self.data)
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                self._index = open_index(self.path)
+            return self._index
+
+    def close(self):
+        self.view.release()
+        if self.size:
+            self.data.close()
+        self.file.close()
+
+    # -------------------------------------------------------------------------
+    # Selection
+    # -------------------------------------------------------------------------
+    def selected_offsets(self, start=0, stock_ids=None):
+        """
+        Byte offsets of the selected frames, or None for "every frame from message
+        start on" (walked from the length prefixes, no need to list them up front).
+        """
+        if stock_ids is None:
+            return None
+        offsets = self.index.stock_frames(stock_ids).astype(np.int64)
+        return offsets[np.searchsorted(offsets, self.index.offset_of(start)):]
+
+    def first_offset(self, start):
+        return self.index.offset_of(start) if start else 0
+
+    def runs(self, start=0, stock_ids=None):
+        """
+        [(offset, nbytes)] of contiguous byte ranges covering the selected frames.
+        Without stock_ids this is one run to the end of the file (a truncated last
+        frame is sent as is; the receiving framer never completes it).
+        """
+        offsets = self.selected_offsets(start, stock_ids)
+        if offsets is None:
+            first = self.first_offset(start)
+            return [(first, self.size - first)] if first < self.size else []
+        if not len(offsets):
+            return []
+        ends = offsets + 2 + byte_strided(np.frombuffer(self.data, dtype=np.uint8), 2)[offsets]
+        breaks = np.flatnonzero(offsets[1:] != ends[:-1]) + 1
+        run_starts = offsets[np.concatenate(([0], breaks))]
+        run_ends = ends[np.concatenate((breaks - 1, [len(ends) - 1]))]
+        return list(zip(run_starts.tolist(), (run_ends - run_starts).tolist()))
+
+    # -------------------------------------------------------------------------
+    # Output
+    # -------------------------------------------------------------------------
+    def frames(self, start=0, stock_ids=None):
+        """
+        Yield each selected frame (2-byte length + message) as a memoryview into the
+        mapping. Frames stay valid until close().
+        """
+        view = self.view
+        offsets = self.selected_offsets(start, stock_ids)
+        if offsets is not None:
+            for offset in offsets.tolist():
+                (length,) = LENGTH.unpack_from(view, offset)
+                yield view[offset:offset + 2 + length]
+            return
+        pos = self.first_offset(start)
+        size = self.size
+        while pos + 2 <= size:
+            (length,) = LENGTH.unpack_from(view, pos)
+            end = pos + 2 + length
+            if end > size:
+                return  # truncated last frame
+            yield view[pos:end]
+            pos = end
+
+    def send_to(self, sock, start=0, stock_ids=None):
+        """
+        Send the selected frames back-to-back: runs of SENDFILE_MIN bytes or more with
+        socket.sendfile (a plain send loop where the platform has no sendfile), shorter
+        ones gathered into GATHER_BYTES sendall calls. sock must be blocking.
+        Returns bytes sent.
+        """
+        view = self.view
+        sent = 0
+        parts, gathered = [], 0
+        for offset, nbytes in self.runs(start, stock_ids):
+            if nbytes < SENDFILE_MIN:
+                parts.append(view[offset:offset + nbytes])
+                gathered += nbytes
+                if gathered < GATHER_BYTES:
+                    continue
+            if parts:
+                sock.sendall(b''.join(parts))
+                sent += gathered
+                parts, gathered = [], 0
+            if nbytes >= SENDFILE_MIN:
+                sent += sock.sendfile(self.file, offset, nbytes)
+        if parts:
+            sock.sendall(b''.join(parts))
+            sent += gathered
+        return sent
+
+
+# -------------------------------------------------------------------------
+# Example usage: sendfile replay over a local socket pair
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Replay a .bin from its mapping to a local socket.')
+    arg_parser.add_argument('bin_file', help='length-prefixed ITCH file')
+    arg_parser.add_argument('--start', type=int, default=0, help='first message to replay')
+    arg_parser.add_argument('--stocks', type=int, nargs='+', default=None, help='replay only these stock ids')
+    args = arg_parser.parse_args()
+
+    source = ReplaySource(args.bin_file)
+    sender, receiver = socket.socketpair()
+    received = [0]
+
+    def drain():
+        while True:
+            data = receiver.recv(1 << 20)
+            if not data:
+                return
+            received[0] += len(data)
+
+    reader = threading.Thread(target=drain)
+    reader.start()
+    start = time.perf_counter()
+    sent = source.send_to(sender, args.start, args.stocks)
+    sender.shutdown(socket.SHUT_WR)
+    reader.join()
+    elapsed = time.perf_counter() - start
+    sender.close()
+    receiver.close()
+    source.close()
+    print(f"{sent:,} bytes sent ({received[0]:,} received) in {elapsed * 1000:.1f} ms, "
+          f"{sent / elapsed / 1e6:,.0f} MB/s")
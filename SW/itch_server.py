@@ -13,6 +13,10 @@ import csv
 import subprocess
 
 from ouch_parser import OUCHParser
+from itch_replay import ReplaySource, read_resume_request
+import pacer
+from batch_sender import BatchSender, DEFAULT_BATCH, DEFAULT_MAX_DELAY_US, set_nodelay
+import moldudp
 
 # Set up logging
 LOGGING_LEVEL = logging.DEBUG
@@ -24,6 +28,7 @@ SOURCE_FILE_ZIPPED = '01302019.NASDAQ_ITCH50.gz'  # Example zipped file
 SOURCE_FILE = 'output.bin'                       # Our filtered file
 CSV_LOGFILE = 'data/ouch_events.csv'
 ABSOLUTE_GUI_PATH = r"E:\Nexys_HFT_Accelerator\SW\GUI.py"
+SEND_DELAY = 0.06  # seconds between messages (faster sends can overrun the FPGA client)
 # Ensure data directory exists
 DATA_PATH.mkdir(parents=True, exist_ok=True)
 FILE_NAME = DATA_PATH / SOURCE_FILE
@@ -31,7 +36,8 @@ FILE_NAME = DATA_PATH / SOURCE_FILE
 # Check if the data file exists, if not, inform user to download (and ideally unzip)
 if not FILE_NAME.exists():
     print(f"Please ensure the NASDAQ ITCH50 data file '{SOURCE_FILE}' exists in the '{DATA_PATH}' directory.")
-    print(f"You may need to download and unzip '{SOURCE_FILE_ZIPPED}' to '{SOURCE_FILE}' in '{DATA_PATH}'.")
+    print(f"You may need to download '{SOURCE_FILE_ZIPPED}' and extract it to '{SOURCE_FILE}' in '{DATA_PATH}':")
+    print(f"    python itch50_extract.py {DATA_PATH / SOURCE_FILE_ZIPPED} -o {FILE_NAME}")
     print("Exiting program.")
     sys.exit(1)
 
@@ -147,8 +153,8 @@ def receive_nonblocking(conn):
     Uses select to check for available data and passes any received data
     to the message handler.
     """
-    # Set socket to non-blocking mode
-    conn.setblocking(False)
+    # select() guards every recv, so the socket itself stays blocking: it is shared
+    # with the replay, and sendfile needs a blocking socket
     while True:
         # Use select with a short timeout for non-blocking behavior
         ready_to_read, _, _ = select.select([conn], [], [], 0.1)
@@ -174,6 +180,30 @@ def receive_nonblocking(conn):
             time.sleep(0.1)
     logging.debug("Exiting receive thread.")
 
+def serve_udp(source, host, port, args):
+    """
+    Multicast replays (one session each, started with [ENTER]) with retransmissions
+    on host:port over TCP. No orders come back this way.
+    """
+    group, group_port = args.udp
+    mold = moldudp.MoldServer(source, (host, port), group, group_port, args.udp_interface, args.udp_payload)
+    print(f"Retransmissions on {host}:{port}, feed to {group}:{group_port} via {args.udp_interface}")
+    try:
+        while True:
+            try:
+                input("Press [ENTER] to publish the replay. ")
+            except EOFError:
+                break
+            pacing = pacer.from_arguments(args) or pacer.Pacer(rate=1 / args.delay if args.delay else None)
+            publisher = mold.publish(pacing, args.start, args.stocks)
+            print(pacing.report_line())
+            print(publisher.report_line(pacing.report()['seconds']))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{mold.retransmit.retransmitted:,} messages retransmitted.")
+        mold.close()
+
 def main():
     """
     Main function to send ITCH file data to a TCP client.
@@ -187,7 +217,30 @@ def main():
 
     parser = argparse.ArgumentParser()
     parser.add_argument('--monitor', action='store_true')
+    parser.add_argument('--start', type=int, default=0, help='first message to replay (seeks via the .idx sidecar)')
+    parser.add_argument('--stocks', type=int, nargs='+', default=None, help='replay only these stock ids')
+    parser.add_argument('--resume', action='store_true',
+                        help="replay from the message each client asks for (test_tcp_client.py --resume) "
+                             "instead of --start")
+    parser.add_argument('--delay', type=float, default=SEND_DELAY,
+                        help='seconds between messages (without --rate/--period-us/--speed); '
+                             '0 sends the replay back-to-back with sendfile')
+    pacer.add_arguments(parser)
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH,
+                        help='messages coalesced into one sendmsg (1 = a send per message)')
+    parser.add_argument('--batch-bytes', type=int, default=None, help='also send a batch once it holds this many bytes')
+    parser.add_argument('--batch-delay-us', type=float, default=DEFAULT_MAX_DELAY_US,
+                        help='longest a queued message waits for its batch')
+    parser.add_argument('--nodelay', action='store_true', help='set TCP_NODELAY on client connections')
+    parser.add_argument('--udp', type=moldudp.parse_group, default=None, metavar='GROUP:PORT',
+                        help='publish a MoldUDP64-style multicast feed instead (PORT then serves retransmissions)')
+    parser.add_argument('--udp-interface', default=moldudp.DEFAULT_INTERFACE,
+                        help='local address the multicast feed goes out on')
+    parser.add_argument('--udp-payload', type=int, default=moldudp.MAX_PAYLOAD,
+                        help='largest datagram (header + messages) in bytes')
     args = parser.parse_args()
+    if args.resume and args.udp:
+        parser.error('--resume needs a TCP client; the multicast feed has no per-client replay')
 
     # Create CSV with header
     with open(CSV_LOGFILE, mode='w', newline='') as f:
@@ -204,6 +257,17 @@ def main():
 
 
 
+    # Mapped once; every connection replays from the same pages
+    source = ReplaySource(FILE_NAME)
+    print(f"Mapped {source.size:,} bytes from {FILE_NAME}.")
+    pacer.check_source(parser, args, source)
+
+    if args.udp:
+        serve_udp(source, HOST, PORT, args)
+        if monitor_process is not None:
+            monitor_process.terminate()
+        return
+
     # Prepare TCP server
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Allow immediate reuse
@@ -215,42 +279,62 @@ def main():
         while True:
             conn, addr = sock.accept()
             print(f"Connected to {addr}")
+            if args.nodelay:
+                set_nodelay(conn)
+            start = args.start
+            if args.resume:
+                # The client's checkpoint already holds the messages before this one
+                start = read_resume_request(conn)
+                if start is None:
+                    print("Client disconnected before asking where to resume.")
+                    conn.close()
+                    continue
+                print(f"Resuming the replay at message {start:,}")
 
             # Start a thread to receive incoming messages non-blockingly
             recv_thread = threading.Thread(target=receive_nonblocking, args=(conn,), daemon=True)
             recv_thread.start()
 
-            # Read all messages from the file (so each new client starts from the beginning)
-            messages = read_messages(FILE_NAME)
-            total_msgs = len(messages)
-            print(f"Loaded {total_msgs} messages from file.")
-
-            message_index = 0
-
-            # Send the messages with a 0.5s delay, pausing every 18 messages
-            while message_index < total_msgs - 1:
-                full_message = messages[message_index]
+            # Each new client starts from the beginning (or --start) of the shared mapping
+            pacing = pacer.from_arguments(args) or (pacer.Pacer(rate=1 / args.delay) if args.delay else None)
+            if pacing is None and args.batch > 1:
+                pacing = pacer.Pacer()  # unpaced, but batched message by message
+            if pacing is None:
+                try:
+                    sent = source.send_to(conn, start, args.stocks)
+                    print(f"Sent {sent:,} bytes.")
+                except (BrokenPipeError, ConnectionResetError):
+                    print("Client disconnected unexpectedly.")
+            else:
+                message_index = 0
+
+                # Send the messages one by one, each at its deadline (see pacer.py), coalesced
+                # into batches if --batch is set
+                sender = BatchSender(conn, args.batch, args.batch_bytes, args.batch_delay_us)
+                for full_message in pacing.paced(source.frames(start, args.stocks), idle=sender.idle):
+                    try:
+                        sender.send(full_message)
+                        logging.debug(f"Sent message {message_index}, length={len(full_message)}")
+                    except BrokenPipeError:
+                        print("Client disconnected unexpectedly.")
+                        break
+
+                    message_index += 1
+                    # # Check if current index is a multiple of 18 to pause
+                    # if message_index % 80 == 0:
+                    #     print("Press [ENTER] to send the next 80 messages.")
+                    #     try:
+                    #         input()  # Wait for user input
+                    #     except EOFError:
+                    #         print("EOF on stdin. Stopping.")
+                    #         conn.close()
+                    #         break
                 try:
-                    conn.sendall(full_message)
-                    logging.debug(f"Sent message {message_index}, length={len(full_message)}")
+                    sender.flush()
                 except BrokenPipeError:
                     print("Client disconnected unexpectedly.")
-                    break
-
-                message_index += 1
-                # # Check if current index is a multiple of 18 to pause
-                # if message_index % 80 == 0:
-                #     print("Press [ENTER] to send the next 80 messages.")
-                #     try:
-                #         input()  # Wait for user input
-                #     except EOFError:
-                #         print("EOF on stdin. Stopping.")
-                #         conn.close()
-                #         break
-
-                # sleep time for send 
-                # (can be modified for faster sends, but will potentialy crash the system)
-                time.sleep(0.06)
+                print(pacing.report_line())
+                print(sender.report_line(pacing.report()['seconds']))
 
             # # Now send the LAST message, waiting for user input first
             # if message_index % 18 == 0:
@@ -276,6 +360,14 @@ def main():
             #     except BrokenPipeError:
             #         print("Client disconnected unexpectedly.")
 
+            # Half-close and wait for the client to finish: closing outright while it is
+            # still reading (or sending orders back) resets the connection and drops
+            # whatever it hasn't read yet
+            try:
+                conn.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass  # already gone
+            recv_thread.join()
             conn.close()
             print("Connection closed.")
 
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Low-overhead latency histograms for the feed-to-order pipeline of test_tcp_client.
+
+Each stage gets a LatencyHistogram: a preallocated list of log-spaced buckets (4 per
+power of two, so any value lands in a bucket at most 25% wide). record(ns) is one
+bit_length and one list increment, cheap enough to leave on: callers take
+time.perf_counter_ns() stamps around a stage and record the difference.
+
+PipelineLatency holds one histogram per stage (STAGES) plus 'frame_to_send' (from
+the recv that delivered a frame to the send of the orders it triggered, so it also
+counts the frames ahead of it in the same recv). test_tcp_client dumps them when the
+feed ends, and on SIGUSR1 while it runs:
+    kill -USR1 <pid of test_tcp_client.py>
+"""
+import signal
+import sys
+import threading
+
+STAGES = ('recv', 'decode', 'book', 'snapshot', 'ta', 'cov', 'qr', 'ordergen', 'send')
+SUB_BUCKETS = 4  # buckets per power of two
+NUM_BUCKETS = 65 * SUB_BUCKETS  # any int64 nanosecond value
+
+
+def bucket_bounds(index):
+    """
+    [low, high) nanoseconds covered by a bucket.
+    """
+    bits, sub = divmod(index, SUB_BUCKETS)
+    if bits == 0:
+        return 0, 1
+    low = (SUB_BUCKETS + sub) * 2 ** (bits - 1) / SUB_BUCKETS
+    return low, low + 2 ** (bits - 1) / SUB_BUCKETS
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed counts of nanosecond durations. Buckets are indexed by the position of
+    the leading bit and the next two bits.
+    """
+    __slots__ = ('name', 'counts')
+
+    def __init__(self, name):
+        self.name = name
+        self.counts = [0] * NUM_BUCKETS
+
+    def record(self, ns):
+        bits = ns.bit_length()
+        self.counts[(bits << 2) | ((ns << 3 >> bits) & 3) if bits else 0] += 1
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, p):
+        """
+        Upper edge (ns) of the bucket holding the p-th percentile, None if empty.
+        """
+        total = self.count
+        if not total:
+            return None
+        rank = total * p / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bucket_bounds(index)[1]
+        return None
+
+    def summary(self):
+        """
+        {'count', 'p50_us', 'p90_us', 'p99_us', 'p999_us', 'max_us'} (bucket upper edges).
+        """
+        last = max((i for i, count in enumerate(self.counts) if count), default=None)
+        result = {'count': self.count}
+        for key, p in (('p50_us', 50), ('p90_us', 90), ('p99_us', 99), ('p999_us', 99.9)):
+            value = self.percentile(p)
+            result[key] = None if value is None else value / 1000
+        result['max_us'] = None if last is None else bucket_bounds(last)[1] / 1000
+        return result
+
+    def reset(self):
+        self.counts[:] = [0] * NUM_BUCKETS
+
+
+class PipelineLatency:
+    """
+    One histogram per pipeline stage, as attributes (latency.decode.record(ns)).
+    """
+
+    def __init__(self, stages=STAGES):
+        self.histograms = {name: LatencyHistogram(name) for name in stages + ('frame_to_send',)}
+        for name, histogram in self.histograms.items():
+            setattr(self, name, histogram)
+
+    def dump(self, file=None):
+        file = file or sys.stderr
+        print(f"{'stage':>14} {'count':>9} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'p99.9 us':>9} {'max us':>9}",
+              file=file)
+        for name, histogram in self.histograms.items():
+            s = histogram.summary()
+            if not s['count']:
+                continue
+            print(f"{name:>14} {s['count']:>9} {s['p50_us']:>9.1f} {s['p90_us']:>9.1f} {s['p99_us']:>9.1f} "
+                  f"{s['p999_us']:>9.1f} {s['max_us']:>9.1f}", file=file)
+        file.flush()
+
+    def install(self):
+        """
+        Dump on SIGUSR1 (where the platform has it). Only the main thread can set
+        signal handlers; elsewhere this is a no-op.
+        """
+        if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump())
+        return self
+
+
+# -------------------------------------------------------------------------
+# Example usage: bucket resolution and record() cost
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    import random
+    import time
+
+    histogram = LatencyHistogram('example')
+    values = [random.randrange(1, 10 ** 9) for _ in range(100000)]
+    for value in values:
+        histogram.record(value)
+        low, high = bucket_bounds((value.bit_length() << 2) | ((value << 3 >> value.bit_length()) & 3))
+        assert low <= value < high and high <= low * 1.25 + 1, (value, low, high)
+    values.sort()
+    exact = values[len(values) // 2]
+    print(f"p50 {histogram.percentile(50):,.0f} ns (exact {exact:,} ns)")
+
+    record = histogram.record
+    start = time.perf_counter_ns()
+    for value in values:
+        record(value)
+    print(f"record(): {(time.perf_counter_ns() - start) / len(values):.0f} ns per call")
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+MoldUDP64-style multicast feed for the replay rig.
+
+Server side (itch_server.py --udp GROUP:PORT):
+- MoldPublisher packs frames into datagrams: a 20-byte header (10-byte session,
+  sequence number of the first message, message count) followed by the message
+  blocks, which are the same 2-byte length + message frames as the .bin and the TCP
+  feed. Datagrams are filled up to max_payload bytes; a paced replay sends whatever
+  is queued before the pacer waits. Heartbeats (count 0) go out every
+  HEARTBEAT_INTERVAL while nothing else does; end of session is count 0xFFFF.
+- RetransmitServer answers requests over TCP from the same mapped ReplaySource: the
+  request is a header (session, first sequence number, count), the reply a header
+  with the count actually sent followed by the message blocks.
+
+Client side (test_tcp_client.py --mode udp):
+- MoldReceiver joins the group and hands the messages to StreamFramer in sequence
+  order, as if it were the TCP socket. A packet past the expected sequence number
+  (or a heartbeat / end of session that says messages were missed) is a gap: the
+  missing messages are fetched from the retransmission server before anything after
+  them is delivered. Duplicates are skipped. The feed has no return path, so orders
+  the client "sends" are only counted.
+
+Every replay is its own session (REPLAY0001, REPLAY0002, ...), numbered from 1.
+"""
+import itertools
+import logging
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+HEADER = struct.Struct('>10sQH')  # session, sequence number of the first message, message count
+LENGTH = struct.Struct('>H')
+END_OF_SESSION = 0xFFFF  # message count of the end-of-session packet
+DEFAULT_GROUP = '239.1.1.1'
+DEFAULT_PORT = 30001
+DEFAULT_INTERFACE = '127.0.0.1'  # loopback multicast; the NIC's address on a real rig
+MAX_PAYLOAD = 1400  # datagram bytes incl. header: 36 of the 38-byte frames, fits a 1500-byte MTU
+HEARTBEAT_INTERVAL = 1.0  # seconds of silence before a heartbeat
+END_REPEATS = 3  # end-of-session packets sent (any one is enough)
+MAX_RETRANSMIT = 8192  # messages per retransmission reply
+RECV_BUFFER = 4 * 1024 * 1024  # SO_RCVBUF asked for (the kernel may cap it)
+IDLE_TIMEOUT = 5.0  # seconds without any packet before the receiver gives up
+
+
+def make_session(number):
+    return f'REPLAY{number:04d}'.encode()
+
+
+def parse_group(text):
+    """
+    'GROUP:PORT' (or just 'GROUP') -> (group, port).
+    """
+    group, _, port = text.partition(':')
+    return group, int(port) if port else DEFAULT_PORT
+
+
+def recv_exactly(sock, size):
+    """
+    size bytes from a TCP socket, None if it closes first.
+    """
+    buf = bytearray(size)
+    view = memoryview(buf)
+    got = 0
+    while got < size:
+        n = sock.recv_into(view[got:])
+        if not n:
+            return None
+        got += n
+    return buf
+
+
+# -------------------------------------------------------------------------
+# Server side
+# -------------------------------------------------------------------------
+class SessionStore:
+    """
+    The messages of one session by sequence number, read from the mapped source.
+    """
+
+    def __init__(self, source, start=0, stock_ids=None):
+        self.source = source
+        self.start = start
+        # Offsets of the selected frames; None = every frame from message `start` on
+        self.offsets = source.selected_offsets(start, stock_ids)
+
+    def frames(self, seq=1, count=None):
+        """
+        Frames from sequence number seq on (count of them, or to the end).
+        """
+        if self.offsets is not None:
+            view = self.source.view
+            stop = None if count is None else seq - 1 + count
+            for offset in self.offsets[seq - 1:stop].tolist():
+                (length,) = LENGTH.unpack_from(view, offset)
+                yield view[offset:offset + 2 + length]
+            return
+        frames = self.source.frames(self.start + seq - 1)
+        yield from (frames if count is None else itertools.islice(frames, count))
+
+
+class MoldPublisher:
+    """
+    Packs frames into MoldUDP64 datagrams for one session and multicasts them.
+    """
+
+    def __init__(self, session, group=DEFAULT_GROUP, port=DEFAULT_PORT, interface=DEFAULT_INTERFACE,
+                 max_payload=MAX_PAYLOAD, ttl=1):
+        self.session = session
+        self.address = (group, port)
+        self.max_payload = max_payload
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+        self.lock = threading.Lock()
+        self.next_seq = 1  # sequence number of the next datagram's first message
+        self.parts = []
+        self.size = HEADER.size
+        self.last_sent = time.monotonic()
+        self.ended = threading.Event()
+        self.heartbeat_thread = None
+        # Stats
+        self.packets = 0
+        self.messages = 0
+        self.bytes = 0
+        self.heartbeats = 0
+
+    @property
+    def published(self):
+        """
+        Highest sequence number sent so far.
+        """
+        return self.next_seq - 1
+
+    def send_packet(self, count, parts=()):
+        header = HEADER.pack(self.session, self.next_seq, count)
+        if hasattr(self.sock, 'sendmsg'):
+            self.sock.sendmsg([header, *parts], [], 0, self.address)
+        else:
+            self.sock.sendto(b''.join([header, *parts]), self.address)
+        self.last_sent = time.monotonic()
+
+    def publish(self, frame):
+        if self.parts and self.size + len(frame) > self.max_payload:
+            self.flush()
+        self.parts.append(frame)
+        self.size += len(frame)
+
+    def flush(self):
+        if not self.parts:
+            return
+        with self.lock:
+            count = len(self.parts)
+            self.send_packet(count, self.parts)
+            self.next_seq += count
+            self.packets += 1
+            self.messages += count
+            self.bytes += self.size
+            self.parts = []
+            self.size = HEADER.size
+
+    def idle(self, deadline):
+        """
+        Pacer hook: nothing more is due before `deadline`, so send what is queued.
+        """
+        self.flush()
+
+    def heartbeat(self):
+        with self.lock:
+            if time.monotonic() - self.last_sent >= HEARTBEAT_INTERVAL:
+                self.send_packet(0)
+                self.heartbeats += 1
+
+    def start_heartbeats(self):
+        def run():
+            while not self.ended.wait(HEARTBEAT_INTERVAL / 4):
+                self.heartbeat()
+
+        self.heartbeat_thread = threading.Thread(target=run, name='heartbeat', daemon=True)
+        self.heartbeat_thread.start()
+
+    def end_session(self):
+        self.flush()
+        self.ended.set()
+        with self.lock:
+            for _ in range(END_REPEATS):
+                self.send_packet(END_OF_SESSION)
+        self.sock.close()
+
+    def report_line(self, seconds):
+        seconds = seconds or float('nan')
+        return (f"session {self.session.decode()}: {self.messages:,} messages in {self.packets:,} datagrams "
+                f"({self.messages / max(self.packets, 1):.1f} per datagram), {self.messages / seconds:,.0f} msgs/sec, "
+                f"{self.bytes / seconds / 1e6:,.1f} MB/s, {self.heartbeats} heartbeats")
+
+
+class RetransmitHandler(socketserver.BaseRequestHandler):
+    """
+    One retransmission client: header-sized requests in, header + message blocks out.
+    """
+
+    def handle(self):
+        sessions = self.server.sessions
+        while True:
+            request = recv_exactly(self.request, HEADER.size)
+            if request is None:
+                return
+            session, seq, count = HEADER.unpack(request)
+            store, publisher = sessions.get(session, (None, None))
+            frames = []
+            if store is not None and seq >= 1:
+                # Only what has already been multicast
+                count = max(0, min(count, MAX_RETRANSMIT, publisher.published - seq + 1))
+                frames = list(store.frames(seq, count))
+                self.server.retransmitted += len(frames)
+            self.request.sendall(b''.join([HEADER.pack(session, seq, len(frames)), *frames]))
+
+
+class RetransmitServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, RetransmitHandler)
+        self.sessions = {}  # session -> (SessionStore, MoldPublisher)
+        self.retransmitted = 0
+
+
+class MoldServer:
+    """
+    Publishes replays of a ReplaySource as MoldUDP64 sessions and serves their
+    retransmissions on retransmit_address (TCP).
+    """
+
+    def __init__(self, source, retransmit_address, group=DEFAULT_GROUP, port=DEFAULT_PORT,
+                 interface=DEFAULT_INTERFACE, max_payload=MAX_PAYLOAD):
+        self.source = source
+        self.group = group
+        self.port = port
+        self.interface = interface
+        self.max_payload = max_payload
+        self.sessions = itertools.count(1)
+        self.retransmit = RetransmitServer(retransmit_address)
+        threading.Thread(target=self.retransmit.serve_forever, name='retransmit', daemon=True).start()
+        # Seeking by sequence number needs the .idx; open (or build) it now rather than
+        # on the first retransmission request
+        threading.Thread(target=lambda: source.index, name='index', daemon=True).start()
+
+    def publish(self, pacing, start=0, stock_ids=None):
+        """
+        Replay once, paced by `pacing` (a pacer.Pacer), as a new session. Returns its
+        MoldPublisher.
+        """
+        session = make_session(next(self.sessions))
+        store = SessionStore(self.source, start, stock_ids)
+        publisher = MoldPublisher(session, self.group, self.port, self.interface, self.max_payload)
+        self.retransmit.sessions[session] = (store, publisher)
+        publisher.start_heartbeats()
+        try:
+            for frame in pacing.paced(store.frames(), idle=publisher.idle):
+                publisher.publish(frame)
+        finally:
+            publisher.end_session()
+        return publisher
+
+    def close(self):
+        self.retransmit.shutdown()
+        self.retransmit.server_close()
+
+
+# -------------------------------------------------------------------------
+# Client side
+# -------------------------------------------------------------------------
+class MoldReceiver:
+    """
+    Socket stand-in for test_tcp_client: connect() joins the multicast group and opens
+    the retransmission connection, recv_into() returns the feed's frames in sequence
+    order (0 once the session has ended), send() counts orders.
+    """
+
+    def __init__(self, group=DEFAULT_GROUP, port=DEFAULT_PORT, interface=DEFAULT_INTERFACE,
+                 idle_timeout=IDLE_TIMEOUT):
+        self.group = group
+        self.port = port
+        self.interface = interface
+        self.idle_timeout = idle_timeout
+        self.udp = None
+        self.tcp = None
+        self.session = None
+        self.expected = 1  # next sequence number to deliver
+        self.pending = bytearray()
+        self.ended = False
+        # Stats
+        self.packets = 0
+        self.messages = 0
+        self.gaps = 0
+        self.retransmitted = 0
+        self.duplicates = 0
+        self.heartbeats = 0
+        self.orders = 0
+
+    def connect(self, retransmit_address):
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        udp.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER)
+        udp.bind(('', self.port))
+        udp.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                       socket.inet_aton(self.group) + socket.inet_aton(self.interface))
+        udp.settimeout(self.idle_timeout)
+        self.udp = udp
+        self.tcp = socket.create_connection(retransmit_address)
+
+    def recv_into(self, buf):
+        while not self.pending:
+            if self.ended:
+                return 0
+            self.receive_packet()
+        n = min(len(buf), len(self.pending))
+        buf[:n] = self.pending[:n]
+        del self.pending[:n]
+        return n
+
+    def receive_packet(self):
+        try:
+            data = self.udp.recv(65535)
+        except socket.timeout:
+            logging.warning(f"no packets for {self.idle_timeout} s, assuming the feed has ended")
+            self.ended = True
+            return
+        if len(data) < HEADER.size:
+            return
+        session, seq, count = HEADER.unpack_from(data)
+        if self.session is None:
+            self.session = session
+        elif session != self.session:
+            return  # another session (an earlier replay still ending, or the next one)
+        self.packets += 1
+
+        if seq > self.expected:
+            # Gap (also when a heartbeat or end of session is ahead of us)
+            self.recover(seq)
+        if count == END_OF_SESSION:
+            self.ended = True
+            return
+        if count == 0:
+            self.heartbeats += 1
+            return
+
+        skip = self.expected - seq
+        if skip >= count:
+            self.duplicates += count
+            return
+        pos = HEADER.size
+        for _ in range(skip):
+            # Overlaps what we already have
+            (length,) = LENGTH.unpack_from(data, pos)
+            pos += 2 + length
+        self.duplicates += skip
+        self.pending += memoryview(data)[pos:]
+        self.messages += count - skip
+        self.expected = seq + count
+
+    def recover(self, upto):
+        """
+        Fetch messages expected .. upto - 1 from the retransmission server.
+        """
+        self.gaps += 1
+        while self.expected < upto:
+            self.tcp.sendall(HEADER.pack(self.session, self.expected, min(upto - self.expected, MAX_RETRANSMIT)))
+            reply = recv_exactly(self.tcp, HEADER.size)
+            if reply is None:
+                raise ConnectionError("retransmission server closed the connection")
+            _, _, count = HEADER.unpack(reply)
+            if not count:
+                raise ConnectionError(f"retransmission server has no messages from {self.expected}")
+            for _ in range(count):
+                prefix = recv_exactly(self.tcp, 2)
+                body = None if prefix is None else recv_exactly(self.tcp, LENGTH.unpack(prefix)[0])
+                if body is None:
+                    raise ConnectionError("retransmission server closed the connection")
+                self.pending += prefix
+                self.pending += body
+            self.expected += count
+            self.retransmitted += count
+            self.messages += count
+
+    def send(self, data):
+        self.orders += 1
+        return len(data)
+
+    def close(self):
+        for sock in (self.udp, self.tcp):
+            if sock is not None:
+                sock.close()
+
+    def report_line(self):
+        return (f"{self.messages:,} messages from {self.packets:,} datagrams, {self.gaps} gaps "
+                f"({self.retransmitted:,} messages retransmitted), {self.duplicates:,} duplicates, "
+                f"{self.heartbeats} heartbeats, {self.orders} orders not sent (no return path over UDP)")
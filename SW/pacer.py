@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Send-side pacing for itch_server replays.
+
+Modes (Pacer arguments):
+- rate:      rate msgs/sec, evenly spaced.
+- burst:     burst messages back-to-back every period_us microseconds (or every
+             burst / rate seconds if only rate is given).
+- timestamp: ITCH 5.0 frames released at their original Timestamp spacing, speed
+             times faster (speed=1 is real time, 10 is ten times faster).
+
+Every message gets an absolute deadline measured from the first one, so sleep
+overshoot and send time never add up (drift correction): a late message is followed
+by back-to-back sends until the schedule is met again. If the sender falls more than
+max_lag_ms behind (a stalled client), the schedule restarts from now instead of
+bursting out everything it missed. Waiting is hybrid on perf_counter_ns: sleep until
+SPIN_NS before the deadline (time.sleep overshoots by tens of microseconds), then
+spin.
+
+    for frame in pacer.paced(frames):
+        conn.sendall(frame)
+    print(pacer.report_line())
+"""
+import argparse
+import time
+
+from latency import LatencyHistogram
+
+SPIN_NS = 200_000  # spin instead of sleeping for the last 200 us before a deadline
+MAX_LAG_MS = 100.0  # further behind than this, the schedule restarts from now
+TIMESTAMP_OFFSET = 7  # ITCH 5.0 frame: 2-byte length, type, locate, tracking, then the 6-byte Timestamp
+
+
+def itch50_timestamp(frame):
+    """
+    Timestamp (ns since midnight) of a length-prefixed ITCH 5.0 frame.
+    """
+    return int.from_bytes(frame[TIMESTAMP_OFFSET:TIMESTAMP_OFFSET + 6], 'big')
+
+
+class Pacer:
+    """
+    Releases frames on a schedule and measures how well it kept it.
+    - rate: target msgs/sec.
+    - burst / period_us: burst messages back-to-back every period_us.
+    - speed: replay ITCH 5.0 timestamps speed times faster (ignores rate and burst).
+    With none of them set frames pass straight through (still counted).
+    """
+
+    def __init__(self, rate=None, burst=1, period_us=None, speed=None, max_lag_ms=MAX_LAG_MS, spin_ns=SPIN_NS):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive")
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.speed = speed
+        self.burst = burst
+        if period_us is not None:
+            self.period_ns = period_us * 1000
+        elif rate is not None:
+            self.period_ns = burst * 1e9 / rate
+        else:
+            self.period_ns = None
+        self.max_lag_ns = max_lag_ms * 1_000_000
+        self.spin_ns = spin_ns
+        self.lateness = LatencyHistogram('lateness')
+        self.reset()
+
+    @property
+    def mode(self):
+        if self.speed is not None:
+            return 'timestamp'
+        if self.period_ns is None:
+            return 'unpaced'
+        return 'burst' if self.burst > 1 else 'rate'
+
+    @property
+    def requested_rate(self):
+        """
+        msgs/sec asked for, None in timestamp and unpaced modes (set by the data).
+        """
+        return None if self.period_ns is None or self.speed is not None else self.burst * 1e9 / self.period_ns
+
+    def reset(self):
+        self.lateness.reset()
+        self.messages = 0
+        self.restarts = 0
+        self.started = None
+        self.finished = None
+        # (messages before, send time) of the last burst's first message
+        self.last_burst = (0, None)
+        self.previous = None  # (send time, deadline) of the last message
+        # Inter-message jitter: actual gap minus scheduled gap, as running sums
+        self.jitter_sum = 0
+        self.jitter_sq_sum = 0
+        self.jitter_max = 0
+
+    def wait_until(self, deadline, idle=None):
+        """
+        Sleep, then spin, until perf_counter_ns() >= deadline. Returns that time.
+        idle(deadline) is called first if there is any wait at all.
+        """
+        now = time.perf_counter_ns
+        remaining = deadline - now()
+        if remaining > 0 and idle is not None:
+            idle(deadline)
+            remaining = deadline - now()
+        if remaining > self.spin_ns:
+            time.sleep((remaining - self.spin_ns) / 1e9)
+        current = now()
+        while current < deadline:
+            current = now()
+        return current
+
+    def schedule(self, frames):
+        """
+        Yield (deadline, frame): the deadline in ns after the first frame's, or None
+        when unpaced (send at once).
+        """
+        if self.speed is not None:
+            speed = self.speed
+            first_timestamp = None
+            for frame in frames:
+                timestamp = itch50_timestamp(frame)
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                yield int((timestamp - first_timestamp) / speed), frame
+        elif self.period_ns is not None:
+            period = self.period_ns
+            burst = self.burst
+            for index, frame in enumerate(frames):
+                yield int((index // burst) * period), frame
+        else:
+            for frame in frames:
+                yield None, frame
+
+    def release(self, index, deadline, sent):
+        """
+        Account for frame number `index`, due at `deadline` and released at `sent`
+        (perf_counter_ns). Returns how far the schedule moves: 0, or the lateness
+        when it was over max_lag and the schedule restarts from this frame.
+        """
+        if not index:
+            self.started = sent
+            self.previous = (sent, sent)
+        late = sent - deadline
+        shift = 0
+        if late > self.max_lag_ns:
+            # Restart the schedule so this message is on time
+            shift = late
+            deadline = sent
+            late = 0
+            self.restarts += 1
+        self.lateness.record(late)
+        if index:
+            previous_sent, previous_deadline = self.previous
+            jitter = (sent - previous_sent) - (deadline - previous_deadline)
+            self.jitter_sum += jitter
+            self.jitter_sq_sum += jitter * jitter
+            self.jitter_max = max(self.jitter_max, abs(jitter))
+        self.previous = (sent, deadline)
+        if not index % self.burst:
+            self.last_burst = (index, sent)
+        self.messages = index + 1
+        self.finished = sent
+        return shift
+
+    def paced(self, frames, idle=None):
+        """
+        Yield frames, each once its deadline has come. idle(deadline) runs before
+        each wait (e.g. BatchSender.idle, to flush a batch instead of holding it).
+        """
+        now = time.perf_counter_ns
+        origin = now()
+        for index, (offset, frame) in enumerate(self.schedule(frames)):
+            deadline = now() if offset is None else origin + offset
+            sent = self.wait_until(deadline, idle)
+            origin += self.release(index, deadline, sent)
+            yield frame
+
+    def report(self):
+        """
+        {'mode', 'messages', 'seconds', 'requested_rate', 'achieved_rate',
+         'lateness_p50_us', 'lateness_p99_us', 'lateness_max_us',
+         'jitter_rms_us', 'jitter_max_us', 'restarts'}
+        Lateness is release time minus deadline (within a burst it includes the
+        messages ahead); jitter is actual minus scheduled gap between messages.
+        """
+        seconds = (self.finished - self.started) / 1e9 if self.messages > 1 else 0.0
+        # Rate up to the start of the last burst, so its trailing period isn't missing
+        before_last, last_start = self.last_burst
+        span = (last_start - self.started) / 1e9 if before_last else 0.0
+        gaps = max(self.messages - 1, 1)
+        summary = self.lateness.summary()
+        mean = self.jitter_sum / gaps
+        return {
+            'mode': self.mode,
+            'messages': self.messages,
+            'seconds': seconds,
+            'requested_rate': self.requested_rate,
+            'achieved_rate': before_last / span if span else None,
+            'lateness_p50_us': summary['p50_us'],
+            'lateness_p99_us': summary['p99_us'],
+            'lateness_max_us': summary['max_us'],
+            'jitter_rms_us': max(self.jitter_sq_sum / gaps - mean * mean, 0) ** 0.5 / 1000,
+            'jitter_max_us': self.jitter_max / 1000,
+            'restarts': self.restarts,
+        }
+
+    def report_line(self):
+        r = self.report()
+        if not r['messages']:
+            return f"{r['mode']}: no messages"
+        requested = f"{r['requested_rate']:,.0f}" if r['requested_rate'] else '-'
+        achieved = f"{r['achieved_rate']:,.0f}" if r['achieved_rate'] else '-'
+        line = (f"{r['mode']}: {r['messages']:,} messages in {r['seconds']:.3f} s, {achieved} msgs/sec "
+                f"(requested {requested}); lateness p50 {r['lateness_p50_us']:.1f} us, "
+                f"p99 {r['lateness_p99_us']:.1f} us, max {r['lateness_max_us']:.1f} us; "
+                f"inter-message jitter rms {r['jitter_rms_us']:.1f} us, max {r['jitter_max_us']:.1f} us")
+        if r['restarts']:
+            line += f"; schedule restarted {r['restarts']} times"
+        return line
+
+
+def add_arguments(parser):
+    """
+    --rate / --burst / --period-us / --speed on an argparse parser.
+    """
+    parser.add_argument('--rate', type=float, default=None, help='target msgs/sec')
+    parser.add_argument('--burst', type=int, default=1, help='messages sent back-to-back per period')
+    parser.add_argument('--period-us', type=float, default=None,
+                        help='microseconds between bursts (default: burst / rate)')
+    parser.add_argument('--speed', type=float, default=None,
+                        help='replay ITCH 5.0 timestamps this many times faster than real time (ITCH 5.0 files only)')
+
+
+def check_source(parser, args, source):
+    """
+    Reject pacing options that would be ignored:
+    - --burst without --rate or --period-us: there is no period to send the bursts on.
+    - --speed unless the ReplaySource holds ITCH 5.0 frames: the custom 38-byte layout
+      has filler where the Timestamp would be, so there is no schedule to follow.
+    """
+    if args.burst != 1 and args.rate is None and args.period_us is None:
+        parser.error("--burst needs --rate or --period-us to set the time between bursts")
+    if args.speed is not None and source.index.layout != 'itch50':
+        parser.error(f"--speed needs ITCH 5.0 timestamps, {source.path} has {source.index.layout} frames")
+
+
+def from_arguments(args):
+    """
+    Pacer from add_arguments() options, None if none of them asks for pacing.
+    """
+    if args.rate is None and args.period_us is None and args.speed is None:
+        return None
+    return Pacer(rate=args.rate, burst=args.burst, period_us=args.period_us, speed=args.speed)
+
+
+# -------------------------------------------------------------------------
+# Example usage: achieved rate and jitter without a socket in the way
+# -------------------------------------------------------------------------
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Pacing accuracy at a few load levels.')
+    arg_parser.add_argument('--seconds', type=float, default=1.0, help='length of each run')
+    args = arg_parser.parse_args()
+
+    def synthetic_itch50(count, gap_ns):
+        # Add Order frames 'gap_ns' apart; only the Timestamp matters to the pacer
+        for i in range(count):
+            yield b'\x00\x24A\x00\x01\x00\x00' + (34200 * 10 ** 9 + i * gap_ns).to_bytes(6, 'big') + bytes(25)
+
+    for settings in ({'rate': 1000}, {'rate': 20000}, {'rate': 200000}, {'burst': 50, 'period_us': 1000},
+                     {'speed': 1.0}):
+        pacer = Pacer(**settings)
+        if 'speed' in settings:
+            frames = synthetic_itch50(int(10000 * args.seconds), 100_000)  # 10k msgs/sec of market time
+        else:
+            frames = (b'' for _ in range(int((pacer.requested_rate or 1) * args.seconds)))
+        for frame in pacer.paced(frames):
+            pass
+        print(f"{settings}: {pacer.report_line()}")
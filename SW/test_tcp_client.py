@@ -1,11 +1,21 @@
+import argparse
+import os
 import socket
 import struct
+import time
 from itch_parser import ITCHParser
-from Orderbook import OrderBookManager
+from itch_framer import StreamFramer
+from Orderbook import OrderBookManager, PRICE_BAND_CSV
 from TaParser import TaParser
 from CovUpdate import CovarianceUpdateStack
 from QrDecompLinSolver import QRDecompLinSolver
 from OrderGen import OrderGenerator
+from checkpoint import save_checkpoint, load_checkpoint
+from itch_replay import resume_request
+from ShardedOrderbook import ShardedOrderBookManager
+import async_client
+from latency import PipelineLatency
+from moldudp import MoldReceiver, DEFAULT_GROUP, DEFAULT_PORT, DEFAULT_INTERFACE, parse_group
 import logging
 
 LOGGING_LEVEL = logging.INFO  # Change to logging.INFO for less verbose logging
@@ -18,17 +28,48 @@ SERVER_IP = 'localhost'
 SERVER_PORT = 22
 SIDE_BID = 0
 SIDE_ASK = 1
+CHECKPOINT_EVERY = 10000  # messages between order book checkpoints
+LATENCY_SAMPLE_MASK = 15  # decode/book latency is recorded for one message in 16
 
-def main():
+def main(checkpoint_path=None, checkpoint_every=CHECKPOINT_EVERY, shards=0, mode='classic',
+         group=(DEFAULT_GROUP, DEFAULT_PORT), interface=DEFAULT_INTERFACE, resume=False):
     server_ip = SERVER_IP
     server_port = SERVER_PORT
     parser = ITCHParser()
-    orderbook = OrderBookManager()
+    # Per-symbol price bands from the same config the order generator uses
+    config_path = PRICE_BAND_CSV if os.path.exists(PRICE_BAND_CSV) else None
+    if shards:
+        # Book updates run in worker processes; this process only parses and routes
+        orderbook = ShardedOrderBookManager(num_shards=shards, config_path=config_path)
+    else:
+        orderbook = OrderBookManager(config_path=config_path)
+
+    if mode == 'asyncio':
+        # Ingest on the event loop, analytics in its own task (see async_client.py)
+        try:
+            async_client.main(server_ip, server_port, orderbook)
+        finally:
+            if shards:
+                orderbook.close()
+        return
+
+    # Warm start: with resume (itch_server.py --resume) the server is asked to start
+    # right after the checkpoint; otherwise it replays from message 0
+    feed_seq = 0
+    resume_seq = 0
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        orderbook, resume_seq = load_checkpoint(checkpoint_path, config_path=config_path)
+        print(f"Restored order book from {checkpoint_path} at message {resume_seq}")
     ta_parser = TaParser()
     ta_cov = CovarianceUpdateStack()
     ta_qr = QRDecompLinSolver()
     ta_og = OrderGenerator()
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if mode == 'udp':
+        # Multicast feed; the server's TCP port serves retransmissions (see moldudp.py)
+        client_socket = MoldReceiver(*group, interface=interface)
+    else:
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    latency = PipelineLatency()
 
     # >>> ADDED: Counter to track how many order-related messages we've processed.
     order_count = 0
@@ -37,38 +78,38 @@ def main():
     try:
         client_socket.connect((server_ip, server_port))
         print(f"Connected to {server_ip}:{server_port}")
-        num_bytes_to_skip = 0
+        if resume:
+            client_socket.sendall(resume_request(resume_seq))
+            feed_seq = resume_seq
+        framer = StreamFramer()
+        # Per-stage histograms, dumped on SIGUSR1 and when the feed ends (see latency.py)
+        latency.install()
+        now = time.perf_counter_ns
 
         while True:
-            data = client_socket.recv(1024 * 1024)
-            if not data:
+            recv_start = now()
+            if not framer.fill(client_socket):
                 break
+            received = now()
+            latency.recv.record(received - recv_start)
+            for message in framer.frames():
+                feed_seq += 1
+                if feed_seq <= resume_seq:
+                    # Already applied to the restored book (a server replaying from 0)
+                    continue
 
-            while data:
-                if num_bytes_to_skip > 0:
-                    if num_bytes_to_skip > len(data):
-                        num_bytes_to_skip -= len(data)
-                        break
-                    else:
-                        data = data[num_bytes_to_skip:]
-                        num_bytes_to_skip = 0
-
-                if len(data) < 2:
-                    break  # incomplete data; wait for next recv
-
-                length = int.from_bytes(data[:2], byteorder='big')
-                if length > len(data[2:]):
-                    logging.debug(f"Expected message length: {length}, actual length: {len(data[2:])}")
-                    num_bytes_to_skip = length - len(data[2:])
-                    break
-
-                message = data[2 : 2 + length]
-                message_type_code = message[0:1]
-                message_data = message[1:]
+                length = len(message)
+                message_type_code = message[0:1].tobytes()
 
                 logging.debug(f"message_type_code: {message_type_code}, message length: {length}")
 
-                decoded_message = parser.decode_message(message_type_code, message_data)
+                # Flyweight view of the message in the framer's buffer; fields are
+                # decoded on access and the view is reused for the next message
+                # Stamping every message would cost more than the book update itself
+                timed = not feed_seq & LATENCY_SAMPLE_MASK
+                if timed:
+                    decode_start = now()
+                decoded_message = parser.view_from(message)
                 if decoded_message is not None:
                     if LOGGING_LEVEL == logging.DEBUG:
                         parser.print_human_readable_message(decoded_message)
@@ -84,6 +125,10 @@ def main():
                         price = decoded_message.Price
                         quantity = decoded_message.Shares
                         order_id = decoded_message.OrderReferenceNumber
+                        # The view decodes on access, so decode ends once the fields are read
+                        if timed:
+                            decoded = now()
+                            latency.decode.record(decoded - decode_start)
 
                         # a) Add Order
                         if message_type_code in [b'A']:
@@ -117,43 +162,65 @@ def main():
                                 stock_id=stock_id,
                                 order_id=order_id
                             )
+                        if timed:
+                            latency.book.record(now() - decoded)
 
                         # >>> ADDED: Increase counter and check threshold
                         order_count += 1
                         if order_count >= PUBLISH_THRESHOLD:
                             # Every 20 messages, do a publish
                             # Publish the entire snapshot for all stocks
+                            stage_start = now()
                             snapshot = orderbook.publish_snapshot()
+                            stamp = now()
+                            latency.snapshot.record(stamp - stage_start)
                             logging.info("Order book: ")
                             for entry in snapshot:
                                 logging.info(entry)  # or orderbook.publish_snapshot()
                             
                             # TA Parser
+                            stage_start = now()
                             market_prices = ta_parser.update(snapshot)
+                            stamp = now()
+                            latency.ta.record(stamp - stage_start)
                             logging.info(f"TA Parser: {market_prices}")
 
                             # Covariance Update
+                            stage_start = now()
                             K, proceed = ta_cov.update(market_prices)
+                            stamp = now()
+                            latency.cov.record(stamp - stage_start)
                             logging.info(f"Covariance Matrix: {K}\tProceed: {proceed}")
                             
                             if proceed:
                                 # QR Decomposition and linear solver
+                                stage_start = now()
                                 weights, proceed_2 = ta_qr.solve(K)
+                                stamp = now()
+                                latency.qr.record(stamp - stage_start)
                                 if proceed_2:
                                     logging.info(f"QR: Solved weights: {weights}")
 
                                     # Order Generation
+                                    stage_start = now()
                                     output_blob = ta_og.order_gen(weights, market_prices)
+                                    stamp = now()
+                                    latency.ordergen.record(stamp - stage_start)
                                     logging.info(f"Order Generation (hex): {output_blob.hex()}")
 
                                     # Send the order generation msg to the server
+                                    stage_start = now()
                                     client_socket.send(output_blob)
+                                    stamp = now()
+                                    latency.send.record(stamp - stage_start)
+                                    latency.frame_to_send.record(stamp - received)
                                     print(f"Packet sent to server.")
                                 else:
                                     logging.info("division by zero occured")
                             order_count = 0
 
-                data = data[2 + length :]
+                if checkpoint_path and feed_seq % checkpoint_every == 0:
+                    save_checkpoint(checkpoint_path, orderbook, feed_seq)
 
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -161,6 +228,38 @@ def main():
     finally:
         client_socket.close()
         print("Connection closed")
+        if mode == 'udp':
+            print(client_socket.report_line())
+        latency.dump()
+        if shards:
+            orderbook.close()
+        if checkpoint_path and feed_seq > resume_seq:
+            save_checkpoint(checkpoint_path, orderbook, feed_seq)
+            print(f"Order book checkpoint written at message {feed_seq}")
 
 if __name__ == "__main__":
-    main()
+    arg_parser = argparse.ArgumentParser(description='Software benchmark client for the ITCH server.')
+    arg_parser.add_argument('--checkpoint', type=str, default=None,
+                            help='Order book checkpoint file: restored on start if present, refreshed while running')
+    arg_parser.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_EVERY,
+                            help='Messages between checkpoints')
+    arg_parser.add_argument('--shards', type=int, default=0,
+                            help='Run the order book in this many worker processes, split by stock_id (0 = in-process)')
+    arg_parser.add_argument('--mode', choices=('classic', 'asyncio', 'udp'), default='classic',
+                            help='classic: one blocking loop; asyncio: ingest and analytics as separate stages; '
+                                 'udp: the classic loop on itch_server.py --udp\'s multicast feed')
+    arg_parser.add_argument('--group', type=parse_group, default=(DEFAULT_GROUP, DEFAULT_PORT),
+                            help='multicast GROUP:PORT of the feed (--mode udp)')
+    arg_parser.add_argument('--interface', default=DEFAULT_INTERFACE,
+                            help='local address to join the group on (--mode udp)')
+    arg_parser.add_argument('--resume', action='store_true',
+                            help='ask the server (itch_server.py --resume) to replay from the checkpoint on')
+    args = arg_parser.parse_args()
+    if args.resume and args.mode != 'classic':
+        arg_parser.error('--resume needs --mode classic')
+    if args.shards and args.checkpoint:
+        arg_parser.error('--checkpoint is not supported with --shards')
+    if args.mode == 'asyncio' and args.checkpoint:
+        arg_parser.error('--checkpoint is not supported with --mode asyncio')
+    main(args.checkpoint, args.checkpoint_every, args.shards, args.mode, args.group, args.interface,
+         args.resume)